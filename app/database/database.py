@@ -1,23 +1,214 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 import os
+import threading
+import time
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./deliveryeaze.db")
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Opt-in async request path: with DB_ASYNC=1 the hot read routes are served by `async def`
+# handlers on an AsyncEngine instead of each holding a threadpool thread. Needs the async
+# driver for the backend (aiosqlite for SQLite, asyncpg for PostgreSQL).
+DB_ASYNC = os.getenv("DB_ASYNC", "").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# Named engine profiles, picked with DB_PROFILE (defaults to "sqlite" for SQLite URLs and
+# "server" for everything else). "default" is plain create_engine() behaviour.
+ENGINE_PROFILES = {
+    "default": {},
+    "sqlite": {
+        "pragmas": {
+            "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            # negative cache_size is in KiB
+            "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+        },
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    },
+    "server": {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    },
+}
+
+
+class PoolStats:
+    """Counters for connection checkouts and the time spent waiting for one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.waits = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection."""
+
+    stats = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - started)
+
+
+def default_profile(url):
+    return "sqlite" if make_url(url).get_backend_name() == "sqlite" else "server"
+
+
+def build_engine(url, profile=None):
+    """Create an engine for `url` configured from the named profile."""
+    profile = profile or default_profile(url)
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(ENGINE_PROFILES)}")
+    settings = dict(ENGINE_PROFILES[profile])
+    pragmas = settings.pop("pragmas", None)
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+
+    kwargs = {"connect_args": {"check_same_thread": False} if is_sqlite else {}}
+    stats = PoolStats()
+    if settings and not in_memory:
+        pool_class = type("TimedQueuePool", (TimedQueuePool,), {"stats": stats})
+        kwargs.update(settings, poolclass=pool_class)
+    engine = create_engine(url, **kwargs)
+    engine.pool_stats = stats
+    engine.profile = profile
+    _add_listeners(engine, stats, pragmas, in_memory)
+    return engine
+
+
+def _add_listeners(engine, stats, pragmas, in_memory):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.record_connect()
+        if pragmas:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                if name == "journal_mode" and in_memory:
+                    continue
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_checkout()
+
+
+def async_url(url):
+    """`url` with its driver swapped for the backend's asyncio driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}; DB_ASYNC supports {', '.join(ASYNC_DRIVERS)}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def build_async_engine(url, profile=None):
+    """AsyncEngine for `url` with the same profile settings (pool sizes, SQLite pragmas) as build_engine()."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    profile = profile or default_profile(url)
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(ENGINE_PROFILES)}")
+    settings = dict(ENGINE_PROFILES[profile])
+    pragmas = settings.pop("pragmas", None)
+    parsed = make_url(url)
+    in_memory = parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+    stats = PoolStats()
+    async_engine = create_async_engine(async_url(url), **({} if in_memory else settings))
+    async_engine.sync_engine.pool_stats = stats
+    async_engine.sync_engine.profile = profile
+    _add_listeners(async_engine.sync_engine, stats, pragmas, in_memory)
+    return async_engine
+
+
+engine = build_engine(DATABASE_URL, os.getenv("DB_PROFILE"))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def pool_status():
+    """Pool configuration, current usage and checkout/wait counters for the shared engine."""
+    pool = engine.pool
+    status = {"profile": engine.profile, "pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(), checked_in=pool.checkedin())
+    status.update(engine.pool_stats.snapshot())
+    return status
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+def init_async_engine():
+    """Create the shared AsyncEngine on first use, so sync-only deployments never import the async driver."""
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        async_engine = build_async_engine(DATABASE_URL, os.getenv("DB_PROFILE"))
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return async_engine
+
+
+async def get_async_db():
+    init_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Table
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Text, Table, Index, text, func
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 from datetime import datetime
@@ -8,7 +8,8 @@ subscription_newspapers = Table(
     'subscription_newspapers',
     Base.metadata,
     Column('subscription_id', Integer, ForeignKey('subscriptions.id'), primary_key=True),
-    Column('newspaper_id', Integer, ForeignKey('newspapers.id'), primary_key=True)
+    Column('newspaper_id', Integer, ForeignKey('newspapers.id'), primary_key=True),
+    Index('ix_subscription_newspapers_newspaper', 'newspaper_id', 'subscription_id')
 )
 
 class User(Base):
@@ -30,6 +31,10 @@ class User(Base):
     payments = relationship("Payment", back_populates="user")
     deliveries = relationship("Delivery", back_populates="user")
 
+    __table_args__ = (
+        Index('ix_users_city_pincode', 'city', 'pincode'),
+    )
+
 class Newspaper(Base):
     __tablename__ = "newspapers"
     
@@ -93,6 +98,48 @@ class Subscription(Base):
     newspapers = relationship("Newspaper", secondary=subscription_newspapers, back_populates="subscriptions")
     milk_package = relationship("MilkPackage", back_populates="subscriptions")
     deliveries = relationship("Delivery", back_populates="subscription")
+    pause_windows = relationship("PauseWindow", back_populates="subscription")
+
+    __table_args__ = (
+        Index('ix_subscriptions_user_active', 'user_id', 'is_active'),
+        Index('ix_subscriptions_active', 'id', sqlite_where=text('is_active = 1'), postgresql_where=text('is_active')),
+    )
+
+class Blackout(Base):
+    """A holiday or strike stopping deliveries for every subscription in its scope (all when unscoped)."""
+    __tablename__ = "blackouts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reason = Column(String)
+    starts_at = Column(DateTime)
+    ends_at = Column(DateTime)
+    city = Column(String, nullable=True)
+    pincode = Column(String, nullable=True)
+    newspaper_id = Column(Integer, ForeignKey("newspapers.id"), nullable=True)
+    milk_package_id = Column(Integer, ForeignKey("milk_packages.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    windows = relationship("PauseWindow", back_populates="blackout")
+
+class PauseWindow(Base):
+    """A [starts_at, ends_at) span with no deliveries for one subscription; ends_at NULL is open-ended."""
+    __tablename__ = "pause_windows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"))
+    blackout_id = Column(Integer, ForeignKey("blackouts.id"), nullable=True)
+    starts_at = Column(DateTime)
+    ends_at = Column(DateTime, nullable=True)
+    reason = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    subscription = relationship("Subscription", back_populates="pause_windows")
+    blackout = relationship("Blackout", back_populates="windows")
+
+    __table_args__ = (
+        Index('ix_pause_windows_subscription_span', 'subscription_id', 'starts_at', 'ends_at'),
+        Index('ix_pause_windows_blackout', 'blackout_id'),
+    )
 
 class Delivery(Base):
     __tablename__ = "deliveries"
@@ -105,10 +152,21 @@ class Delivery(Base):
     delivered_at = Column(DateTime, nullable=True)
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # set when a pause window or blackout cancelled it, so only those are put back on resume
+    cancelled_by_pause = Column(Boolean, default=False, nullable=False)
     
     user = relationship("User", back_populates="deliveries")
     subscription = relationship("Subscription", back_populates="deliveries")
 
+    __table_args__ = (
+        Index('ix_deliveries_subscription_date', 'subscription_id', 'scheduled_date'),
+        Index('ix_deliveries_user_date', 'user_id', 'scheduled_date'),
+        Index('ix_deliveries_scheduled_date', 'scheduled_date'),
+    )
+
+# At most one delivery per subscription per day, whatever its time of day
+Index('uq_deliveries_subscription_day', Delivery.subscription_id, func.date(Delivery.scheduled_date), unique=True)
+
 class Payment(Base):
     __tablename__ = "payments"
     
@@ -121,5 +179,96 @@ class Payment(Base):
     payment_method = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    # Set on bills from the billing run: the [period_start, period_end) the deliveries were in
+    period_start = Column(DateTime, nullable=True)
+    period_end = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="payments")
+
+    __table_args__ = (
+        Index('ix_payments_user_created', 'user_id', 'created_at'),
+        Index('uq_payments_subscription_period', 'subscription_id', 'period_start', unique=True),
+        Index('ix_payments_pending', 'created_at', sqlite_where=text("status = 'pending'"), postgresql_where=text("status = 'pending'")),
+    )
+
+class PaymentEvent(Base):
+    """A provider webhook event, stored once per (provider, event_id) and applied to payments in batches."""
+    __tablename__ = "payment_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String)
+    event_id = Column(String)
+    event_type = Column(String)
+    # the provider's id for the payment: the Razorpay order or Stripe intent in Payment.stripe_payment_id
+    object_id = Column(String, nullable=True)
+    # the Payment.status the event settles to, NULL for events that change nothing
+    payment_status = Column(String, nullable=True)
+    payload = Column(Text)
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('uq_payment_events_provider_event', 'provider', 'event_id', unique=True),
+        Index('ix_payment_events_unprocessed', 'id', sqlite_where=text('processed_at IS NULL'), postgresql_where=text('processed_at IS NULL')),
+    )
+
+class Job(Base):
+    """A unit of background work; see app/services/jobs.py for the states it moves through."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)
+    payload = Column(Text)
+    result = Column(Text, nullable=True)
+    # the user a job runs for, who alone may read its status; NULL for admin jobs
+    user_id = Column(Integer, nullable=True)
+    # higher runs first
+    priority = Column(Integer, default=0)
+    status = Column(String, default="queued")
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer)
+    run_at = Column(DateTime, default=datetime.utcnow)
+    lease_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # status first: the claim reads the queued jobs in priority order straight off this index
+        Index('ix_jobs_ready', 'status', priority.desc(), 'run_at'),
+        Index('ix_jobs_status_finished', 'status', 'finished_at'),
+    )
+
+class DailyStat(Base):
+    """Per-day totals for one city and catalog item, kept current by database triggers.
+
+    item_type is 'all' (item_id 0) for every delivery, subscription and payment of the city,
+    or 'newspaper' / 'milk' with the item's id. Payment columns are only filled on 'all' rows.
+    See app/services/analytics.py.
+    """
+    __tablename__ = "analytics_daily"
+
+    item_type = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    city = Column(String, primary_key=True)
+    new_subscriptions = Column(Integer, default=0, server_default='0')
+    deliveries_pending = Column(Integer, default=0, server_default='0')
+    deliveries_delivered = Column(Integer, default=0, server_default='0')
+    deliveries_cancelled = Column(Integer, default=0, server_default='0')
+    # by the day the payment was created, and by the day it completed
+    payments_billed = Column(Integer, default=0, server_default='0')
+    amount_billed = Column(Float, default=0, server_default='0')
+    payments_failed = Column(Integer, default=0, server_default='0')
+    payments_completed = Column(Integer, default=0, server_default='0')
+    amount_completed = Column(Float, default=0, server_default='0')
+
+class SubscriberCount(Base):
+    """Active subscriptions per city and catalog item right now, kept current by database triggers."""
+    __tablename__ = "analytics_subscribers"
+
+    item_type = Column(String, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    city = Column(String, primary_key=True)
+    active = Column(Integer, default=0, server_default='0')
@@ -0,0 +1,57 @@
+import os
+from sqlalchemy import inspect, text
+from app.database.database import engine, SessionLocal
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+# Databases created by create_all before migrations existed match this revision
+BASELINE_REVISION = "0001"
+# Set to 1 once `python scripts/init_db.py` runs as a deploy step, so workers start without it
+SKIP_DB_INIT = os.getenv("SKIP_DB_INIT", "").lower() in ("1", "true", "yes")
+# pg_advisory_xact_lock key held while migrating
+MIGRATION_LOCK_KEY = 20261018
+
+
+def alembic_config():
+    # alembic is only needed when migrating; importing it lazily keeps it off the worker start path
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_schema():
+    """Bring the database to the latest migration.
+
+    A database created by the old create_all() call (tables but no alembic_version) is stamped
+    at the baseline first, so only the later migrations run against it. On PostgreSQL a
+    transaction-scoped advisory lock makes concurrent callers migrate one at a time; the later
+    ones find the database already at head.
+    """
+    from alembic import command
+
+    config = alembic_config()
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+def init_database(seed=True):
+    """One-shot setup: run migrations, then seed the starter catalog into empty tables."""
+    from app.database.seed import seed_catalog
+
+    upgrade_schema()
+    added = {}
+    if seed:
+        db = SessionLocal()
+        try:
+            added = seed_catalog(db)
+        finally:
+            db.close()
+    return added
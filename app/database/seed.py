@@ -0,0 +1,38 @@
+from sqlalchemy.orm import Session
+from app.database import models
+
+CATALOG_NEWSPAPERS = [
+    # English: General and Business (no Sports)
+    {"name": "Times of India", "language": "English", "genre": "General", "price_daily": 5, "price_weekly": 30, "price_monthly": 120, "description": "Leading English daily"},
+    {"name": "Hindustan Times", "language": "English", "genre": "General", "price_daily": 5, "price_weekly": 30, "price_monthly": 120, "description": "Trusted English newspaper"},
+    {"name": "Economic Times", "language": "English", "genre": "Business", "price_daily": 8, "price_weekly": 50, "price_monthly": 200, "description": "Business & markets"},
+    # Marathi: only General
+    {"name": "Lokmat", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 25, "price_monthly": 100, "description": "Popular Marathi daily"},
+    {"name": "Sakal", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 25, "price_monthly": 100, "description": "Regional news and more"},
+    {"name": "Lokshahir", "language": "Marathi", "genre": "General", "price_daily": 3.5, "price_weekly": 20, "price_monthly": 80, "description": "Local coverage"},
+    {"name": "Pune Times", "language": "Marathi", "genre": "General", "price_daily": 3.5, "price_weekly": 20, "price_monthly": 80, "description": "Pune local news"},
+    {"name": "Pudhari", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 24, "price_monthly": 95, "description": "Marathi daily"},
+]
+
+CATALOG_MILK_PACKAGES = [
+    {"name": "500ml", "quantity_ml": 500, "price_daily": 20, "price_weekly": 120, "price_monthly": 400, "description": "Fresh 500ml pack"},
+    {"name": "1L", "quantity_ml": 1000, "price_daily": 35, "price_weekly": 210, "price_monthly": 700, "description": "1 litre pack"},
+    {"name": "2L", "quantity_ml": 2000, "price_daily": 65, "price_weekly": 390, "price_monthly": 1300, "description": "2 litre family pack"},
+]
+
+
+def seed_catalog(db: Session):
+    """Insert the starter newspapers and milk packages into empty catalog tables.
+
+    Each table is only touched while it is empty, so running this again is a no-op.
+    Returns how many rows were added per table.
+    """
+    added = {"newspapers": 0, "milk_packages": 0}
+    if db.query(models.Newspaper.id).first() is None:
+        db.add_all([models.Newspaper(**item) for item in CATALOG_NEWSPAPERS])
+        added["newspapers"] = len(CATALOG_NEWSPAPERS)
+    if db.query(models.MilkPackage.id).first() is None:
+        db.add_all([models.MilkPackage(**item) for item in CATALOG_MILK_PACKAGES])
+        added["milk_packages"] = len(CATALOG_MILK_PACKAGES)
+    db.commit()
+    return added
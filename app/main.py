@@ -1,22 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from app.routes import auth, newspapers, milk, subscriptions, payments, magazines
 from app.routes import admin
+from app.routes import jobs as jobs_router
 from app.routes import calendar as calendar_router
-from app.database.database import Base, engine
-import os
-from sqlalchemy.orm import Session
-from app.database import models
-from app.database.database import SessionLocal
+from app.routes import catalog as catalog_router
+from app.database.schema import init_database, SKIP_DB_INIT
+from app.database.database import engine, pool_status, DB_ASYNC, init_async_engine, SessionLocal
+from app.services.fast_json import ORJSONResponse
+from app.services.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.services.jobs import start_workers, stop_workers, queue_depth
 import logging
-
-Base.metadata.create_all(bind=engine)
+import os
 
 app = FastAPI(
     title="DailyEaze",
     description="Newspaper & Milk Delivery Management Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -25,11 +28,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
 
 if os.path.exists("frontend"):
     app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
+if DB_ASYNC:
+    # registered first, so these async handlers take the requests for their paths
+    for module in (newspapers, milk, magazines, subscriptions, payments, calendar_router):
+        app.include_router(module.async_router)
+    instrument_engine(init_async_engine().sync_engine)
+
 app.include_router(auth.router)
 app.include_router(newspapers.router)
 app.include_router(milk.router)
@@ -38,6 +50,8 @@ app.include_router(payments.router)
 app.include_router(magazines.router)
 app.include_router(admin.router)
 app.include_router(calendar_router.router)
+app.include_router(jobs_router.router)
+app.include_router(catalog_router.router)
 
 
 @app.get('/api/config')
@@ -48,49 +62,38 @@ def get_config():
     }
 
 
-@app.on_event("startup")
-def seed_initial_data():
-    db: Session = SessionLocal()
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    db = SessionLocal()
     try:
-        # Seed newspapers if none exist
-        count = db.query(models.Newspaper).count()
-        if count == 0:
-            # English: General and Business (no Sports)
-            english = [
-                {"name": "Times of India", "language": "English", "genre": "General", "price_daily": 5, "price_weekly": 30, "price_monthly": 120, "description": "Leading English daily"},
-                {"name": "Hindustan Times", "language": "English", "genre": "General", "price_daily": 5, "price_weekly": 30, "price_monthly": 120, "description": "Trusted English newspaper"},
-                {"name": "Economic Times", "language": "English", "genre": "Business", "price_daily": 8, "price_weekly": 50, "price_monthly": 200, "description": "Business & markets"}
-            ]
-
-            # Marathi: only General
-            marathi = [
-                {"name": "Lokmat", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 25, "price_monthly": 100, "description": "Popular Marathi daily"},
-                {"name": "Sakal", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 25, "price_monthly": 100, "description": "Regional news and more"},
-                {"name": "Lokshahir", "language": "Marathi", "genre": "General", "price_daily": 3.5, "price_weekly": 20, "price_monthly": 80, "description": "Local coverage"},
-                {"name": "Pune Times", "language": "Marathi", "genre": "General", "price_daily": 3.5, "price_weekly": 20, "price_monthly": 80, "description": "Pune local news"},
-                {"name": "Pudhari", "language": "Marathi", "genre": "General", "price_daily": 4, "price_weekly": 24, "price_monthly": 95, "description": "Marathi daily"}
-            ]
-
-            for item in english + marathi:
-                n = models.Newspaper(**item)
-                db.add(n)
-
-            # Seed a few milk packages if none exist
-            if db.query(models.MilkPackage).count() == 0:
-                milk_pkgs = [
-                    {"name": "500ml", "quantity_ml": 500, "price_daily": 20, "price_weekly": 120, "price_monthly": 400, "description": "Fresh 500ml pack"},
-                    {"name": "1L", "quantity_ml": 1000, "price_daily": 35, "price_weekly": 210, "price_monthly": 700, "description": "1 litre pack"},
-                    {"name": "2L", "quantity_ml": 2000, "price_daily": 65, "price_weekly": 390, "price_monthly": 1300, "description": "2 litre family pack"}
-                ]
-                for m in milk_pkgs:
-                    db.add(models.MilkPackage(**m))
-
-            db.commit()
-    except Exception as e:
-        logging.exception("Failed to seed initial data: %s", e)
-        db.rollback()
+        depth = queue_depth(db)
     finally:
         db.close()
+    return PlainTextResponse(render_metrics(pool_status(), depth), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+def initialize_database():
+    # Deployments run scripts/init_db.py once and set SKIP_DB_INIT=1 so workers start straight away
+    if not SKIP_DB_INIT:
+        try:
+            init_database()
+        except Exception as e:
+            logging.exception("Failed to initialize the database: %s", e)
+    # after the schema is in place; JOB_WORKERS=0 leaves the jobs to scripts/run_jobs.py
+    start_workers()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    stop_workers()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    if DB_ASYNC:
+        await init_async_engine().dispose()
+
 
 @app.get("/")
 def read_root():
@@ -64,13 +64,41 @@ class MagazineResponse(BaseModel):
 class SubscriptionResponse(BaseModel):
     id: int
     user_id: int
-    newspaper_id: Optional[int]
     milk_package_id: Optional[int]
     frequency: str
     is_paused: bool
     total_cost: float
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
     paused_from: Optional[datetime]
     paused_until: Optional[datetime]
+    newspapers: list[NewspaperResponse] = []
+    milk_package: Optional[MilkPackageResponse] = None
+
+    class Config:
+        from_attributes = True
+
+class PauseWindowResponse(BaseModel):
+    id: int
+    subscription_id: int
+    blackout_id: Optional[int]
+    starts_at: datetime
+    ends_at: Optional[datetime]
+    reason: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class BlackoutResponse(BaseModel):
+    id: int
+    reason: Optional[str]
+    starts_at: datetime
+    ends_at: datetime
+    city: Optional[str]
+    pincode: Optional[str]
+    newspaper_id: Optional[int]
+    milk_package_id: Optional[int]
+    created_at: datetime
 
     class Config:
         from_attributes = True
@@ -87,11 +115,15 @@ class DeliveryResponse(BaseModel):
 
 class PaymentResponse(BaseModel):
     id: int
+    subscription_id: Optional[int]
     amount: float
     status: str
+    payment_method: Optional[str]
     stripe_payment_id: Optional[str]
     created_at: datetime
     completed_at: Optional[datetime]
+    period_start: Optional[datetime] = None
+    period_end: Optional[datetime] = None
 
     class Config:
         from_attributes = True
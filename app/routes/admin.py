@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+import io
 from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.database.models import Newspaper, MilkPackage
-from app.models.schemas import NewspaperResponse, MilkPackageResponse
+from app.database.database import get_db, pool_status
+from app.database.models import Newspaper, MilkPackage, Blackout, Job
+from app.models.schemas import NewspaperResponse, MilkPackageResponse, BlackoutResponse
+from app.services.deliveries import materialize_deliveries, MAX_MATERIALIZE_DAYS
+from app.services.catalog_cache import bump_catalog_version
+from app.services.bulk_import import import_subscriptions, iter_csv_rows, iter_ndjson_rows, attach_payment_orders
+from app.services.manifests import iter_manifest, stream_csv, stream_ndjson
+from app.services.pauses import create_blackout, lift_blackout
+from app.services.billing import run_billing, month_period, previous_month
+from app.services.payment_events import reconcile_pending_payments, apply_payment_events
+from app.services.jobs import enqueue, job_status, retry_job, queue_depth
+from app.services.analytics import report_range, daily_report, item_report, city_report, rebuild_analytics
+from app.services.security import require_admin
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
 @router.post('/newspapers')
 def create_newspaper(payload: dict, db: Session = Depends(get_db)):
     n = Newspaper(**payload)
     db.add(n)
     db.commit()
+    bump_catalog_version()
     db.refresh(n)
     return n
 
@@ -22,6 +35,7 @@ def update_newspaper(id: int, payload: dict, db: Session = Depends(get_db)):
     for k, v in payload.items():
         setattr(n, k, v)
     db.commit()
+    bump_catalog_version()
     db.refresh(n)
     return n
 
@@ -32,6 +46,7 @@ def delete_newspaper(id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail='Newspaper not found')
     n.is_active = False
     db.commit()
+    bump_catalog_version()
     return {'message':'Newspaper deactivated'}
 
 # Milk package CRUD
@@ -40,6 +55,7 @@ def create_milk(payload: dict, db: Session = Depends(get_db)):
     m = MilkPackage(**payload)
     db.add(m)
     db.commit()
+    bump_catalog_version()
     db.refresh(m)
     return m
 
@@ -51,6 +67,7 @@ def update_milk(id: int, payload: dict, db: Session = Depends(get_db)):
     for k, v in payload.items():
         setattr(m, k, v)
     db.commit()
+    bump_catalog_version()
     db.refresh(m)
     return m
 
@@ -61,4 +78,188 @@ def delete_milk(id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail='Milk package not found')
     m.is_active = False
     db.commit()
+    bump_catalog_version()
     return {'message':'Milk package deactivated'}
+
+# Delivery schedule
+@router.post('/deliveries/materialize')
+def materialize_delivery_schedule(days: int = 30, start: str = None, background: bool = False, db: Session = Depends(get_db)):
+    """Create the pending deliveries; with background=true queue the run as a job instead."""
+    if days < 1 or days > MAX_MATERIALIZE_DAYS:
+        raise HTTPException(status_code=400, detail=f'days must be between 1 and {MAX_MATERIALIZE_DAYS}')
+    start_day = None
+    if start:
+        try:
+            from datetime import date
+            start_day = date.fromisoformat(start)
+        except ValueError:
+            raise HTTPException(status_code=400, detail='Invalid start date. Use YYYY-MM-DD.')
+    if background:
+        return _queued(db, 'materialize_deliveries', {'days': days, 'start': start})
+    return materialize_deliveries(db, days=days, start=start_day)
+
+# Billing
+@router.post('/billing/run')
+def run_billing_period(month: str = None, background: bool = False, db: Session = Depends(get_db)):
+    """Bill every subscription for its deliveries in `month` (YYYY-MM, default last month).
+
+    Safe to re-run: subscriptions already billed for the month are skipped. With
+    background=true the run is queued as a job.
+    """
+    try:
+        start, end = month_period(month) if month else previous_month()
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid month. Use YYYY-MM.')
+    if background:
+        return _queued(db, 'run_billing', {'start': start.isoformat(), 'end': end.isoformat()})
+    return run_billing(db, start, end)
+
+# Payment reconciliation
+@router.post('/payments/reconcile')
+def reconcile_payments(background: bool = False, db: Session = Depends(get_db)):
+    """Apply any queued webhook events, then settle stale pending payments from the providers' lists."""
+    if background:
+        return _queued(db, 'reconcile_payments')
+    return {'events': apply_payment_events(db), 'reconciled': reconcile_pending_payments(db)}
+
+@router.get('/manifests/{day}')
+def get_route_manifest(day: str, format: str = 'csv', city: str = None, pincode: str = None, db: Session = Depends(get_db)):
+    """Stream the day's stops grouped by city/pincode, each route followed by its totals."""
+    try:
+        from datetime import date
+        manifest_day = date.fromisoformat(day)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid date. Use YYYY-MM-DD.')
+    if format not in ('csv', 'ndjson'):
+        raise HTTPException(status_code=400, detail='format must be csv or ndjson')
+    records = iter_manifest(db, manifest_day, city=city, pincode=pincode)
+    if format == 'ndjson':
+        return StreamingResponse(stream_ndjson(records), media_type='application/x-ndjson')
+    return StreamingResponse(stream_csv(records), media_type='text/csv', headers={
+        'Content-Disposition': f'attachment; filename="manifest-{manifest_day.isoformat()}.csv"'
+    })
+
+# Holiday / strike blackouts
+@router.post('/blackouts')
+def create_blackout_window(payload: dict, db: Session = Depends(get_db)):
+    """Pause every active subscription in scope for the days from..to (inclusive).
+
+    Scope by any of city, pincode, newspaper_id and milk_package_id; with none, every active
+    subscription is paused. Pending deliveries inside the window are cancelled.
+    """
+    from datetime import date
+    try:
+        starts_on = date.fromisoformat(payload.get('from') or '')
+        ends_on = date.fromisoformat(payload.get('to') or payload.get('from') or '')
+    except ValueError:
+        raise HTTPException(status_code=400, detail='from (and optionally to) must be YYYY-MM-DD')
+    if ends_on < starts_on:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    return create_blackout(
+        db, starts_on, ends_on, payload.get('reason') or 'blackout',
+        city=payload.get('city'), pincode=payload.get('pincode'),
+        newspaper_id=payload.get('newspaper_id'), milk_package_id=payload.get('milk_package_id')
+    )
+
+@router.get('/blackouts', response_model=list[BlackoutResponse])
+def list_blackouts(db: Session = Depends(get_db)):
+    return db.query(Blackout).order_by(Blackout.starts_at.desc(), Blackout.id.desc()).all()
+
+@router.delete('/blackouts/{id}')
+def delete_blackout(id: int, db: Session = Depends(get_db)):
+    """Lift a blackout: drop its windows and restore the deliveries it cancelled."""
+    blackout = db.query(Blackout).filter(Blackout.id == id).first()
+    if not blackout:
+        raise HTTPException(status_code=404, detail='Blackout not found')
+    return lift_blackout(db, blackout)
+
+# Bulk onboarding
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+@router.post('/import/subscriptions')
+def import_subscriptions_file(file: UploadFile = File(...), format: str = None, db: Session = Depends(get_db)):
+    """Import customers and subscriptions from a CSV or NDJSON upload (see app/services/bulk_import.py)."""
+    fmt = format or ('ndjson' if (file.filename or '').lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        raise HTTPException(status_code=400, detail='format must be csv or ndjson')
+    lines = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    rows = iter_csv_rows(lines) if fmt == 'csv' else iter_ndjson_rows(lines)
+    summary = import_subscriptions(db, rows)
+    summary['errors_truncated'] = len(summary['errors']) > MAX_REPORTED_IMPORT_ERRORS
+    summary['errors'] = summary['errors'][:MAX_REPORTED_IMPORT_ERRORS]
+    return summary
+
+@router.post('/import/payment-orders')
+def create_import_payment_orders(limit: int = 500, db: Session = Depends(get_db)):
+    """Create gateway orders for imported subscriptions whose payments are still pending."""
+    return attach_payment_orders(db, limit=limit)
+
+# Background jobs
+def _queued(db, kind, payload=None):
+    queued_job = enqueue(db, kind, payload)
+    db.commit()
+    return {'job_id': queued_job.id, 'status': queued_job.status}
+
+@router.get('/jobs')
+def list_jobs(status: str = 'dead', limit: int = 50, db: Session = Depends(get_db)):
+    """Most recent jobs in a status (default the dead letters), with queue depth per kind."""
+    jobs = db.query(Job).filter(Job.status == status).order_by(Job.id.desc()).limit(min(limit, 500)).all()
+    depth = [{'kind': kind, 'status': job_state, 'count': count} for (kind, job_state), count in sorted(queue_depth(db).items())]
+    return {'depth': depth, 'jobs': [job_status(j) for j in jobs]}
+
+@router.post('/jobs/{id}/retry')
+def retry_dead_job(id: int, db: Session = Depends(get_db)):
+    """Queue a dead-lettered job again with a fresh set of attempts."""
+    if not retry_job(db, id):
+        raise HTTPException(status_code=404, detail='No dead job with that id')
+    return {'job_id': id, 'status': 'queued'}
+
+# Analytics, from the summary tables
+def _report_range(from_date, to_date):
+    from datetime import date
+    try:
+        start = date.fromisoformat(from_date) if from_date else None
+        end = date.fromisoformat(to_date) if to_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid date. Use YYYY-MM-DD.')
+    try:
+        return report_range(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get('/analytics/daily')
+def get_daily_analytics(from_date: str = Query(None, alias='from'), to_date: str = Query(None, alias='to'),
+                        city: str = None, db: Session = Depends(get_db)):
+    """Per-day subscriptions, deliveries by status and revenue (default the last 30 days)."""
+    return daily_report(db, *_report_range(from_date, to_date), city=city)
+
+@router.get('/analytics/newspapers')
+def get_newspaper_analytics(from_date: str = Query(None, alias='from'), to_date: str = Query(None, alias='to'),
+                            city: str = None, db: Session = Depends(get_db)):
+    """Active subscribers now, and new subscribers and deliveries in the range, per newspaper."""
+    return item_report(db, 'newspaper', *_report_range(from_date, to_date), city=city)
+
+@router.get('/analytics/milk')
+def get_milk_analytics(from_date: str = Query(None, alias='from'), to_date: str = Query(None, alias='to'),
+                       city: str = None, db: Session = Depends(get_db)):
+    """Per milk package: subscribers, deliveries and the volume delivered and still scheduled."""
+    return item_report(db, 'milk', *_report_range(from_date, to_date), city=city)
+
+@router.get('/analytics/cities')
+def get_city_analytics(from_date: str = Query(None, alias='from'), to_date: str = Query(None, alias='to'),
+                       db: Session = Depends(get_db)):
+    """Subscribers, deliveries, completion rate and revenue per city."""
+    return city_report(db, *_report_range(from_date, to_date))
+
+@router.post('/analytics/rebuild')
+def rebuild_analytics_tables(background: bool = False, db: Session = Depends(get_db)):
+    """Recompute the summary tables from scratch; with background=true queue it as a job."""
+    if background:
+        return _queued(db, 'rebuild_analytics')
+    return rebuild_analytics(db)
+
+# Diagnostics
+@router.get('/db/pool')
+def get_pool_status():
+    """Engine profile, connection pool usage and checkout wait statistics."""
+    return pool_status()
@@ -1,31 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database.database import get_db
 from app.database.models import User
 from app.models.schemas import UserCreate, UserResponse
-import bcrypt
+from app.services.security import (
+    hash_password_pooled, verify_password_pooled, create_access_token, get_current_user, user_access,
+    PasswordHasherBusy, TOKEN_TTL_MINUTES
+)
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
-def hash_password(password: str) -> str:
-    # Hash password using bcrypt, limiting to 72 bytes
-    password_bytes = password[:72].encode('utf-8')
-    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=12)).decode('utf-8')
+def _user_by_email(db, email):
+    return db.query(User).filter(User.email == email).first()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # Verify password using bcrypt
-    plain_password_bytes = plain_password[:72].encode('utf-8')
-    hashed_password_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
 
+def _add_user(db, new_user):
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+
+
+# register and login are async so a request waiting for bcrypt holds no threadpool thread;
+# their short DB steps still run in the threadpool
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     try:
-        db_user = db.query(User).filter(User.email == user.email).first()
+        db_user = await run_in_threadpool(_user_by_email, db, user.email)
         if db_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        hashed_password = hash_password(user.password)
+        hashed_password = await hash_password_pooled(user.password)
         new_user = User(
             email=user.email,
             password_hash=hashed_password,
@@ -35,9 +40,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             city=user.city,
             pincode=user.pincode
         )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await run_in_threadpool(_add_user, db, new_user)
         
         return {
             "id": new_user.id,
@@ -51,25 +54,40 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             "is_admin": new_user.is_admin,
             "message": "Registration successful"
         }
+    except HTTPException:
+        raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login")
-def login(email: str, password: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+async def login(email: str, password: str, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_user_by_email, db, email)
+    try:
+        if not user or not user.password_hash or not await verify_password_pooled(password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     
     return {
         "user_id": user.id,
         "email": user.email,
         "full_name": user.full_name,
         "is_admin": user.is_admin,
+        "access_token": create_access_token(user.id, user.is_admin),
+        "token_type": "bearer",
+        "expires_in": TOKEN_TTL_MINUTES * 60,
         "message": "Login successful"
     }
 
-@router.get("/user/{user_id}", response_model=UserResponse)
+@router.get("/me")
+def get_me(current_user: dict = Depends(get_current_user)):
+    """Claims of the bearer token; checked by signature only, no password or DB lookup."""
+    return current_user
+
+@router.get("/user/{user_id}", response_model=UserResponse, dependencies=[Depends(user_access)])
 def get_user(user_id: int, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
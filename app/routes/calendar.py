@@ -1,33 +1,83 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Path
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime
+from functools import lru_cache
 import calendar
+from app.database.database import get_db, get_async_db
+from app.services.fast_json import ORJSONResponse
+from app.services.security import user_access
+from app.services.month_view import month_grid, month_view_select, build_month_view
 
 router = APIRouter()
 
+# Grids and text calendars never change for a given year/month
+IMMUTABLE = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+Year = Path(..., ge=1, le=9999)
+Month = Path(..., ge=1, le=12)
+
 
 @router.get("/api/calendar/structured/{year}")
-def get_structured_calendar(year: int):
+def get_structured_calendar(year: int = Year):
     """Return a structured calendar for the given year.
     Response format:
     { "year": 2025, "months": [ {"month":1, "name":"January", "weeks": [[0,0,1,2,3,4,5], ... ] }, ... ] }
     """
-    cal = calendar.Calendar(firstweekday=0)  # Monday=0 by default
     months = []
-    month_names = [calendar.month_name[i] for i in range(1,13)]
     for m in range(1, 13):
-        weeks = calendar.monthcalendar(year, m)
-        months.append({
-            "month": m,
-            "name": month_names[m-1],
-            "weeks": weeks
-        })
+        grid = month_grid(year, m)  # memoized, so only the first request for a year builds it
+        months.append({"month": m, "name": grid.name, "weeks": grid.weeks})
+    return ORJSONResponse({"year": year, "months": months}, headers=IMMUTABLE)
+
+
+@router.get("/api/calendar/grid/{year}/{month}")
+def get_month_grid(year: int = Year, month: int = Month):
+    """The week grid of one month (Monday first, 0 outside the month) and its weekend days."""
+    return ORJSONResponse(month_grid(year, month)._asdict(), headers=IMMUTABLE)
 
-    return {"year": year, "months": months}
+
+@lru_cache(maxsize=64)
+def _text_calendar(year):
+    return calendar.calendar(year, w=3, l=1, c=6)
 
 
 @router.get("/api/calendar/text/{year}")
-def get_text_calendar(year: int):
+def get_text_calendar(year: int = Year):
     """Return a formatted text calendar for the year (same as Python calendar.calendar).
     Useful for display or download.
     """
-    txt = calendar.calendar(year, w=3, l=1, c=6)
-    return {"year": year, "text": txt}
+    return ORJSONResponse({"year": year, "text": _text_calendar(year)}, headers=IMMUTABLE)
+
+
+def _month_param(month):
+    if not month:
+        return month_grid(datetime.utcnow().year, datetime.utcnow().month)
+    try:
+        first = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month. Use YYYY-MM.")
+    return month_grid(first.year, first.month)
+
+
+@router.get("/api/calendar/month/{user_id}", dependencies=[Depends(user_access)])
+def get_month_view(user_id: int, month: str = None, db: Session = Depends(get_db)):
+    """A user's month in one call: the week grid, and per day the scheduled deliveries, the
+    pause windows (own or blackout) covering it and the price of that day's deliveries at the
+    weekday or weekend rate.
+
+    `month` is YYYY-MM and defaults to the current month. Cancelled deliveries are listed but
+    not priced.
+    """
+    grid = _month_param(month)
+    return build_month_view(user_id, grid, db.execute(month_view_select(user_id, grid)).all())
+
+
+# Served in place of the matching route above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter()
+
+
+@async_router.get("/api/calendar/month/{user_id}", dependencies=[Depends(user_access)])
+async def get_month_view_async(user_id: int, month: str = None, db: AsyncSession = Depends(get_async_db)):
+    grid = _month_param(month)
+    return build_month_view(user_id, grid, (await db.execute(month_view_select(user_id, grid))).all())
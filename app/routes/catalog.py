@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database.database import get_db
+from app.services.fast_json import ORJSONResponse
+from app.services.catalog_search import catalog_index, KINDS, MAX_RESULTS, MAX_QUERY_LENGTH
+
+router = APIRouter(prefix="/api/catalog", tags=["catalog"])
+
+
+@router.get("/search")
+def search_catalog(
+    q: str = Query("", max_length=MAX_QUERY_LENGTH),
+    kind: list[str] = Query(None),
+    language: list[str] = Query(None),
+    genre: list[str] = Query(None),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    complementary: bool = None,
+    limit: int = Query(20, ge=1, le=MAX_RESULTS),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Search newspapers, magazines and milk packages by name, with facet counts.
+
+    Each word of `q` (up to the first eight) matches the start of a word in the name,
+    allowing a typo or two in longer words. `kind`, `language` and `genre` may be repeated
+    to allow several values.
+    """
+    if kind and not set(kind) <= set(KINDS):
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    if min_price is not None and max_price is not None and max_price < min_price:
+        raise HTTPException(status_code=400, detail="max_price must not be below min_price")
+    result = catalog_index(db).search(
+        q, {"kind": kind, "language": language, "genre": genre},
+        min_price=min_price, max_price=max_price, complementary=complementary, limit=limit, offset=offset,
+    )
+    return ORJSONResponse({"query": q, **result})
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database.database import get_db
+from app.database.models import Job
+from app.services.jobs import job_status
+from app.services.security import get_current_user
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """A background job's status, and its result once done; poll until status is done or dead.
+
+    Only the user the job runs for (or an admin) can see it; anyone else gets a 404, so the
+    sequential ids reveal nothing about other users' checkouts.
+    """
+    queued_job = db.query(Job).filter(Job.id == job_id).first()
+    if not queued_job or not (current_user["is_admin"] or queued_job.user_id == current_user["user_id"]):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(queued_job)
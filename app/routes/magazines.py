@@ -1,21 +1,43 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.database.models import Magazine
 from app.models.schemas import MagazineResponse
+from app.services.fast_json import columns, as_dicts
+from app.services.catalog_cache import catalog_response, catalog_response_async, row_dict
 
 router = APIRouter(prefix="/api/magazines", tags=["magazines"])
 
+# the MagazineResponse columns of active rows, serialized without loading ORM objects
+LIST_COLUMNS = columns(Magazine, MagazineResponse)
+LIST_KEYS = [column.key for column in LIST_COLUMNS]
+LIST_SELECT = select(*LIST_COLUMNS).where(Magazine.is_active == True)
+
 @router.get("/", response_model=list[MagazineResponse])
-def get_magazines(db: Session = Depends(get_db)):
-    magazines = db.query(Magazine).filter(Magazine.is_active == True).all()
-    return magazines
+def get_magazines(request: Request, db: Session = Depends(get_db)):
+    def load():
+        return as_dicts(db.execute(LIST_SELECT).all(), LIST_KEYS)
+    return catalog_response(request, "magazines", load)
+
+@router.get("/complementary/{language}", deprecated=True)
+def get_complementary_magazines(language: str, request: Request, db: Session = Depends(get_db)):
+    def load():
+        magazines = db.query(Magazine).filter(
+            Magazine.language == language,
+            Magazine.is_complementary == True,
+            Magazine.is_active == True
+        ).all()
+        return [row_dict(m) for m in magazines]
+    return catalog_response(request, ("magazines:complementary", language), load)
+
+
+# Served in place of the list route above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter(prefix="/api/magazines", tags=["magazines"])
 
-@router.get("/complementary/{language}")
-def get_complementary_magazines(language: str, db: Session = Depends(get_db)):
-    magazines = db.query(Magazine).filter(
-        Magazine.language == language,
-        Magazine.is_complementary == True,
-        Magazine.is_active == True
-    ).all()
-    return magazines
+@async_router.get("/", response_model=list[MagazineResponse])
+async def get_magazines_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return as_dicts((await db.execute(LIST_SELECT)).all(), LIST_KEYS)
+    return await catalog_response_async(request, "magazines", load)
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.database.models import MilkPackage
 from app.models.schemas import MilkPackageResponse
+from app.services.fast_json import columns, as_dicts
+from app.services.catalog_cache import catalog_response, catalog_response_async
 
 router = APIRouter(prefix="/api/milk", tags=["milk"])
 
+# the MilkPackageResponse columns of active rows, serialized without loading ORM objects
+LIST_COLUMNS = columns(MilkPackage, MilkPackageResponse)
+LIST_KEYS = [column.key for column in LIST_COLUMNS]
+LIST_SELECT = select(*LIST_COLUMNS).where(MilkPackage.is_active == True)
+
 @router.get("/", response_model=list[MilkPackageResponse])
-def get_milk_packages(db: Session = Depends(get_db)):
-    packages = db.query(MilkPackage).filter(MilkPackage.is_active == True).all()
-    return packages
+def get_milk_packages(request: Request, db: Session = Depends(get_db)):
+    def load():
+        return as_dicts(db.execute(LIST_SELECT).all(), LIST_KEYS)
+    return catalog_response(request, "milk", load)
 
 @router.get("/{package_id}", response_model=MilkPackageResponse)
 def get_milk_package(package_id: int, db: Session = Depends(get_db)):
@@ -17,3 +27,13 @@ def get_milk_package(package_id: int, db: Session = Depends(get_db)):
     if not package:
         raise HTTPException(status_code=404, detail="Milk package not found")
     return package
+
+
+# Served in place of the list route above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter(prefix="/api/milk", tags=["milk"])
+
+@async_router.get("/", response_model=list[MilkPackageResponse])
+async def get_milk_packages_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return as_dicts((await db.execute(LIST_SELECT)).all(), LIST_KEYS)
+    return await catalog_response_async(request, "milk", load)
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.database.models import Newspaper
 from app.models.schemas import NewspaperResponse
+from app.services.fast_json import columns, as_dicts
+from app.services.catalog_cache import catalog_response, catalog_response_async, row_dict
 
 router = APIRouter(prefix="/api/newspapers", tags=["newspapers"])
 
+# the NewspaperResponse columns of active rows, serialized without loading ORM objects
+LIST_COLUMNS = columns(Newspaper, NewspaperResponse)
+LIST_KEYS = [column.key for column in LIST_COLUMNS]
+LIST_SELECT = select(*LIST_COLUMNS).where(Newspaper.is_active == True)
+
 @router.get("/", response_model=list[NewspaperResponse])
-def get_newspapers(db: Session = Depends(get_db)):
-    newspapers = db.query(Newspaper).filter(Newspaper.is_active == True).all()
-    return newspapers
+def get_newspapers(request: Request, db: Session = Depends(get_db)):
+    def load():
+        return as_dicts(db.execute(LIST_SELECT).all(), LIST_KEYS)
+    return catalog_response(request, "newspapers", load)
 
 @router.get("/{newspaper_id}", response_model=NewspaperResponse)
 def get_newspaper(newspaper_id: int, db: Session = Depends(get_db)):
@@ -18,18 +28,32 @@ def get_newspaper(newspaper_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Newspaper not found")
     return newspaper
 
-@router.get("/language/{language}")
-def get_newspapers_by_language(language: str, db: Session = Depends(get_db)):
-    newspapers = db.query(Newspaper).filter(
-        Newspaper.language == language,
-        Newspaper.is_active == True
-    ).all()
-    return newspapers
-
-@router.get("/genre/{genre}")
-def get_newspapers_by_genre(genre: str, db: Session = Depends(get_db)):
-    newspapers = db.query(Newspaper).filter(
-        Newspaper.genre == genre,
-        Newspaper.is_active == True
-    ).all()
-    return newspapers
+@router.get("/language/{language}", deprecated=True)
+def get_newspapers_by_language(language: str, request: Request, db: Session = Depends(get_db)):
+    def load():
+        newspapers = db.query(Newspaper).filter(
+            Newspaper.language == language,
+            Newspaper.is_active == True
+        ).all()
+        return [row_dict(n) for n in newspapers]
+    return catalog_response(request, ("newspapers:language", language), load)
+
+@router.get("/genre/{genre}", deprecated=True)
+def get_newspapers_by_genre(genre: str, request: Request, db: Session = Depends(get_db)):
+    def load():
+        newspapers = db.query(Newspaper).filter(
+            Newspaper.genre == genre,
+            Newspaper.is_active == True
+        ).all()
+        return [row_dict(n) for n in newspapers]
+    return catalog_response(request, ("newspapers:genre", genre), load)
+
+
+# Served in place of the list route above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter(prefix="/api/newspapers", tags=["newspapers"])
+
+@async_router.get("/", response_model=list[NewspaperResponse])
+async def get_newspapers_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return as_dicts((await db.execute(LIST_SELECT)).all(), LIST_KEYS)
+    return await catalog_response_async(request, "newspapers", load)
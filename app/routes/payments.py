@@ -1,26 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.database.models import Payment
 from app.models.schemas import PaymentResponse
-import stripe
+from app.services.gateways import stripe_gateway
+from app.services.fast_json import ORJSONResponse, columns, as_dicts
+from app.services.security import get_current_user, user_access, authorize_user
+from app.services.payment_events import (
+    InvalidWebhook, verify_stripe_signature, verify_razorpay_signature, parse_stripe_event, parse_razorpay_event,
+    record_event, schedule_drain
+)
 import os
-import razorpay
+import base64
 import hashlib
 import hmac
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/payments", tags=["payments"])
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_your_key_here")
-
-@router.post("/create-payment-intent")
+@router.post("/create-payment-intent", dependencies=[Depends(user_access)])
 def create_payment_intent(amount: float, user_id: int, subscription_id: int = None, db: Session = Depends(get_db)):
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=int(amount * 100),
-            currency="inr",
-            metadata={"user_id": user_id, "subscription_id": subscription_id}
-        )
+        intent = stripe_gateway.create_payment_intent(amount, {"user_id": user_id, "subscription_id": subscription_id})
         
         payment = Payment(
             user_id=user_id,
@@ -38,13 +42,17 @@ def create_payment_intent(amount: float, user_id: int, subscription_id: int = No
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/confirm-payment/{payment_id}")
-def confirm_payment(payment_id: int, db: Session = Depends(get_db)):
+def confirm_payment(payment_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     payment = db.query(Payment).filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    authorize_user(current_user, payment.user_id)
+    if payment.status == "completed":
+        # already settled by a webhook or the reconciliation sweep; no need to ask Stripe
+        return {"status": "Payment completed successfully"}
     
     try:
-        intent = stripe.PaymentIntent.retrieve(payment.stripe_payment_id)
+        intent = stripe_gateway.retrieve_payment_intent(payment.stripe_payment_id)
         
         if intent.status == "succeeded":
             payment.status = "completed"
@@ -59,13 +67,110 @@ def confirm_payment(payment_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/history/{user_id}", response_model=list[PaymentResponse])
-def get_payment_history(user_id: int, db: Session = Depends(get_db)):
-    payments = db.query(Payment).filter(Payment.user_id == user_id).all()
-    return payments
+PAYMENTS_PAGE_SIZE = 50
+MAX_PAYMENTS_PAGE_SIZE = 500
+
+
+def _encode_cursor(payment):
+    return base64.urlsafe_b64encode(f"{payment.created_at.isoformat()}|{payment.id}".encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, payment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _history_filters(user_id, status, method, from_date, to_date):
+    """WHERE clauses shared by the history page and its summary."""
+    filters = [Payment.user_id == user_id]
+    if status:
+        filters.append(Payment.status == status)
+    if method:
+        filters.append(Payment.payment_method == method)
+    try:
+        if from_date:
+            filters.append(Payment.created_at >= datetime.fromisoformat(from_date))
+        if to_date:
+            # inclusive of the whole 'to' day
+            filters.append(Payment.created_at < datetime.fromisoformat(to_date) + timedelta(days=1))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date. Use from/to as YYYY-MM-DD.")
+    return filters
+
+
+@router.get("/history/{user_id}", response_model=list[PaymentResponse], dependencies=[Depends(user_access)])
+def get_payment_history(
+    user_id: int,
+    status: str = None,
+    method: str = None,
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    cursor: str = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(PAYMENTS_PAGE_SIZE, ge=1, le=MAX_PAYMENTS_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """A user's payments, newest first, optionally filtered by status, method and date range.
+
+    Keyset-paginated on (created_at, id): each page seeks straight to the cursor on the
+    (user_id, created_at) index, so page 100 costs the same as page 1. When more remain, the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    rows = db.execute(_history_select(user_id, status, method, from_date, to_date, cursor, limit)).all()
+    return _history_page(rows, limit)
+
+
+# exactly the PaymentResponse fields, serialized without loading ORM objects
+HISTORY_COLUMNS = columns(Payment, PaymentResponse)
+HISTORY_KEYS = [column.key for column in HISTORY_COLUMNS]
+
+
+def _history_select(user_id, status, method, from_date, to_date, cursor, limit):
+    query = select(*HISTORY_COLUMNS).where(*_history_filters(user_id, status, method, from_date, to_date))
+    if cursor:
+        created_at, payment_id = _decode_cursor(cursor)
+        # the plain upper bound lets the index seek to the cursor; the OR breaks created_at ties
+        query = query.where(Payment.created_at <= created_at, or_(
+            Payment.created_at < created_at,
+            and_(Payment.created_at == created_at, Payment.id < payment_id),
+        ))
+    return query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit + 1)
+
+
+def _history_page(rows, limit):
+    """The page as JSON straight from the row tuples, with X-Next-Cursor when more remain."""
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return ORJSONResponse(as_dicts(rows, HISTORY_KEYS), headers=headers)
+
+
+@router.get("/history/{user_id}/summary", dependencies=[Depends(user_access)])
+def get_payment_summary(
+    user_id: int,
+    status: str = None,
+    method: str = None,
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Payment count and amount per status for the same filters as the history, aggregated in SQL."""
+    rows = db.query(Payment.status, func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0)).filter(
+        *_history_filters(user_id, status, method, from_date, to_date)
+    ).group_by(Payment.status).all()
+    by_status = {row_status: {"count": count, "amount": round(amount, 2)} for row_status, count, amount in rows}
+    return {
+        "user_id": user_id,
+        "by_status": by_status,
+        "count": sum(s["count"] for s in by_status.values()),
+        "amount": round(sum(s["amount"] for s in by_status.values()), 2),
+    }
 
 @router.post("/verify-razorpay")
-def verify_razorpay_payment(payload: dict = Body(...), db: Session = Depends(get_db)):
+def verify_razorpay_payment(payload: dict = Body(...), db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Verify Razorpay payment signature and mark payment as completed."""
     payment_id = payload.get('payment_id')
     razorpay_payment_id = payload.get('razorpay_payment_id')
@@ -78,6 +183,9 @@ def verify_razorpay_payment(payload: dict = Body(...), db: Session = Depends(get
     payment = db.query(Payment).filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    authorize_user(current_user, payment.user_id)
+    if payment.status == "completed":
+        return {"status": "Payment verified and completed successfully"}
     
     # Verify signature
     secret = os.getenv('RAZORPAY_SECRET_KEY', '')
@@ -102,4 +210,58 @@ def verify_razorpay_payment(payload: dict = Body(...), db: Session = Depends(get
     payment.completed_at = datetime.utcnow()
     db.commit()
     
-    return {"status": "Payment verified and completed successfully"}
\ No newline at end of file
+    return {"status": "Payment verified and completed successfully"}
+
+
+async def _receive_webhook(request: Request, db: Session, provider, verify, parse):
+    body = await request.body()
+    try:
+        verify(body)
+        event_id, event_type, object_id, status = parse(body)
+    except InvalidWebhook as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    new = await run_in_threadpool(record_event, db, provider, event_id, event_type, object_id, status, body)
+    if new:
+        schedule_drain()
+    return {"received": True, "duplicate": not new}
+
+
+@router.post("/webhooks/stripe")
+async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+    """Stripe event endpoint: verified with STRIPE_WEBHOOK_SECRET, stored once per event id,
+    applied to payments in batches in the background."""
+    return await _receive_webhook(
+        request, db, "stripe",
+        lambda body: verify_stripe_signature(body, request.headers.get("Stripe-Signature")),
+        parse_stripe_event
+    )
+
+
+@router.post("/webhooks/razorpay")
+async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
+    """Razorpay event endpoint: verified with RAZORPAY_WEBHOOK_SECRET, stored once per event id,
+    applied to payments in batches in the background."""
+    return await _receive_webhook(
+        request, db, "razorpay",
+        lambda body: verify_razorpay_signature(body, request.headers.get("X-Razorpay-Signature")),
+        lambda body: parse_razorpay_event(body, request.headers.get("X-Razorpay-Event-Id"))
+    )
+
+
+# Served in place of the history route above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter(prefix="/api/payments", tags=["payments"])
+
+
+@async_router.get("/history/{user_id}", response_model=list[PaymentResponse], dependencies=[Depends(user_access)])
+async def get_payment_history_async(
+    user_id: int,
+    status: str = None,
+    method: str = None,
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    cursor: str = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(PAYMENTS_PAGE_SIZE, ge=1, le=MAX_PAYMENTS_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = (await db.execute(_history_select(user_id, status, method, from_date, to_date, cursor, limit))).all()
+    return _history_page(rows, limit)
@@ -1,74 +1,287 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
-from app.database.database import get_db
-from app.database.models import Subscription, Delivery
-from app.models.schemas import SubscriptionResponse
-import stripe
-import os
-from app.database.models import Newspaper, MilkPackage, Payment
+from datetime import datetime, date, timedelta
+from app.database.database import get_db, get_async_db
+from app.database.models import Subscription, Delivery, PauseWindow
+from app.models.schemas import SubscriptionResponse, PauseWindowResponse, NewspaperResponse, MilkPackageResponse
+from app.database.models import Newspaper, MilkPackage, Payment, subscription_newspapers
+from app.services.jobs import enqueue
+from app.services.security import get_current_user, user_access, authorize_user
+from app.services.pauses import pause_subscriptions, is_active_on, day_bounds, end_pause_windows
+from app.services.deliveries import apply_delivery_changes
+from app.services.fast_json import ORJSONResponse, columns, dumps
+from app.services.pricing import (
+    price_subscription, price_subscriptions, milk_price_table, frequency_index
+)
 
 router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 
-@router.get("/{user_id}", response_model=list[SubscriptionResponse])
-def get_user_subscriptions(user_id: int, db: Session = Depends(get_db)):
-    subscriptions = db.query(Subscription).filter(
+SUBSCRIPTIONS_PAGE_SIZE = 50
+MAX_SUBSCRIPTIONS_PAGE_SIZE = 500
+
+
+def subscription_access(subscription_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Dependency for the /{subscription_id}/... routes: only the subscription's owner or an admin."""
+    owner = db.execute(select(Subscription.user_id).where(Subscription.id == subscription_id)).first()
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    authorize_user(current_user, owner.user_id)
+    return current_user
+
+
+@router.get("/{user_id}", response_model=list[SubscriptionResponse], dependencies=[Depends(user_access)])
+def get_user_subscriptions(
+    user_id: int,
+    cursor: int = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(SUBSCRIPTIONS_PAGE_SIZE, ge=1, le=MAX_SUBSCRIPTIONS_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Active subscriptions with their newspapers and milk package, oldest first.
+
+    Two queries per page however many subscriptions it holds: the subscriptions joined to
+    their milk package, then every page's newspapers in one IN query. When more remain, the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    rows, headers = _subscriptions_page(db.execute(_subscriptions_select(user_id, cursor, limit)).all(), limit)
+    newspapers = db.execute(_page_newspapers_select(rows)).all() if rows else []
+    return ORJSONResponse(_subscriptions_body(rows, newspapers), headers=headers)
+
+
+# Subscriptions are serialized straight from row tuples: the subscription's SubscriptionResponse
+# columns followed by its milk package's (all NULL without one), then the page's newspapers.
+SUBSCRIPTION_COLUMNS = columns(Subscription, SubscriptionResponse)
+SUBSCRIPTION_KEYS = [column.key for column in SUBSCRIPTION_COLUMNS]
+MILK_COLUMNS = columns(MilkPackage, MilkPackageResponse)
+MILK_KEYS = [column.key for column in MILK_COLUMNS]
+NEWSPAPER_COLUMNS = columns(Newspaper, NewspaperResponse)
+NEWSPAPER_KEYS = [column.key for column in NEWSPAPER_COLUMNS]
+
+
+def _subscriptions_select(user_id, cursor, limit):
+    query = select(*SUBSCRIPTION_COLUMNS, *MILK_COLUMNS).select_from(Subscription).outerjoin(
+        MilkPackage, MilkPackage.id == Subscription.milk_package_id
+    ).where(
         Subscription.user_id == user_id,
         Subscription.is_active == True
-    ).all()
-    return subscriptions
+    )
+    if cursor is not None:
+        query = query.where(Subscription.id > cursor)
+    # one extra row tells whether another page follows
+    return query.order_by(Subscription.id).limit(limit + 1)
+
 
-@router.post("/{subscription_id}/pause")
-def pause_subscription(subscription_id: int, pause_days: int = 7, db: Session = Depends(get_db)):
+def _page_newspapers_select(rows):
+    """Every newspaper of the page's subscriptions in one IN query."""
+    return select(subscription_newspapers.c.subscription_id, *NEWSPAPER_COLUMNS).join(
+        Newspaper, Newspaper.id == subscription_newspapers.c.newspaper_id
+    ).where(
+        subscription_newspapers.c.subscription_id.in_([row[0] for row in rows])
+    ).order_by(subscription_newspapers.c.subscription_id, Newspaper.id)
+
+
+def _subscriptions_page(rows, limit):
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1][0])
+    return rows, headers
+
+
+def _subscriptions_body(rows, newspaper_rows):
+    newspapers = {}
+    for subscription_id, *newspaper in newspaper_rows:
+        newspapers.setdefault(subscription_id, []).append(dict(zip(NEWSPAPER_KEYS, newspaper)))
+    split = len(SUBSCRIPTION_KEYS)
+    body = []
+    for row in rows:
+        subscription = dict(zip(SUBSCRIPTION_KEYS, row[:split]))
+        milk = row[split:]
+        subscription["newspapers"] = newspapers.get(subscription["id"], [])
+        subscription["milk_package"] = dict(zip(MILK_KEYS, milk)) if milk[0] is not None else None
+        body.append(subscription)
+    return body
+
+def _parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date. Use YYYY-MM-DD.")
+
+
+MAX_PAUSE_DAYS = 366
+
+
+@router.post("/{subscription_id}/pause", dependencies=[Depends(subscription_access)])
+def pause_subscription(
+    subscription_id: int,
+    pause_days: int = Query(7, ge=1, le=MAX_PAUSE_DAYS),
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    reason: str = "pause",
+    db: Session = Depends(get_db)
+):
+    """Pause for `pause_days` from now, or for the days from..to (inclusive) when given.
+
+    Adds a pause window (a subscription can have several) and cancels the pending deliveries
+    inside it.
+    """
     subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
-    
-    from datetime import timedelta
-    pause_until = datetime.utcnow() + timedelta(days=pause_days)
-    
-    subscription.is_paused = True
-    subscription.paused_from = datetime.utcnow()
-    subscription.paused_until = pause_until
-    
+
+    if from_date or to_date:
+        if not (from_date and to_date):
+            raise HTTPException(status_code=400, detail="Give both from and to, or neither")
+        pause_from, _ = day_bounds(_parse_day(from_date, "from"))
+        _, pause_until = day_bounds(_parse_day(to_date, "to"))
+        if pause_until <= pause_from:
+            raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    else:
+        pause_from = datetime.utcnow()
+        pause_until = pause_from + timedelta(days=pause_days)
+
+    result = pause_subscriptions(
+        db, select(Subscription.id).where(Subscription.id == subscription_id), pause_from, pause_until, reason
+    )
+    if pause_from <= datetime.utcnow():
+        subscription.is_paused = True
+        subscription.paused_from = pause_from
+        subscription.paused_until = pause_until
     db.commit()
-    db.refresh(subscription)
-    return {"message": "Subscription paused", "paused_until": pause_until}
+    return {"message": "Subscription paused", "paused_from": pause_from, "paused_until": pause_until, **result}
 
-@router.post("/{subscription_id}/resume")
+@router.post("/{subscription_id}/resume", dependencies=[Depends(subscription_access)])
 def resume_subscription(subscription_id: int, db: Session = Depends(get_db)):
     subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
-    
+
+    result = end_pause_windows(db, subscription_id)
     subscription.is_paused = False
     subscription.paused_from = None
     subscription.paused_until = None
-    
+
     db.commit()
-    db.refresh(subscription)
-    return {"message": "Subscription resumed"}
+    return {"message": "Subscription resumed", **result}
 
-@router.get("/calendar/{user_id}")
-def get_delivery_calendar(user_id: int, db: Session = Depends(get_db)):
-    deliveries = db.query(Delivery).filter(Delivery.user_id == user_id).all()
-    
-    calendar = {}
-    for delivery in deliveries:
-        date_key = delivery.scheduled_date.date().isoformat()
-        if date_key not in calendar:
-            calendar[date_key] = []
-        calendar[date_key].append({
-            "id": delivery.id,
-            "subscription_id": delivery.subscription_id,
-            "status": delivery.status,
-            "time": delivery.scheduled_date.time().isoformat()
-        })
-    
-    return calendar
+
+@router.get("/{subscription_id}/pause-windows", response_model=list[PauseWindowResponse], dependencies=[Depends(subscription_access)])
+def get_pause_windows(subscription_id: int, db: Session = Depends(get_db)):
+    """Every pause window of the subscription, its own and those from blackouts, by start."""
+    return db.query(PauseWindow).filter(
+        PauseWindow.subscription_id == subscription_id
+    ).order_by(PauseWindow.starts_at, PauseWindow.id).all()
+
+
+@router.get("/{subscription_id}/active-on/{day}", dependencies=[Depends(subscription_access)])
+def get_active_on(subscription_id: int, day: str, db: Session = Depends(get_db)):
+    """Whether the subscription gets a delivery on `day` (active, within its dates, not paused)."""
+    target = _parse_day(day, "day")
+    return {"subscription_id": subscription_id, "date": target.isoformat(), "active": is_active_on(db, subscription_id, target)}
+
+CALENDAR_FETCH_SIZE = 1000
+MAX_CALENDAR_DAYS = 366
+
+
+def _month_end(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def _calendar_window(from_date, to_date, month):
+    try:
+        if month:
+            start = datetime.strptime(month, "%Y-%m").date()
+            end = _month_end(start)
+        elif from_date or to_date:
+            start = date.fromisoformat(from_date) if from_date else date.fromisoformat(to_date).replace(day=1)
+            end = date.fromisoformat(to_date) if to_date else _month_end(start)
+        else:
+            start = datetime.utcnow().date().replace(day=1)
+            end = _month_end(start)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date. Use from/to as YYYY-MM-DD or month as YYYY-MM.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_CALENDAR_DAYS} days")
+    return start, end
+
+
+class _CalendarWriter:
+    """Turns rows ordered by scheduled_date into the calendar JSON, one day's chunk at a time."""
+
+    def __init__(self):
+        self.separator = ""
+        self.current = None
+        self.entries = []
+
+    def _flush(self):
+        chunk = f"{self.separator}{dumps(self.current).decode()}:[{','.join(self.entries)}]"
+        self.separator, self.entries = ",", []
+        return chunk
+
+    def add(self, row):
+        """The previous day's chunk when `row` starts a new day, else ""."""
+        day, delivery_id, subscription_id, status, scheduled = row
+        day = str(day)
+        chunk = self._flush() if day != self.current and self.entries else ""
+        self.current = day
+        self.entries.append(dumps({
+            "id": delivery_id,
+            "subscription_id": subscription_id,
+            "status": status,
+            "time": scheduled.time()
+        }).decode())
+        return chunk
+
+    def close(self):
+        return (self._flush() if self.entries else "") + "}"
+
+
+def _stream_calendar(rows):
+    """Yield the calendar JSON one day at a time from rows ordered by scheduled_date."""
+    yield "{"
+    writer = _CalendarWriter()
+    for row in rows:
+        chunk = writer.add(row)
+        if chunk:
+            yield chunk
+    yield writer.close()
 
 
-@router.post("/{subscription_id}/toggle-delivery")
+def _calendar_select(user_id, start, end):
+    day = func.date(Delivery.scheduled_date)
+    return select(day, Delivery.id, Delivery.subscription_id, Delivery.status, Delivery.scheduled_date).where(
+        Delivery.user_id == user_id,
+        Delivery.scheduled_date >= datetime.combine(start, datetime.min.time()),
+        Delivery.scheduled_date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    ).order_by(Delivery.scheduled_date, Delivery.id).execution_options(yield_per=CALENDAR_FETCH_SIZE)
+
+
+@router.get("/calendar/{user_id}", dependencies=[Depends(user_access)])
+def get_delivery_calendar(
+    user_id: int,
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    month: str = None,
+    db: Session = Depends(get_db)
+):
+    """Deliveries for a user grouped by day, limited to a date window.
+
+    The window is `from`..`to` (inclusive, YYYY-MM-DD) or a whole `month` (YYYY-MM) and
+    defaults to the current month. The body is streamed day by day in the same
+    {"YYYY-MM-DD": [...]} shape as before.
+    """
+    start, end = _calendar_window(from_date, to_date, month)
+    rows = db.execute(_calendar_select(user_id, start, end))
+    return StreamingResponse(_stream_calendar(rows), media_type="application/json")
+
+
+@router.post("/{subscription_id}/toggle-delivery", dependencies=[Depends(subscription_access)])
 def toggle_delivery(subscription_id: int, payload: dict = Body(...), db: Session = Depends(get_db)):
     """Toggle a delivery for a subscription on a given date (ISO YYYY-MM-DD).
     If a delivery exists for that subscription+date it will be removed, otherwise created.
@@ -116,17 +329,144 @@ def toggle_delivery(subscription_id: int, payload: dict = Body(...), db: Session
             status='pending'
         )
         db.add(delivery)
-        db.commit()
-        db.refresh(delivery)
+        try:
+            db.commit()
+        except IntegrityError:
+            # a concurrent toggle scheduled the same day first (uq_deliveries_subscription_day)
+            db.rollback()
+            delivery = db.query(Delivery).filter(
+                Delivery.subscription_id == subscription_id,
+                Delivery.scheduled_date >= datetime.combine(target_day, datetime.min.time()),
+                Delivery.scheduled_date <= datetime.combine(target_day, datetime.max.time())
+            ).first()
+            if delivery is None:
+                raise
+        else:
+            db.refresh(delivery)
         return {"message": "Delivery scheduled", "date": scheduled_date.date().isoformat(), "delivery_id": delivery.id}
 
 
-from fastapi import Body
+def _expand_days(entries, name):
+    """Dates from a list of "YYYY-MM-DD" strings and {"from": ..., "to": ...} inclusive ranges."""
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail=f"{name} must be a list of dates or {{from, to}} ranges")
+    days = set()
+    for entry in entries:
+        if isinstance(entry, str):
+            days.add(_parse_day(entry, name))
+        elif isinstance(entry, dict) and entry.get("from") and entry.get("to"):
+            first, last = _parse_day(entry["from"], f"{name} from"), _parse_day(entry["to"], f"{name} to")
+            if last < first:
+                raise HTTPException(status_code=400, detail=f"{name}: 'to' must not be before 'from'")
+            if (last - first).days >= MAX_BATCH_DAYS:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_DAYS} days per batch")
+            days.update(first + timedelta(days=i) for i in range((last - first).days + 1))
+        else:
+            raise HTTPException(status_code=400, detail=f"{name} must be a list of dates or {{from, to}} ranges")
+    return days
+
+
+MAX_BATCH_DAYS = 366
+
+
+@router.post("/{subscription_id}/deliveries/batch", dependencies=[Depends(subscription_access)])
+def batch_update_deliveries(subscription_id: int, payload: dict = Body(...), db: Session = Depends(get_db)):
+    """Add and remove deliveries on many days at once.
+
+    Body: {"add": [...], "remove": [...]}, each a list of "YYYY-MM-DD" dates and
+    {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD"} ranges. Unlike toggle-delivery the outcome does
+    not depend on the current state: adding a scheduled day or removing an empty one changes
+    nothing, so a retried request is harmless. Delivered days are never removed. Everything
+    is applied in one transaction; the response maps every requested day to its delivery (or
+    null).
+    """
+    add_days = _expand_days(payload.get("add") or [], "add")
+    remove_days = _expand_days(payload.get("remove") or [], "remove")
+    if not add_days and not remove_days:
+        raise HTTPException(status_code=400, detail="Nothing to do: give add and/or remove")
+    if add_days & remove_days:
+        both = ", ".join(sorted(day.isoformat() for day in add_days & remove_days)[:5])
+        raise HTTPException(status_code=400, detail=f"Days both added and removed: {both}")
+    if len(add_days) + len(remove_days) > MAX_BATCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_DAYS} days per batch")
+
+    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    if not subscription:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    try:
+        return {"subscription_id": subscription_id, **apply_delivery_changes(db, subscription, add_days, remove_days)}
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Deliveries changed concurrently; retry the batch")
+
+
+MAX_QUOTE_ITEMS = 10000
+# checkout waits on this job, so it runs before batch work and gives up after a few tries
+PAYMENT_ORDER_PRIORITY = 10
+PAYMENT_ORDER_ATTEMPTS = 3
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@router.post("/quote")
+def quote_subscriptions(payload: dict = Body(...), db: Session = Depends(get_db)):
+    """Price many (newspaper_ids, milk_package_id, frequency) combinations in one call.
+
+    Body: {"items": [{"newspaper_ids": [1, 2], "milk_package_id": 1, "frequency": "monthly"}, ...],
+    "start_date": "YYYY-MM-DD" (optional, defaults to today)}. Quotes come back in item order;
+    an invalid item gets {"error": ...} instead of prices.
+    """
+    items = payload.get('items') or []
+    if not isinstance(items, list) or len(items) > MAX_QUOTE_ITEMS:
+        raise HTTPException(status_code=400, detail=f"items must be a list of at most {MAX_QUOTE_ITEMS} entries")
+    try:
+        start = date.fromisoformat(payload['start_date']) if payload.get('start_date') else date.today()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid start_date. Use YYYY-MM-DD.")
+
+    active_newspapers = set(db.execute(select(Newspaper.id).where(Newspaper.is_active == True)).scalars())
+    milk_table, milk_columns = milk_price_table(
+        db.query(MilkPackage).filter(MilkPackage.is_active == True).all()
+    )
+
+    errors = {}
+    counts, freqs, milk_cols = [], [], []
+    for i, item in enumerate(items):
+        newspaper_ids = item.get('newspaper_ids') if isinstance(item, dict) else None
+        milk_package_id = item.get('milk_package_id') if isinstance(item, dict) else None
+        frequency = item.get('frequency', 'monthly') if isinstance(item, dict) else None
+        if not newspaper_ids or not isinstance(newspaper_ids, list):
+            errors[i] = "At least one newspaper selection is required"
+        elif not all(_is_id(n) for n in newspaper_ids):
+            errors[i] = "newspaper_ids must be integers"
+        elif milk_package_id is not None and not _is_id(milk_package_id):
+            errors[i] = "milk_package_id must be an integer"
+        elif not isinstance(frequency, str):
+            errors[i] = "frequency must be a string"
+        elif len(set(newspaper_ids)) != len(newspaper_ids) or not set(newspaper_ids) <= active_newspapers:
+            errors[i] = "One or more newspapers not found"
+        elif milk_package_id and milk_package_id not in milk_columns:
+            errors[i] = "Milk package not found"
+        counts.append(0 if i in errors else len(newspaper_ids))
+        freqs.append(frequency_index(frequency if i not in errors else None))
+        milk_cols.append(0 if i in errors else milk_columns.get(milk_package_id, 0))
+
+    newspapers_total, milk_total, total = price_subscriptions(counts, freqs, milk_table, milk_cols, start)
+    # tolist() converts the whole column to Python floats at once
+    quotes = [
+        {"error": errors[i]} if i in errors else
+        {"newspapers_total": newspapers, "milk_total": milk, "total": amount}
+        for i, (newspapers, milk, amount) in enumerate(zip(newspapers_total.tolist(), milk_total.tolist(), total.tolist()))
+    ]
+    return ORJSONResponse({"start_date": start.isoformat(), "quotes": quotes})
 
 
 @router.post("/")
-def create_subscription(payload: dict = Body(...), db: Session = Depends(get_db)):
+def create_subscription(payload: dict = Body(...), db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     user_id = payload.get('user_id')
+    authorize_user(current_user, user_id)
     newspaper_ids = payload.get('newspaper_ids', [])  # List of newspaper IDs
     milk_package_id = payload.get('milk_package_id')
     frequency = payload.get('frequency', 'monthly')
@@ -150,128 +490,75 @@ def create_subscription(payload: dict = Body(...), db: Session = Depends(get_db)
         if not milk:
             raise HTTPException(status_code=404, detail="Milk package not found")
 
-    # calculate cost based on frequency
-    def price_for(entity, freq, is_newspaper=False):
-        if not entity:
-            return 0
-        # For Newspapers, use fixed weekday/weekend pricing: Rs.4 weekdays, Rs.7 weekends
-        if is_newspaper:
-            wd_rate = 4
-            we_rate = 7
-            if freq == 'daily':
-                return wd_rate
-            if freq == 'weekly':
-                return wd_rate * 5 + we_rate * 2
-            # monthly: compute over next 30 days (precise monthly window)
-            from datetime import date, timedelta
-            start = date.today()
-            days = 30
-            wd_count = 0
-            we_count = 0
-            for i in range(days):
-                d = start + timedelta(days=i)
-                if d.weekday() < 5:
-                    wd_count += 1
-                else:
-                    we_count += 1
-            return wd_rate * wd_count + we_rate * we_count
-        # For milk packages and others, fall back to stored prices
-        if freq == 'daily':
-            return getattr(entity, 'price_daily', 0)
-        if freq == 'weekly':
-            return getattr(entity, 'price_weekly', 0)
-        return getattr(entity, 'price_monthly', 0)
-
-    # Sum prices for all selected newspapers (with is_newspaper=True)
-    newspapers_total = sum(price_for(newspaper, frequency, is_newspaper=True) for newspaper in newspapers)
-    milk_total = price_for(milk, frequency, is_newspaper=False)
-    total = newspapers_total + milk_total
-
-    # Apply 20% discount if milk is included
-    if milk:
-        total = total * 0.8
-
-    # create subscription
+    total = price_subscription(len(newspapers), milk, frequency)
+
+    # subscription, newspapers, payment and the job opening its gateway order in one transaction
     subscription = Subscription(
         user_id=user_id,
         milk_package_id=milk_package_id,
         frequency=frequency,
-        total_cost=total
+        total_cost=total,
+        newspapers=newspapers
     )
     db.add(subscription)
-    db.commit()
-    db.refresh(subscription)
-    
-    # Associate all newspapers with subscription
-    for newspaper in newspapers:
-        subscription.newspapers.append(newspaper)
+    db.flush()
+    payment = Payment(
+        user_id=user_id,
+        subscription_id=subscription.id,
+        amount=total,
+        status='pending',
+        payment_method='queued'
+    )
+    db.add(payment)
+    db.flush()
+    order_job = enqueue(db, "payment_order", {"payment_id": payment.id}, priority=PAYMENT_ORDER_PRIORITY,
+                        max_attempts=PAYMENT_ORDER_ATTEMPTS, user_id=user_id)
     db.commit()
 
-    # Try Razorpay first (preferred), fall back to Stripe
-    import razorpay
-    razorpay_client = razorpay.Client(auth=(os.getenv('RAZORPAY_PUBLIC_KEY', ''), os.getenv('RAZORPAY_SECRET_KEY', '')))
-    
-    # Try Razorpay order creation
-    try:
-        razorpay_order = razorpay_client.order.create(
-            amount=int(total * 100),  # in paise
-            currency='INR',
-            notes={'user_id': user_id, 'subscription_id': subscription.id}
-        )
-        payment = Payment(
-            user_id=user_id,
-            subscription_id=subscription.id,
-            amount=total,
-            status='pending',
-            stripe_payment_id=razorpay_order['id'],
-            payment_method='razorpay'
-        )
-        db.add(payment)
-        db.commit()
-        
-        return {
-            "subscription_id": subscription.id,
-            "payment_id": payment.id,
-            "razorpay_order_id": razorpay_order['id'],
-            "amount": total,
-            "payment_method": "razorpay"
-        }
-    except Exception as e:
-        # Fall back to Stripe
-        stripe.api_key = os.getenv('STRIPE_SECRET_KEY', '')
-        try:
-            intent = stripe.PaymentIntent.create(
-                amount=int(total * 100),
-                currency='inr',
-                metadata={'user_id': user_id, 'subscription_id': subscription.id}
-            )
-
-            payment = Payment(
-                user_id=user_id,
-                subscription_id=subscription.id,
-                amount=total,
-                status='pending',
-                stripe_payment_id=intent.id,
-                payment_method='stripe'
-            )
-            db.add(payment)
-            db.commit()
+    # the checkout details (Razorpay order or Stripe client secret) become the job's result
+    return {
+        "subscription_id": subscription.id,
+        "payment_id": payment.id,
+        "amount": total,
+        "payment_method": "queued",
+        "job_id": order_job.id,
+    }
 
-            return {"subscription_id": subscription.id, "payment_id": payment.id, "client_secret": intent.client_secret, "amount": total, "payment_method": "stripe"}
-        except Exception as e2:
-            db.rollback()
-            # Both failed; create pending payment without payment processor
-            try:
-                payment = Payment(
-                    user_id=user_id,
-                    subscription_id=subscription.id,
-                    amount=total,
-                    status='pending',
-                    stripe_payment_id=None,
-                    payment_method='pending'
-                )
-                db.add(payment)
-                db.commit()
-                return {"subscription_id": subscription.id, "payment_id": payment.id, "amount": total, "payment_method": "pending", "error": "Payment processor unavailable"}
-            except Exception:
-                raise HTTPException(status_code=400, detail=str(e2))
+
+# Served in place of the matching routes above when DB_ASYNC is set (see app/main.py)
+async_router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
+
+
+@async_router.get("/{user_id}", response_model=list[SubscriptionResponse], dependencies=[Depends(user_access)])
+async def get_user_subscriptions_async(
+    user_id: int,
+    cursor: int = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(SUBSCRIPTIONS_PAGE_SIZE, ge=1, le=MAX_SUBSCRIPTIONS_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows, headers = _subscriptions_page((await db.execute(_subscriptions_select(user_id, cursor, limit))).all(), limit)
+    newspapers = (await db.execute(_page_newspapers_select(rows))).all() if rows else []
+    return ORJSONResponse(_subscriptions_body(rows, newspapers), headers=headers)
+
+
+async def _stream_calendar_async(rows):
+    yield "{"
+    writer = _CalendarWriter()
+    async for row in rows:
+        chunk = writer.add(row)
+        if chunk:
+            yield chunk
+    yield writer.close()
+
+
+@async_router.get("/calendar/{user_id}", dependencies=[Depends(user_access)])
+async def get_delivery_calendar_async(
+    user_id: int,
+    from_date: str = Query(None, alias="from"),
+    to_date: str = Query(None, alias="to"),
+    month: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    start, end = _calendar_window(from_date, to_date, month)
+    rows = await db.stream(_calendar_select(user_id, start, end))
+    return StreamingResponse(_stream_calendar_async(rows), media_type="application/json")
@@ -0,0 +1,263 @@
+"""Admin analytics served from summary tables instead of the base tables.
+
+analytics_daily (DailyStat) keeps per item_type, day, item_id and city the new subscriptions,
+deliveries by status and payments billed, failed and completed; analytics_subscribers
+(SubscriberCount) keeps the active subscriptions per item and city. item_type is "all"
+(item_id 0), "newspaper" or "milk". Triggers created in migration 0009 update both with every
+insert, update and delete on deliveries, subscriptions, subscription_newspapers and payments,
+so a report reads a few hundred summary rows over an index range however large the base
+tables are.
+
+rebuild_analytics() recomputes both tables from the base tables in one transaction, for when
+summary_drift() finds they disagree. When a user's city changes, a trigger from migration 0012
+moves the counts of all their rows to the new city.
+"""
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, delete, union_all, func, case, literal_column, text, Integer, String
+from sqlalchemy.orm import Session
+from app.database.models import (
+    DailyStat, SubscriberCount, Delivery, Subscription, Payment, User, Newspaper, MilkPackage, subscription_newspapers
+)
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+DELIVERY_STATUSES = ("pending", "delivered", "cancelled")
+DAILY_KEY = ("item_type", "day", "item_id", "city")
+DAILY_COUNTS = tuple(c.name for c in DailyStat.__table__.columns if c.name not in DAILY_KEY)
+SUBSCRIBERS_KEY = ("item_type", "item_id", "city")
+ITEM_TYPES = {"newspaper": Newspaper, "milk": MilkPackage}
+
+
+def report_range(start: date = None, end: date = None, today: date = None):
+    """[start, end] inclusive, defaulting to the last DEFAULT_DAYS days; raises ValueError."""
+    end = end or today or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_DAYS - 1)
+    if start > end:
+        raise ValueError("from must not be after to")
+    if (end - start).days >= MAX_DAYS:
+        raise ValueError(f"at most {MAX_DAYS} days per report")
+    return start, end
+
+
+def _day_filter(start, end, city):
+    conditions = [DailyStat.day >= start, DailyStat.day <= end]
+    if city is not None:
+        conditions.append(DailyStat.city == city)
+    return conditions
+
+
+def _sums(columns=DAILY_COUNTS):
+    return [func.coalesce(func.sum(getattr(DailyStat, name)), 0).label(name) for name in columns]
+
+
+def _completion(totals):
+    due = totals["deliveries_delivered"] + totals["deliveries_pending"]
+    return round(totals["deliveries_delivered"] / due, 4) if due else None
+
+
+def daily_report(db: Session, start: date, end: date, city: str = None):
+    """Per-day totals over all items for [start, end], zero-filled, with the range's totals."""
+    rows = db.execute(
+        select(DailyStat.day, *_sums())
+        .where(DailyStat.item_type == "all", *_day_filter(start, end, city))
+        .group_by(DailyStat.day)
+    ).mappings().all()
+    by_day = {row["day"]: row for row in rows}
+    days, totals = [], dict.fromkeys(DAILY_COUNTS, 0)
+    day = start
+    while day <= end:
+        counts = {name: by_day[day][name] if day in by_day else 0 for name in DAILY_COUNTS}
+        for name, value in counts.items():
+            totals[name] += value
+        days.append({"day": day, **counts, "completion_rate": _completion(counts)})
+        day += timedelta(days=1)
+    active = db.execute(
+        select(func.coalesce(func.sum(SubscriberCount.active), 0)).where(
+            SubscriberCount.item_type == "all", *([SubscriberCount.city == city] if city is not None else [])
+        )
+    ).scalar()
+    return {
+        "from": start, "to": end, "city": city, "active_subscriptions": active,
+        "totals": {**totals, "completion_rate": _completion(totals)}, "days": days,
+    }
+
+
+def item_report(db: Session, item_type: str, start: date, end: date, city: str = None):
+    """Per newspaper or milk package: active subscriptions now, and new subscriptions and deliveries in [start, end]."""
+    model = ITEM_TYPES[item_type]
+    counts = ("new_subscriptions",) + tuple(f"deliveries_{s}" for s in DELIVERY_STATUSES)
+    totals = {
+        row["item_id"]: row for row in db.execute(
+            select(DailyStat.item_id, *_sums(counts))
+            .where(DailyStat.item_type == item_type, *_day_filter(start, end, city))
+            .group_by(DailyStat.item_id)
+        ).mappings()
+    }
+    subscriber_filter = [SubscriberCount.item_type == item_type]
+    if city is not None:
+        subscriber_filter.append(SubscriberCount.city == city)
+    active = dict(db.execute(
+        select(SubscriberCount.item_id, func.sum(SubscriberCount.active))
+        .where(*subscriber_filter).group_by(SubscriberCount.item_id)
+    ).all())
+    columns = [model.id, model.name, model.is_active] + ([MilkPackage.quantity_ml] if model is MilkPackage else [])
+    items = []
+    for row in db.execute(select(*columns).order_by(model.name)).mappings():
+        item = {**row, "active_subscriptions": active.get(row["id"], 0)}
+        item.update({name: totals[row["id"]][name] if row["id"] in totals else 0 for name in counts})
+        item["completion_rate"] = _completion(item)
+        if model is MilkPackage:
+            # litres handed over, and still to hand over, in the range
+            quantity = row["quantity_ml"] or 0
+            item["volume_ml_delivered"] = item["deliveries_delivered"] * quantity
+            item["volume_ml_scheduled"] = item["deliveries_pending"] * quantity
+        items.append(item)
+    return {"from": start, "to": end, "city": city, "items": items}
+
+
+def city_report(db: Session, start: date, end: date):
+    """Per city: active subscriptions now and the range's totals over all items."""
+    totals = {
+        row["city"]: row for row in db.execute(
+            select(DailyStat.city, *_sums())
+            .where(DailyStat.item_type == "all", *_day_filter(start, end, None))
+            .group_by(DailyStat.city)
+        ).mappings()
+    }
+    active = dict(db.execute(
+        select(SubscriberCount.city, func.sum(SubscriberCount.active))
+        .where(SubscriberCount.item_type == "all").group_by(SubscriberCount.city)
+    ).all())
+    cities = []
+    for city in sorted(totals.keys() | active.keys()):
+        counts = {name: totals[city][name] if city in totals else 0 for name in DAILY_COUNTS}
+        cities.append({"city": city, "active_subscriptions": active.get(city, 0), **counts, "completion_rate": _completion(counts)})
+    return {"from": start, "to": end, "cities": cities}
+
+
+# Recomputing from the base tables
+
+def _const(value, type_):
+    # inlined rather than bound, so the UNION's columns have a type on every backend
+    return literal_column(repr(value) if isinstance(value, str) else str(value), type_)
+
+
+def _row(item_type, day, item_id, city, **counts):
+    item_type = _const(item_type, String) if isinstance(item_type, str) else item_type
+    item_id = _const(item_id, Integer) if isinstance(item_id, int) else item_id
+    return [
+        item_type.label("item_type"), func.date(day).label("day"), item_id.label("item_id"), city.label("city"),
+        *[counts.get(name, _const(0, Integer)).label(name) for name in DAILY_COUNTS]
+    ]
+
+
+def _is(column, value):
+    return case((column == value, 1), else_=0)
+
+
+def _daily_rows():
+    """One row per contribution to analytics_daily; summed per key by _daily_select()."""
+    city = func.coalesce(User.city, "")
+    sn = subscription_newspapers.c
+    deliveries = {f"deliveries_{s}": _is(Delivery.status, s) for s in DELIVERY_STATUSES}
+    delivery_items = [
+        ("all", 0, None, None),
+        ("milk", Subscription.milk_package_id, Subscription, Subscription.id == Delivery.subscription_id),
+        ("newspaper", sn.newspaper_id, subscription_newspapers, sn.subscription_id == Delivery.subscription_id),
+    ]
+    subscription_items = [
+        ("all", 0, None, None),
+        ("milk", Subscription.milk_package_id, None, None),
+        ("newspaper", sn.newspaper_id, subscription_newspapers, sn.subscription_id == Subscription.id),
+    ]
+    selects = []
+    for item_type, item_id, joined, on in delivery_items:
+        query = select(*_row(item_type, Delivery.scheduled_date, item_id, city, **deliveries)).select_from(Delivery)
+        if joined is not None:
+            query = query.join(joined, on)
+        selects.append(query.outerjoin(User, User.id == Delivery.user_id).where(Delivery.scheduled_date != None, item_id != None))
+    for item_type, item_id, joined, on in subscription_items:
+        query = select(*_row(item_type, Subscription.start_date, item_id, city, new_subscriptions=_const(1, Integer))).select_from(Subscription)
+        if joined is not None:
+            query = query.join(joined, on)
+        selects.append(query.outerjoin(User, User.id == Subscription.user_id).where(Subscription.start_date != None, item_id != None))
+    amount = func.coalesce(Payment.amount, 0)
+    selects.append(
+        select(*_row("all", Payment.created_at, 0, city, payments_billed=_const(1, Integer), amount_billed=amount,
+                     payments_failed=_is(Payment.status, "failed")))
+        .select_from(Payment).outerjoin(User, User.id == Payment.user_id).where(Payment.created_at != None)
+    )
+    selects.append(
+        select(*_row("all", Payment.completed_at, 0, city, payments_completed=_const(1, Integer), amount_completed=amount))
+        .select_from(Payment).outerjoin(User, User.id == Payment.user_id)
+        .where(Payment.status == "completed", Payment.completed_at != None)
+    )
+    return union_all(*selects).subquery()
+
+
+def _daily_select():
+    rows = _daily_rows()
+    return select(*[rows.c[name] for name in DAILY_KEY], *[func.sum(rows.c[name]).label(name) for name in DAILY_COUNTS]).group_by(
+        *[rows.c[name] for name in DAILY_KEY]
+    )
+
+
+def _subscribers_select():
+    city = func.coalesce(User.city, "")
+    sn = subscription_newspapers.c
+    active = func.sum(case((Subscription.is_active, 1), else_=0)).label("active")
+    selects = [
+        select(_const("all", String).label("item_type"), _const(0, Integer).label("item_id"), city.label("city"), active)
+        .select_from(Subscription).outerjoin(User, User.id == Subscription.user_id)
+        .where(Subscription.is_active != None).group_by(city),
+        select(_const("milk", String), Subscription.milk_package_id, city, active)
+        .select_from(Subscription).outerjoin(User, User.id == Subscription.user_id)
+        .where(Subscription.is_active != None, Subscription.milk_package_id != None).group_by(Subscription.milk_package_id, city),
+        select(_const("newspaper", String), sn.newspaper_id, city, active)
+        .select_from(Subscription).join(subscription_newspapers, sn.subscription_id == Subscription.id)
+        .outerjoin(User, User.id == Subscription.user_id)
+        .where(Subscription.is_active != None).group_by(sn.newspaper_id, city),
+    ]
+    return union_all(*selects)
+
+
+def rebuild_analytics(db: Session):
+    """Recompute analytics_daily and analytics_subscribers from scratch, in one transaction."""
+    started = time.perf_counter()
+    if db.get_bind().dialect.name == "postgresql":
+        # writers wait until the rebuild commits, so no trigger update lands in between
+        db.execute(text("LOCK TABLE deliveries, subscriptions, subscription_newspapers, payments IN SHARE MODE"))
+    db.execute(delete(DailyStat))
+    db.execute(delete(SubscriberCount))
+    daily = db.execute(insert(DailyStat).from_select(list(DAILY_KEY + DAILY_COUNTS), _daily_select())).rowcount
+    subscribers = db.execute(insert(SubscriberCount).from_select(list(SUBSCRIBERS_KEY) + ["active"], _subscribers_select())).rowcount
+    db.commit()
+    return {
+        "daily_rows": max(daily, 0),
+        "subscriber_rows": max(subscribers, 0),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def summary_drift(db: Session, limit: int = 20):
+    """Keys whose stored summary differs from a fresh computation (rows of zeros count as absent)."""
+    def table(rows, key_length):
+        return {tuple(row[:key_length]): tuple(row[key_length:]) for row in rows if any(row[key_length:])}
+
+    def normalise(rows):
+        # the day comes back as a date from the table and as text from date() on SQLite
+        return {(k[0], str(k[1]), *k[2:]): tuple(round(v, 2) for v in values) for k, values in rows.items()}
+
+    checks = [
+        (select(*[getattr(DailyStat, n) for n in DAILY_KEY + DAILY_COUNTS]), _daily_select(), len(DAILY_KEY)),
+        (select(*[getattr(SubscriberCount, n) for n in SUBSCRIBERS_KEY], SubscriberCount.active), _subscribers_select(), len(SUBSCRIBERS_KEY)),
+    ]
+    drift = []
+    for stored_query, fresh_query, key_length in checks:
+        stored = normalise(table(db.execute(stored_query).all(), key_length))
+        fresh = normalise(table(db.execute(fresh_query).all(), key_length))
+        for key in sorted(stored.keys() | fresh.keys(), key=str):
+            if stored.get(key) != fresh.get(key):
+                drift.append({"key": key, "stored": stored.get(key), "expected": fresh.get(key)})
+    return {"mismatched": len(drift), "examples": drift[:limit]}
@@ -0,0 +1,155 @@
+"""Billing run: one Payment per subscription per period, priced from its actual deliveries.
+
+For every subscription with deliveries in [start, end) and no bill for that period yet, the
+delivered and scheduled (not cancelled) days are counted in SQL, split into weekdays and
+weekend days, together with the subscription's newspaper count and milk package's daily price. A chunk of subscriptions is
+then priced at once with pricing.period_prices and its bills bulk-inserted, so skipped days
+and pause windows reach the bill. Days already paid for up front at signup (the first day,
+week or MONTHLY_WINDOW_DAYS days from the start date, by frequency) are not billed again
+unless that payment failed. Subscriptions already billed for the period are skipped,
+and uq_payments_subscription_period stops two concurrent runs from billing one twice, so a
+re-run inserts nothing: the first bill of a period stands.
+"""
+from datetime import date, datetime, time, timedelta
+import time as _time
+import numpy as np
+from sqlalchemy import select, insert, func, case, extract, exists, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database.models import Subscription, Delivery, MilkPackage, Payment, subscription_newspapers
+from app.services.pricing import period_prices, MONTHLY_WINDOW_DAYS
+
+BILL_METHOD = "invoice"
+# days from the start date the up-front signup payment covers, by frequency (anything else is monthly)
+SIGNUP_COVERED_DAYS = {"daily": 1, "weekly": 7}
+
+
+def month_period(month):
+    """[first day, first day of the next month) of a "YYYY-MM" month; raises ValueError."""
+    start = datetime.strptime(month, "%Y-%m").date()
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def previous_month(today=None):
+    first = (today or datetime.utcnow().date()).replace(day=1)
+    return month_period((first - timedelta(days=1)).strftime("%Y-%m"))
+
+
+def _insert_skipping_billed(db: Session):
+    """INSERT into payments that skips subscriptions already billed for the period."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(Payment.__table__).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(Payment.__table__).on_conflict_do_nothing()
+    return insert(Payment.__table__)
+
+
+def billing_select(period_start, period_end, first_id, last_id):
+    """Per unbilled subscription in [first_id, last_id] with billable deliveries in the period:
+    id, user_id, newspapers, milk_daily, has_milk, weekdays, weekend_days."""
+    S = Subscription
+    billed = exists().where(Payment.subscription_id == S.id, Payment.period_start == period_start)
+    newspapers = select(func.count()).where(
+        subscription_newspapers.c.subscription_id == S.id
+    ).scalar_subquery()
+    # day of week 0 is Sunday, 6 Saturday; SQLite compiles this to strftime('%w', ...)
+    weekend = extract("dow", Delivery.scheduled_date).in_((0, 6))
+    # deliveries inside the window the signup payment (no period, not failed) already paid for;
+    # only subscriptions started shortly before the period end can have any
+    paid_at_signup = exists().where(
+        Payment.subscription_id == S.id, Payment.period_start == None, Payment.status != "failed"
+    )
+    covered_days = case(
+        *[(S.frequency == frequency, days) for frequency, days in SIGNUP_COVERED_DAYS.items()], else_=MONTHLY_WINDOW_DAYS
+    )
+    covered = and_(
+        S.start_date != None,
+        S.start_date >= period_start - timedelta(days=MONTHLY_WINDOW_DAYS),
+        extract("epoch", Delivery.scheduled_date) < extract("epoch", func.date(S.start_date)) + covered_days * 86400,
+        paid_at_signup,
+    )
+    return select(
+        S.id, S.user_id, newspapers.label("newspapers"),
+        func.coalesce(MilkPackage.price_daily, 0).label("milk_daily"),
+        (S.milk_package_id != None).label("has_milk"),
+        func.sum(case((weekend, 0), else_=1)).label("weekdays"),
+        func.sum(case((weekend, 1), else_=0)).label("weekend_days"),
+    ).select_from(S).join(
+        Delivery, Delivery.subscription_id == S.id
+    ).outerjoin(
+        MilkPackage, MilkPackage.id == S.milk_package_id
+    ).where(
+        S.id >= first_id,
+        S.id <= last_id,
+        Delivery.scheduled_date >= period_start,
+        Delivery.scheduled_date < period_end,
+        Delivery.status != "cancelled",
+        ~covered,
+        ~billed
+    ).group_by(S.id, S.user_id, S.milk_package_id, MilkPackage.price_daily)
+
+
+def run_billing(db: Session, start: date, end: date, chunk_size: int = 5000, progress=None):
+    """Bill every subscription for its deliveries in [start, end).
+
+    Subscriptions are walked in id order, `chunk_size` at a time; each chunk is one aggregate
+    query, one vectorized pricing pass and one bulk INSERT, committed on its own, so memory
+    stays bounded by the chunk size. `progress`, if given, is called with the running report
+    after each chunk. Returns the final report.
+    """
+    period_start = datetime.combine(start, time.min)
+    period_end = datetime.combine(end, time.min)
+    created_at = datetime.utcnow()
+
+    started = _time.perf_counter()
+    report = {
+        "period_start": start.isoformat(),
+        "period_end": end.isoformat(),
+        "subscriptions_scanned": 0,
+        "payments_created": 0,
+        "already_billed": 0,
+        "amount_billed": 0.0,
+        "elapsed_seconds": 0.0,
+        "subscriptions_per_second": 0,
+    }
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(Subscription.id).where(Subscription.id > last_id).order_by(Subscription.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+        report["subscriptions_scanned"] += len(ids)
+        report["already_billed"] += db.execute(select(func.count()).where(
+            Payment.subscription_id >= ids[0],
+            Payment.subscription_id <= ids[-1],
+            Payment.period_start == period_start
+        )).scalar()
+        rows = db.execute(billing_select(period_start, period_end, ids[0], ids[-1])).all()
+        if rows:
+            subscription_ids, user_ids, newspapers, milk_daily, has_milk, weekdays, weekend_days = zip(*rows)
+            _, _, total = period_prices(newspapers, weekdays, weekend_days, milk_daily, has_milk)
+            amounts = np.round(total, 2).tolist()
+            created = db.execute(_insert_skipping_billed(db), [{
+                "user_id": user_id,
+                "subscription_id": subscription_id,
+                "amount": amount,
+                "status": "pending",
+                "payment_method": BILL_METHOD,
+                "created_at": created_at,
+                "period_start": period_start,
+                "period_end": period_end,
+            } for subscription_id, user_id, amount in zip(subscription_ids, user_ids, amounts)]).rowcount
+            db.commit()
+            report["payments_created"] += max(created, 0)
+            report["amount_billed"] = round(report["amount_billed"] + sum(amounts), 2)
+
+        elapsed = _time.perf_counter() - started
+        report["elapsed_seconds"] = round(elapsed, 3)
+        scanned = report["subscriptions_scanned"]
+        report["subscriptions_per_second"] = round(scanned / elapsed) if elapsed > 0 else scanned
+        if progress:
+            progress(dict(report))
+    return report
@@ -0,0 +1,259 @@
+"""Bulk import of customers and their subscriptions from CSV or NDJSON.
+
+Each row is one subscription for one customer:
+
+    email,full_name,phone,address,city,pincode,newspaper_ids,milk_package_id,frequency
+
+`newspaper_ids` is a list of integers in NDJSON (a `;`-separated string is accepted too) and
+`;`-separated in CSV. A customer appearing on several
+rows (or already registered) gets all the subscriptions on one account. An optional
+`password_hash` (bcrypt) is stored as-is; otherwise the account has no password until one is set.
+
+Rows are validated against the active catalog, priced with the shared pricing engine and written
+`chunk_size` at a time with executemany inserts, one transaction per chunk. Each subscription
+gets a pending Payment with no gateway order; attach_payment_orders() creates the orders later.
+"""
+import csv
+import json
+import time
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+from app.database.models import User, Subscription, Payment, Newspaper, MilkPackage, subscription_newspapers
+from app.services.pricing import milk_price_table, price_subscriptions, frequency_index, FREQUENCIES
+from app.services.gateways import create_payment_order, GatewayUnavailable
+
+USER_FIELDS = ("email", "full_name", "phone", "address", "city", "pincode")
+IMPORT_CHUNK_SIZE = 2000
+
+
+def _split_ids(text):
+    ids = text.replace("|", ";").replace(",", ";")
+    return [part.strip() for part in ids.split(";") if part.strip()]
+
+
+def iter_csv_rows(lines):
+    reader = csv.DictReader(lines)
+    reader.fieldnames  # reads the header, so line_num is the line it ends on
+    end = reader.line_num
+    for row in reader:
+        # a quoted field may span lines; the row starts after the previous one ends
+        row["_line"], end = end + 1, reader.line_num
+        row["newspaper_ids"] = _split_ids(row.get("newspaper_ids") or "")
+        yield row
+
+
+def iter_ndjson_rows(lines):
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {"_error": f"Invalid JSON: {e}", "_line": number}
+            continue
+        if not isinstance(row, dict):
+            row = {"_error": "Row must be an object"}
+        row["_line"] = number
+        yield row
+
+
+def _integer(value):
+    """`value` as an int: an integer, a whole float or a string of digits; raises ValueError."""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    if isinstance(value, (int, str)):
+        return int(value)
+    raise ValueError(value)
+
+
+def _newspaper_ids(value):
+    """A list of ids, or a `;`-separated string of them as in CSV; raises ValueError."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = _split_ids(value)
+    if not isinstance(value, list):
+        raise ValueError(value)
+    return [_integer(n) for n in value]
+
+
+class _Catalog:
+    def __init__(self, db: Session):
+        self.newspapers = set(db.execute(select(Newspaper.id).where(Newspaper.is_active == True)).scalars())
+        self.milk_table, self.milk_columns = milk_price_table(
+            db.query(MilkPackage).filter(MilkPackage.is_active == True).all()
+        )
+
+
+def _clean_row(row, catalog):
+    """Return (values, None) for a valid row or (None, error message)."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    if row.get("_error"):
+        return None, row["_error"]
+    email = (row.get("email") or "").strip()
+    if "@" not in email:
+        return None, "Missing or invalid email"
+    try:
+        newspaper_ids = _newspaper_ids(row.get("newspaper_ids"))
+        milk_package_id = _integer(row["milk_package_id"]) if row.get("milk_package_id") not in (None, "") else None
+    except ValueError:
+        return None, "newspaper_ids and milk_package_id must be integers"
+    if not newspaper_ids:
+        return None, "At least one newspaper selection is required"
+    if len(set(newspaper_ids)) != len(newspaper_ids) or not set(newspaper_ids) <= catalog.newspapers:
+        return None, "One or more newspapers not found"
+    if milk_package_id and milk_package_id not in catalog.milk_columns:
+        return None, "Milk package not found"
+    frequency = row.get("frequency") or "monthly"
+    if frequency not in FREQUENCIES:
+        return None, f"frequency must be one of {', '.join(FREQUENCIES)}"
+    values = {f: (str(row.get(f)).strip() if row.get(f) is not None else None) for f in USER_FIELDS}
+    values.update(
+        email=email,
+        password_hash=row.get("password_hash") or None,
+        newspaper_ids=newspaper_ids,
+        milk_package_id=milk_package_id,
+        frequency=frequency,
+    )
+    return values, None
+
+
+def _write_chunk(db: Session, rows, catalog, user_ids):
+    """Insert users, subscriptions, newspaper links and pending payments for valid rows.
+
+    `user_ids` maps email -> user id and is updated with newly created users.
+    Returns the number of users created.
+    """
+    emails = {r["email"] for r in rows} - user_ids.keys()
+    if emails:
+        user_ids.update(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    new_users = {}
+    for r in rows:
+        if r["email"] not in user_ids and r["email"] not in new_users:
+            new_users[r["email"]] = {f: r[f] for f in USER_FIELDS + ("password_hash",)}
+    if new_users:
+        created = db.execute(
+            insert(User).returning(User.email, User.id, sort_by_parameter_order=True),
+            list(new_users.values())
+        ).all()
+        user_ids.update(created)
+
+    _, _, totals = price_subscriptions(
+        [len(r["newspaper_ids"]) for r in rows],
+        [frequency_index(r["frequency"]) for r in rows],
+        catalog.milk_table,
+        [catalog.milk_columns.get(r["milk_package_id"], 0) for r in rows],
+    )
+    subscription_ids = db.execute(
+        insert(Subscription).returning(Subscription.id, sort_by_parameter_order=True),
+        [{
+            "user_id": user_ids[r["email"]],
+            "milk_package_id": r["milk_package_id"],
+            "frequency": r["frequency"],
+            "total_cost": float(total),
+        } for r, total in zip(rows, totals)]
+    ).scalars().all()
+
+    db.execute(insert(subscription_newspapers), [
+        {"subscription_id": sub_id, "newspaper_id": n}
+        for sub_id, r in zip(subscription_ids, rows) for n in r["newspaper_ids"]
+    ])
+    db.execute(insert(Payment.__table__), [{
+        "user_id": user_ids[r["email"]],
+        "subscription_id": sub_id,
+        "amount": float(total),
+        "status": "pending",
+        "payment_method": "pending",
+    } for sub_id, r, total in zip(subscription_ids, rows, totals)])
+    return len(new_users)
+
+
+def import_subscriptions(db: Session, rows, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Import an iterable of row dicts (see iter_csv_rows / iter_ndjson_rows).
+
+    Invalid rows are rejected individually. If a chunk fails to write, it is rolled back and
+    retried row by row so only the offending rows are rejected.
+    Returns a summary with per-row `errors` ({"line": line number in the file, "error": message});
+    rows not read by those report their position in `rows` instead.
+    """
+    started = time.perf_counter()
+    catalog = _Catalog(db)
+    user_ids = {}
+    summary = {"rows": 0, "imported": 0, "users_created": 0, "rejected": 0, "errors": []}
+
+    def reject(line, message):
+        summary["rejected"] += 1
+        summary["errors"].append({"line": line, "error": message})
+
+    def flush(chunk):
+        try:
+            summary["users_created"] += _write_chunk(db, [r for _, r in chunk], catalog, user_ids)
+            db.commit()
+            summary["imported"] += len(chunk)
+            return
+        except Exception:
+            db.rollback()
+            user_ids.clear()
+        for line, r in chunk:
+            try:
+                summary["users_created"] += _write_chunk(db, [r], catalog, user_ids)
+                db.commit()
+                summary["imported"] += 1
+            except Exception as e:
+                db.rollback()
+                user_ids.clear()
+                reject(line, str(getattr(e, "orig", e)))
+
+    chunk = []
+    for index, row in enumerate(rows, start=1):
+        summary["rows"] += 1
+        line = row.get("_line", index) if isinstance(row, dict) else index
+        values, error = _clean_row(row, catalog)
+        if error:
+            reject(line, error)
+            continue
+        chunk.append((line, values))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows"] / elapsed) if elapsed > 0 else summary["rows"]
+    return summary
+
+
+def attach_payment_orders(db: Session, limit: int = 500):
+    """Create gateway orders for up to `limit` pending payments that do not have one yet.
+
+    Stops early once every gateway is unavailable. Returns {"created", "remaining"}.
+    """
+    payments = db.query(Payment).filter(
+        Payment.status == "pending",
+        Payment.payment_method == "pending",
+        Payment.stripe_payment_id == None
+    ).order_by(Payment.id).limit(limit).all()
+    created = 0
+    for payment in payments:
+        try:
+            order = create_payment_order(payment.amount, {"user_id": payment.user_id, "subscription_id": payment.subscription_id})
+        except GatewayUnavailable:
+            break
+        payment.stripe_payment_id = order["id"]
+        payment.payment_method = order["provider"]
+        db.commit()
+        created += 1
+    remaining = db.query(Payment).filter(
+        Payment.status == "pending",
+        Payment.payment_method == "pending",
+        Payment.stripe_payment_id == None
+    ).count()
+    return {"created": created, "remaining": remaining}
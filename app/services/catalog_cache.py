@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# Entries also expire after this many seconds so other worker processes pick up admin changes
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# Least recently used entries are dropped beyond this many; keys include path parameters
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+
+_lock = threading.Lock()
+_version = 0
+_entries = OrderedDict()
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response. Call after committing a catalog change."""
+    global _version
+    with _lock:
+        _version += 1
+        _entries.clear()
+
+
+def catalog_version():
+    """Changes whenever bump_catalog_version() is called, for caches kept outside this module."""
+    return _version
+
+
+def _build(payload):
+    # payloads are plain dicts of column values; anything orjson can't encode goes through jsonable_encoder
+    body = orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def _cached(key):
+    entry = _entries.get(key)
+    if entry is None or entry[0] != _version or entry[1] <= time.monotonic():
+        return None
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+    return entry
+
+
+def _store(key, version, payload):
+    body, etag = _build(payload)
+    entry = (version, time.monotonic() + CATALOG_CACHE_TTL, body, etag)
+    # an empty result (an unknown language or genre) is cheap to look up again and not worth a slot
+    if not payload:
+        return entry
+    with _lock:
+        if version == _version:
+            _entries[key] = entry
+            _entries.move_to_end(key)
+            while len(_entries) > CATALOG_CACHE_MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return entry
+
+
+def _respond(request, entry):
+    etag = entry[3]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry[2], media_type="application/json", headers=headers)
+
+
+def catalog_response(request: Request, key, load):
+    """Serve a catalog list from the in-process cache.
+
+    `load` runs only on a miss and returns the payload; the result is kept as serialized
+    bytes with a strong ETag, and a matching If-None-Match gets a 304 with no body.
+    """
+    entry = _cached(key)
+    if entry is None:
+        version = _version
+        entry = _store(key, version, load())
+    return _respond(request, entry)
+
+
+async def catalog_response_async(request: Request, key, load):
+    """catalog_response() for async routes: `load` is a coroutine function, awaited only on a miss."""
+    entry = _cached(key)
+    if entry is None:
+        version = _version
+        entry = _store(key, version, await load())
+    return _respond(request, entry)
+
+
+def row_dict(obj):
+    """All column values of an ORM row, the shape the unfiltered-model routes have always returned."""
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
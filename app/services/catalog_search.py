@@ -0,0 +1,273 @@
+"""Faceted search over newspapers, magazines and milk packages from an in-memory inverted index.
+
+The active catalog is loaded once into a CatalogIndex and rebuilt when bump_catalog_version()
+records an admin change (or after CATALOG_CACHE_TTL, so other worker processes catch up).
+Titles are numbered in (price, name) order and every posting list -- per name token, name
+prefix, language, genre and kind -- is a Python int used as a bitset over those numbers. A
+query is then a few ANDs and ORs of ints, a price range is a contiguous run of bits, and a
+facet count is the popcount of the result ANDed with the value's bitset.
+
+Each query word matches a name token exactly, as a prefix, or within an edit distance of 1
+(2 for words of 8+ letters). Misspellings are found through a deletion index (every token
+with one or two letters removed), so no scan of the vocabulary is needed. Results rank exact
+matches, then prefix, then fuzzy ones, cheapest first within each tier.
+
+scripts/bench_search.py times queries over a generated 10k-title catalog.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database.models import Newspaper, Magazine, MilkPackage
+from app.services.catalog_cache import catalog_version, CATALOG_CACHE_TTL
+
+KINDS = ("newspaper", "magazine", "milk")
+FACETS = ("kind", "language", "genre")
+# upper bounds of the price facet's buckets; the last bucket is open-ended
+PRICE_BUCKETS = (5, 10, 20, 50)
+# prefixes up to this length have their bitset precomputed; longer ones OR the matching tokens'
+PRECOMPUTED_PREFIX = 2
+MIN_FUZZY_LENGTH = 4
+MAX_RESULTS = 100
+MAX_QUERY_LENGTH = 200
+# longer queries are cut off at this many words; each one costs a prefix and a typo lookup
+MAX_QUERY_WORDS = 8
+
+_token_re = re.compile(r"\w+")
+
+
+def tokens(text):
+    return _token_re.findall((text or "").lower())
+
+
+def max_distance(word):
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return 2 if len(word) >= 8 else 1
+
+
+def deletes(word, distance):
+    """`word` with up to `distance` letters removed, itself included."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance of a and b, or limit + 1 once it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _count_bits(mask):
+    return bin(mask).count("1")
+
+
+# int.bit_count() is new in Python 3.10; render.yaml deploys 3.9
+popcount = getattr(int, "bit_count", _count_bits)
+
+
+def _bits(mask, skip, limit):
+    """Positions of the set bits of `mask`, lowest first, after skipping `skip` of them."""
+    positions = []
+    while mask and len(positions) < limit:
+        low = mask & -mask
+        if skip:
+            skip -= 1
+        else:
+            positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+class CatalogIndex:
+    """Bitset postings over a fixed list of catalog titles; see the module docstring."""
+
+    def __init__(self, titles):
+        self.titles = sorted(titles, key=lambda t: (t["price"] if t["price"] is not None else float("inf"), t["name"] or ""))
+        self.all = (1 << len(self.titles)) - 1
+        self.prices = [t["price"] if t["price"] is not None else float("inf") for t in self.titles]
+        self.postings = {}
+        self.prefixes = {}
+        self.facets = {facet: {} for facet in FACETS}
+        self.complementary = 0
+        for position, title in enumerate(self.titles):
+            bit = 1 << position
+            for token in set(tokens(title["name"])):
+                self.postings[token] = self.postings.get(token, 0) | bit
+                for length in range(1, min(len(token), PRECOMPUTED_PREFIX) + 1):
+                    self.prefixes[token[:length]] = self.prefixes.get(token[:length], 0) | bit
+            if title.get("is_complementary"):
+                self.complementary |= bit
+            for facet in FACETS:
+                value = title.get(facet)
+                if value:
+                    self.facets[facet][value] = self.facets[facet].get(value, 0) | bit
+        self.vocabulary = sorted(self.postings)
+        self.longest = max(map(len, self.vocabulary), default=0)
+        self.misspellings = {}
+        for token in self.vocabulary:
+            for variant in deletes(token, max_distance(token)):
+                self.misspellings.setdefault(variant, []).append(token)
+
+    def _prefix(self, word):
+        if len(word) <= PRECOMPUTED_PREFIX:
+            return self.prefixes.get(word, 0)
+        mask = 0
+        for token in self.vocabulary[bisect_left(self.vocabulary, word):bisect_left(self.vocabulary, word + "\U0010ffff")]:
+            mask |= self.postings[token]
+        return mask
+
+    def _fuzzy(self, word):
+        limit = max_distance(word)
+        # a word this much longer than every token can't be a typo of one, and its
+        # deletions alone would cost time and memory quadratic in its length
+        if not limit or len(word) > self.longest + limit:
+            return 0
+        mask = 0
+        candidates = {token for variant in deletes(word, limit) for token in self.misspellings.get(variant, ())}
+        for token in candidates:
+            if edit_distance(word, token, limit) <= limit:
+                mask |= self.postings[token]
+        return mask
+
+    def _text(self, query):
+        """(exact, exact or prefix, any) bitsets of the titles matching every word of `query`."""
+        exact = prefix = fuzzy = self.all
+        for word in dict.fromkeys(tokens(query)[:MAX_QUERY_WORDS]):
+            word_exact = self.postings.get(word, 0)
+            word_prefix = word_exact | self._prefix(word)
+            exact &= word_exact
+            prefix &= word_prefix
+            fuzzy &= word_prefix | self._fuzzy(word)
+        return exact, prefix, fuzzy
+
+    def _price_range(self, min_price=None, max_price=None):
+        low = bisect_left(self.prices, min_price) if min_price is not None else 0
+        high = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        return ((1 << high) - 1) ^ ((1 << low) - 1) if high > low else 0
+
+    def _any_of(self, facet, values):
+        mask = 0
+        for value in values:
+            mask |= self.facets[facet].get(value, 0)
+        return mask
+
+    def search(self, query="", filters=None, min_price=None, max_price=None, complementary=None, limit=20, offset=0):
+        """Titles matching `query` and the filters, with counts per facet value.
+
+        `filters` maps a facet in FACETS to the values to keep: several values of one facet
+        are ORed, different facets ANDed. Each facet's counts apply every filter but its own,
+        so the other values of a chosen facet still show how many titles they would add.
+        `complementary` keeps only the magazines given free with a newspaper (True) or
+        everything else (False).
+        """
+        exact, prefix, fuzzy = self._text(query)
+        constraints = {facet: self._any_of(facet, values) for facet, values in (filters or {}).items() if values}
+        if min_price is not None or max_price is not None:
+            constraints["price"] = self._price_range(min_price, max_price)
+        if complementary is not None:
+            constraints["complementary"] = self.complementary if complementary else self.all & ~self.complementary
+
+        def constrained(skip=None):
+            mask = fuzzy
+            for facet, allowed in constraints.items():
+                if facet != skip:
+                    mask &= allowed
+            return mask
+
+        matched = constrained()
+        facets = {}
+        for facet in FACETS:
+            base = constrained(skip=facet)
+            counts = {value: popcount(base & bits) for value, bits in self.facets[facet].items()}
+            facets[facet] = {value: count for value, count in sorted(counts.items()) if count}
+        base = constrained(skip="price")
+        edges = (0,) + PRICE_BUCKETS
+        facets["price"] = {
+            (f"{low}-{high}" if high is not None else f"{low}+"): popcount(base & self._price_range(low, high - 0.005 if high else None))
+            for low, high in zip(edges, PRICE_BUCKETS + (None,))
+        }
+
+        limit = max(0, min(limit, MAX_RESULTS))
+        positions = []
+        for tier in (exact & matched, prefix & matched & ~exact, matched & ~prefix):
+            count = popcount(tier)
+            if offset >= count:
+                offset -= count
+                continue
+            positions += _bits(tier, offset, limit - len(positions))
+            offset = 0
+            if len(positions) == limit:
+                break
+        return {
+            "total": popcount(matched),
+            "results": [self.titles[position] for position in positions],
+            "facets": facets,
+        }
+
+
+def load_titles(db: Session):
+    """The active catalog as search titles: one dict per newspaper, magazine and milk package."""
+    titles = []
+    for id_, name, language, genre, price in db.execute(select(
+        Newspaper.id, Newspaper.name, Newspaper.language, Newspaper.genre, Newspaper.price_daily
+    ).where(Newspaper.is_active == True)):
+        titles.append({"kind": "newspaper", "id": id_, "name": name, "language": language, "genre": genre, "price": price})
+    for id_, name, language, genre, price, complementary, newspaper_id in db.execute(select(
+        Magazine.id, Magazine.name, Magazine.language, Magazine.genre, Magazine.price, Magazine.is_complementary, Magazine.newspaper_id
+    ).where(Magazine.is_active == True)):
+        titles.append({
+            "kind": "magazine", "id": id_, "name": name, "language": language, "genre": genre, "price": price,
+            "is_complementary": bool(complementary), "newspaper_id": newspaper_id,
+        })
+    for id_, name, quantity_ml, price in db.execute(select(
+        MilkPackage.id, MilkPackage.name, MilkPackage.quantity_ml, MilkPackage.price_daily
+    ).where(MilkPackage.is_active == True)):
+        titles.append({"kind": "milk", "id": id_, "name": name, "language": None, "genre": None, "price": price, "quantity_ml": quantity_ml})
+    return titles
+
+
+_lock = threading.Lock()
+_index = None
+# (catalog version, monotonic expiry) the current index was built for
+_built = (None, 0.0)
+
+
+def catalog_index(db: Session):
+    """The index of the current catalog, rebuilt after an admin change or CATALOG_CACHE_TTL.
+
+    One request rebuilds it while the others keep searching the previous index.
+    """
+    global _index, _built
+    version = catalog_version()
+    if _index is not None and _built[0] == version and _built[1] > time.monotonic():
+        return _index
+    if _index is not None and not _lock.acquire(blocking=False):
+        return _index
+    if _index is None:
+        _lock.acquire()
+    try:
+        if _index is None or _built[0] != version or _built[1] <= time.monotonic():
+            index = CatalogIndex(load_titles(db))
+            _index, _built = index, (version, time.monotonic() + CATALOG_CACHE_TTL)
+        return _index
+    finally:
+        _lock.release()
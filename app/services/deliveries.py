@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, time
+import time as _time
+from sqlalchemy import select, insert, update, delete, literal, union_all, exists, or_, true, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database.models import Subscription, Delivery
+from app.services.pauses import overlapping_window
+
+# Default drop time for generated deliveries (matches date-only toggles)
+DEFAULT_DELIVERY_TIME = time(8, 0)
+# the day window is one UNION ALL term per day; SQLite allows at most 500 of them
+MAX_MATERIALIZE_DAYS = 366
+
+
+def insert_skipping_duplicates(db: Session):
+    """INSERT into deliveries that skips rows colliding with uq_deliveries_subscription_day.
+
+    Two writers adding the same (subscription, day) -- a double-clicked toggle, a toggle racing
+    the materializer -- then leave exactly one row instead of failing or duplicating it.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(Delivery.__table__).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(Delivery.__table__).on_conflict_do_nothing()
+    return insert(Delivery.__table__)
+
+
+def _days_window(start, days):
+    """One row per day of the window: the delivery slot and the [day_start, day_end) bounds."""
+    rows = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        day_start = datetime.combine(day, time.min)
+        rows.append(select(
+            literal(datetime.combine(day, DEFAULT_DELIVERY_TIME), DateTime).label("slot"),
+            literal(day_start, DateTime).label("day_start"),
+            literal(day_start + timedelta(days=1), DateTime).label("day_end"),
+        ))
+    return union_all(*rows).subquery("days")
+
+
+def _schedule_select(days, created_at, first_id, last_id):
+    """SELECT producing every missing (subscription, day) delivery for subscriptions in [first_id, last_id]."""
+    S = Subscription
+    paused = overlapping_window(S.id, days.c.day_start, days.c.day_end)
+    already_scheduled = exists().where(
+        Delivery.subscription_id == S.id,
+        Delivery.scheduled_date >= days.c.day_start,
+        Delivery.scheduled_date < days.c.day_end
+    )
+    return select(
+        S.user_id, S.id, days.c.slot, literal("pending"), literal(created_at, DateTime)
+    ).select_from(S).join(days, true()).where(
+        S.is_active == True,
+        S.id >= first_id,
+        S.id <= last_id,
+        or_(S.start_date == None, S.start_date < days.c.day_end),
+        or_(S.end_date == None, S.end_date >= days.c.day_start),
+        ~paused,
+        ~already_scheduled
+    )
+
+
+def materialize_deliveries(db: Session, days: int = 30, start=None, chunk_size: int = 5000):
+    """Create the pending Delivery rows for every active subscription over the next `days` days.
+
+    Active subscriptions are walked in id order, `chunk_size` at a time, and each chunk is filled
+    with a single INSERT ... SELECT against the day window and committed on its own. Days that
+    are paused, outside start/end dates or already have a delivery are skipped, so re-running
+    over the same window is a no-op.
+    """
+    start = start or datetime.utcnow().date()
+    days_window = _days_window(start, days)
+    created_at = datetime.utcnow()
+    columns = [
+        Delivery.user_id, Delivery.subscription_id, Delivery.scheduled_date,
+        Delivery.status, Delivery.created_at
+    ]
+
+    started = _time.perf_counter()
+    scanned = 0
+    inserted = 0
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(Subscription.id).where(
+                Subscription.is_active == True,
+                Subscription.id > last_id
+            ).order_by(Subscription.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        scanned += len(ids)
+        result = db.execute(
+            insert_skipping_duplicates(db).from_select(columns, _schedule_select(days_window, created_at, ids[0], ids[-1]))
+        )
+        inserted += max(result.rowcount, 0)
+        db.commit()
+        last_id = ids[-1]
+
+    elapsed = _time.perf_counter() - started
+    return {
+        "start": start.isoformat(),
+        "days": days,
+        "subscriptions_scanned": scanned,
+        "deliveries_created": inserted,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed) if elapsed > 0 else inserted,
+    }
+
+
+def resolve_days(db: Session, subscription_id, days):
+    """Map each of `days` to the subscription's delivery on it ({"id", "status", "time"}) or None.
+
+    One range query over min(days)..max(days), served by ix_deliveries_subscription_date.
+    """
+    found = dict.fromkeys(days)
+    if not days:
+        return found
+    rows = db.execute(
+        select(Delivery.id, Delivery.status, Delivery.scheduled_date).where(
+            Delivery.subscription_id == subscription_id,
+            Delivery.scheduled_date >= datetime.combine(min(days), time.min),
+            Delivery.scheduled_date < datetime.combine(max(days) + timedelta(days=1), time.min)
+        )
+    )
+    for delivery_id, status, scheduled in rows:
+        day = scheduled.date()
+        if day in found:
+            found[day] = {"id": delivery_id, "status": status, "time": scheduled.time().isoformat()}
+    return found
+
+
+def apply_delivery_changes(db: Session, subscription: Subscription, add_days, remove_days):
+    """Schedule deliveries on `add_days` and drop them on `remove_days`, in one transaction.
+
+    Adding a day that already has a delivery keeps it (a cancelled one goes back to pending);
+    removing a day without one is a no-op, and delivered rows are history and stay. Existing
+    rows are resolved with one query; the changes are one INSERT, one UPDATE and one DELETE.
+    Returns the counts and the resulting day map for every requested day.
+    """
+    existing = resolve_days(db, subscription.id, sorted(set(add_days) | set(remove_days)))
+    to_insert, to_restore, to_delete = [], [], []
+    for day in sorted(add_days):
+        current = existing[day]
+        if current is None:
+            to_insert.append(day)
+        elif current["status"] == "cancelled":
+            to_restore.append(current["id"])
+    for day in sorted(remove_days):
+        current = existing[day]
+        if current is not None and current["status"] != "delivered":
+            to_delete.append(current["id"])
+
+    created_at = datetime.utcnow()
+    added = restored = removed = 0
+    if to_insert:
+        added = db.execute(insert_skipping_duplicates(db), [{
+            "user_id": subscription.user_id,
+            "subscription_id": subscription.id,
+            "scheduled_date": datetime.combine(day, DEFAULT_DELIVERY_TIME),
+            "status": "pending",
+            "created_at": created_at,
+        } for day in to_insert]).rowcount
+    if to_restore:
+        restored = db.execute(
+            update(Delivery).where(Delivery.id.in_(to_restore), Delivery.status == "cancelled")
+            .values(status="pending", cancelled_by_pause=False).execution_options(synchronize_session=False)
+        ).rowcount
+    if to_delete:
+        removed = db.execute(
+            delete(Delivery).where(Delivery.id.in_(to_delete), Delivery.status != "delivered")
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    days = resolve_days(db, subscription.id, sorted(existing))
+    db.commit()
+    return {
+        "added": max(added, 0) + max(restored, 0),
+        "removed": max(removed, 0),
+        "days": {day.isoformat(): entry for day, entry in days.items()},
+    }
@@ -0,0 +1,39 @@
+"""orjson responses built straight from row tuples.
+
+FastAPI turns a route's return value into JSON by validating it against the response_model
+(reading every ORM attribute) and dumping the result, or, without a response model, by
+walking it with jsonable_encoder and json.dumps. For thousands of rows either costs several
+times the query. The big list routes instead select just the columns their response
+carries, zip them into dicts and return an ORJSONResponse, which FastAPI sends as is. Their
+response_model stays on the decorator for the OpenAPI schema.
+
+scripts/bench_json.py compares the paths on 10k-row payloads.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content):
+    """Compact JSON bytes; datetimes, dates, numpy values and int keys are handled natively."""
+    return orjson.dumps(content, option=OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+def fields(schema):
+    """Field names of a response schema, in declaration order."""
+    return tuple(schema.model_fields)
+
+
+def columns(model, schema):
+    """The model's columns named like the schema's scalar fields, for a select() of exactly the response."""
+    return [getattr(model, name) for name in fields(schema) if name in model.__table__.columns]
+
+
+def as_dicts(rows, keys):
+    return [dict(zip(keys, row)) for row in rows]
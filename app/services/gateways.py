@@ -0,0 +1,214 @@
+"""Shared payment gateway clients.
+
+One long-lived client per provider with a pooled HTTP session, a strict per-call timeout and a
+circuit breaker. Calls run on a dedicated thread pool so a hanging provider can hold at most
+that pool, never the request workers, for longer than the timeout.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "5"))
+GATEWAY_POOL_SIZE = int(os.getenv("GATEWAY_POOL_SIZE", "20"))
+GATEWAY_LIST_PAGE_SIZE = 100  # the most either provider returns per list call
+BREAKER_FAILURES = int(os.getenv("GATEWAY_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("GATEWAY_BREAKER_RESET", "30"))
+
+_executor = ThreadPoolExecutor(max_workers=GATEWAY_POOL_SIZE, thread_name_prefix="gateway")
+
+
+class GatewayUnavailable(Exception):
+    """The provider is not configured, its circuit is open, or the call failed."""
+
+
+class GatewayNotConfigured(GatewayUnavailable):
+    """The provider has no credentials; unlike the other failures, retrying will not help."""
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors; after `reset_seconds` lets one trial call through."""
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+def _pooled_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GATEWAY_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class Gateway:
+    name = None
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configured(self):
+        raise NotImplementedError
+
+    def _build_client(self):
+        raise NotImplementedError
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def call(self, fn):
+        """Run fn(client) off the request thread, enforcing the timeout and circuit breaker."""
+        if not self.configured():
+            raise GatewayNotConfigured(f"{self.name} is not configured")
+        if not self.breaker.allow():
+            raise GatewayUnavailable(f"{self.name} circuit is open")
+        future = _executor.submit(lambda: fn(self.client))
+        try:
+            # the HTTP timeout should fire first; this also bounds time spent queued for the pool
+            result = future.result(timeout=GATEWAY_TIMEOUT + 1)
+        except Exception as e:
+            future.cancel()
+            self.breaker.record_failure()
+            raise GatewayUnavailable(f"{self.name}: {e or type(e).__name__}") from e
+        self.breaker.record_success()
+        return result
+
+
+class RazorpayGateway(Gateway):
+    name = "razorpay"
+
+    def configured(self):
+        return bool(os.getenv("RAZORPAY_PUBLIC_KEY")) and bool(os.getenv("RAZORPAY_SECRET_KEY"))
+
+    def _build_client(self):
+        import razorpay
+        options = {}
+        if os.getenv("RAZORPAY_BASE_URL"):
+            options["base_url"] = os.getenv("RAZORPAY_BASE_URL")
+        return razorpay.Client(
+            session=_pooled_session(),
+            auth=(os.getenv("RAZORPAY_PUBLIC_KEY", ""), os.getenv("RAZORPAY_SECRET_KEY", "")),
+            **options
+        )
+
+    def create_order(self, amount, notes):
+        return self.call(lambda client: client.order.create(
+            data={"amount": int(round(amount * 100)), "currency": "INR", "notes": notes},  # in paise
+            timeout=GATEWAY_TIMEOUT
+        ))
+
+    def list_orders(self, since, skip=0):
+        """One page of orders created at or after `since` (unix seconds), newest first."""
+        return self.call(lambda client: client.order.all(
+            data={"from": since, "count": GATEWAY_LIST_PAGE_SIZE, "skip": skip}, timeout=GATEWAY_TIMEOUT
+        ))
+
+
+class StripeGateway(Gateway):
+    name = "stripe"
+
+    def configured(self):
+        return bool(os.getenv("STRIPE_SECRET_KEY"))
+
+    def _build_client(self):
+        import stripe
+        options = {}
+        if os.getenv("STRIPE_API_BASE"):
+            options["base_addresses"] = {"api": os.getenv("STRIPE_API_BASE")}
+        return stripe.StripeClient(
+            os.getenv("STRIPE_SECRET_KEY", ""),
+            http_client=stripe.RequestsClient(timeout=GATEWAY_TIMEOUT, session=_pooled_session()),
+            max_network_retries=0,
+            **options
+        )
+
+    @staticmethod
+    def _intents(client):
+        return getattr(client, "v1", client).payment_intents
+
+    def create_payment_intent(self, amount, metadata):
+        return self.call(lambda client: self._intents(client).create(params={
+            "amount": int(round(amount * 100)),
+            "currency": "inr",
+            "metadata": {k: str(v) for k, v in metadata.items() if v is not None},
+        }))
+
+    def retrieve_payment_intent(self, intent_id):
+        return self.call(lambda client: self._intents(client).retrieve(intent_id))
+
+    def list_payment_intents(self, since, starting_after=None):
+        """One page of intents created at or after `since` (unix seconds), newest first."""
+        params = {"created": {"gte": since}, "limit": GATEWAY_LIST_PAGE_SIZE}
+        if starting_after:
+            params["starting_after"] = starting_after
+        return self.call(lambda client: self._intents(client).list(params=params))
+
+
+razorpay_gateway = RazorpayGateway()
+stripe_gateway = StripeGateway()
+
+
+def create_payment_order(amount, notes):
+    """Open a payment with the first available provider: Razorpay, then Stripe.
+
+    Returns {"provider", "id", "client_secret"}; raises GatewayUnavailable if every provider is
+    unconfigured, open-circuited or failing, GatewayNotConfigured if none is configured at all.
+    """
+    errors = []
+    try:
+        order = razorpay_gateway.create_order(amount, notes)
+        return {"provider": "razorpay", "id": order["id"], "client_secret": None}
+    except GatewayUnavailable as e:
+        errors.append(e)
+    try:
+        intent = stripe_gateway.create_payment_intent(amount, notes)
+        return {"provider": "stripe", "id": intent.id, "client_secret": intent.client_secret}
+    except GatewayUnavailable as e:
+        errors.append(e)
+    permanent = all(isinstance(e, GatewayNotConfigured) for e in errors)
+    raise (GatewayNotConfigured if permanent else GatewayUnavailable)("; ".join(map(str, errors)))
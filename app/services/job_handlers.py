@@ -0,0 +1,79 @@
+"""Background job handlers, registered with @job and run by the worker pool in app/services/jobs.py."""
+from datetime import date
+from sqlalchemy.orm import Session
+from app.database.models import Payment
+from app.services.jobs import job, Attempt
+from app.services.gateways import create_payment_order, stripe_gateway, GatewayUnavailable, GatewayNotConfigured
+from app.services.deliveries import materialize_deliveries
+from app.services.billing import run_billing
+from app.services.payment_events import apply_payment_events, reconcile_pending_payments
+from app.services.analytics import rebuild_analytics
+
+
+def checkout(payment: Payment, order=None):
+    """The checkout details the dashboard opens the payment with, as create_subscription used to return."""
+    body = {"subscription_id": payment.subscription_id, "payment_id": payment.id, "amount": payment.amount}
+    if order is None:
+        return {**body, "payment_method": "pending", "error": "Payment processor unavailable"}
+    if order["provider"] == "razorpay":
+        return {**body, "razorpay_order_id": order["id"], "payment_method": "razorpay"}
+    return {**body, "client_secret": order["client_secret"], "payment_method": "stripe"}
+
+
+def release_payment(db: Session, payload):
+    """on_dead for payment_order: a payment still waiting for its order goes back to pending."""
+    payment = db.query(Payment).filter(Payment.id == payload.get("payment_id")).first()
+    if payment is not None and payment.payment_method == "queued" and not payment.stripe_payment_id:
+        payment.payment_method = "pending"
+
+
+@job("payment_order", on_dead=release_payment)
+def open_payment_order(db: Session, payload, attempt: Attempt):
+    """Open a gateway order for a queued payment: Razorpay, then Stripe.
+
+    While providers are unavailable the job is retried; when no provider is configured, after
+    the last attempt, or if the job dies of any other error, the payment is left pending for
+    POST /api/admin/import/payment-orders to pick up later.
+    """
+    payment = db.query(Payment).filter(Payment.id == payload["payment_id"]).first()
+    if payment is None:
+        raise LookupError(f"Payment {payload['payment_id']} not found")
+    if payment.stripe_payment_id:
+        # an earlier attempt opened the order but did not get to finish the job
+        if payment.payment_method == "stripe":
+            intent = stripe_gateway.retrieve_payment_intent(payment.stripe_payment_id)
+            return checkout(payment, {"provider": "stripe", "id": intent.id, "client_secret": intent.client_secret})
+        return checkout(payment, {"provider": payment.payment_method, "id": payment.stripe_payment_id})
+    try:
+        order = create_payment_order(payment.amount, {"user_id": payment.user_id, "subscription_id": payment.subscription_id})
+    except GatewayUnavailable as e:
+        if not attempt.final and not isinstance(e, GatewayNotConfigured):
+            raise
+        payment.payment_method = "pending"
+        db.commit()
+        return checkout(payment)
+    payment.stripe_payment_id = order["id"]
+    payment.payment_method = order["provider"]
+    db.commit()
+    return checkout(payment, order)
+
+
+@job("materialize_deliveries")
+def materialize_deliveries_job(db: Session, payload, attempt: Attempt):
+    start = date.fromisoformat(payload["start"]) if payload.get("start") else None
+    return materialize_deliveries(db, days=payload.get("days", 30), start=start)
+
+
+@job("run_billing")
+def run_billing_job(db: Session, payload, attempt: Attempt):
+    return run_billing(db, date.fromisoformat(payload["start"]), date.fromisoformat(payload["end"]))
+
+
+@job("reconcile_payments")
+def reconcile_payments_job(db: Session, payload, attempt: Attempt):
+    return {"events": apply_payment_events(db), "reconciled": reconcile_pending_payments(db)}
+
+
+@job("rebuild_analytics")
+def rebuild_analytics_job(db: Session, payload, attempt: Attempt):
+    return rebuild_analytics(db)
@@ -0,0 +1,305 @@
+"""Durable background jobs stored in the database and run by an in-process worker pool.
+
+enqueue() adds a Job row in the caller's transaction, so the work is queued exactly when the
+request's changes commit. Worker threads claim the queued job with the highest priority and
+earliest run_at in one UPDATE ... RETURNING, holding it under a lease of JOB_LEASE_SECONDS.
+A job moves queued -> running -> done. When its handler raises, it goes back to queued
+with exponential backoff (JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), capped), or to dead
+after max_attempts: the dead-letter state, kept for inspection and retry_job(). A running
+job whose lease expired (its process died) is queued again, so work survives restarts.
+
+Handlers are registered with @job("kind") in app/services/job_handlers.py and called as
+handler(db, payload, attempt); their return value is stored as the job's result. A handler
+may also register on_dead(db, payload), called once its job is dead-lettered (out of attempts
+or lease), to leave its records in a state something else can pick up. Workers
+start with the app (JOB_WORKERS per process, 0 for none) or with scripts/run_jobs.py, and
+need nothing but the database.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import orjson
+from sqlalchemy import select, update, delete, func, event
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.database.models import Job
+from app.services.fast_json import dumps
+from app.services.metrics import observe_job
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+JOB_RETENTION = timedelta(days=int(os.getenv("JOB_RETENTION_DAYS", "7")))
+# how often a worker requeues expired leases and purges old finished jobs
+MAINTENANCE_SECONDS = 60
+
+QUEUED, RUNNING, DONE, DEAD = "queued", "running", "done", "dead"
+ERROR_LIMIT = 4000
+
+_handlers = {}
+_dead_handlers = {}
+_wakeup = threading.Condition()
+
+
+class Attempt(NamedTuple):
+    number: int
+    final: bool
+
+
+def job(kind, on_dead=None):
+    """Register the decorated function as the handler for jobs of `kind`."""
+    def register(fn):
+        _handlers[kind] = fn
+        if on_dead is not None:
+            _dead_handlers[kind] = on_dead
+        return fn
+    return register
+
+
+def _notify_workers(session):
+    # one worker per new job, rather than every idle worker racing for the same row
+    count = session.info.pop("jobs_enqueued", 1)
+    with _wakeup:
+        _wakeup.notify(count)
+
+
+def enqueue(db: Session, kind, payload=None, priority=0, run_at=None, max_attempts=JOB_MAX_ATTEMPTS, user_id=None):
+    """Add a job in `db`'s transaction; workers are woken when it commits. Returns the Job.
+
+    `user_id` is the user the job runs for, the only one besides admins who may read it.
+    """
+    new_job = Job(
+        kind=kind, payload=dumps(payload or {}).decode(), user_id=user_id, priority=priority, status=QUEUED, attempts=0,
+        max_attempts=max_attempts, run_at=run_at or datetime.utcnow(), created_at=datetime.utcnow()
+    )
+    db.add(new_job)
+    db.flush()
+    db.info["jobs_enqueued"] = db.info.get("jobs_enqueued", 0) + 1
+    if not event.contains(db, "after_commit", _notify_workers):
+        event.listen(db, "after_commit", _notify_workers)
+    return new_job
+
+
+def retry_delay(attempts):
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), JOB_RETRY_MAX_SECONDS)
+
+
+def claim_next(db: Session):
+    """Claim the next due job for this worker; (id, kind, payload, attempts, max_attempts, created_at, run_at) or None."""
+    now = datetime.utcnow()
+    candidate = select(Job.id).where(Job.status == QUEUED, Job.run_at <= now).order_by(
+        Job.priority.desc(), Job.run_at, Job.id
+    ).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    row = db.execute(
+        update(Job).where(Job.id == candidate, Job.status == QUEUED).values(
+            status=RUNNING, attempts=Job.attempts + 1, started_at=now,
+            lease_until=now + timedelta(seconds=JOB_LEASE_SECONDS)
+        ).returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.created_at, Job.run_at)
+    ).first()
+    db.commit()
+    return row
+
+
+def _finish(db: Session, job_id, **values):
+    db.execute(
+        update(Job).where(Job.id == job_id, Job.status == RUNNING)
+        .values(lease_until=None, **values).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _dead_lettered(db: Session, job_id, kind, payload):
+    on_dead = _dead_handlers.get(kind)
+    if on_dead is None:
+        return
+    try:
+        on_dead(db, orjson.loads(payload or "{}"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("on_dead handler of job %s (%s) failed", job_id, kind)
+
+
+def run_one(db: Session):
+    """Claim and run one due job. Returns False when none was due."""
+    claimed = claim_next(db)
+    if claimed is None:
+        return False
+    job_id, kind, payload, attempts, max_attempts, created_at, run_at = claimed
+    started = time.perf_counter()
+    wait = max((datetime.utcnow() - max(created_at, run_at)).total_seconds(), 0.0)
+    handler = _handlers.get(kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {kind!r}")
+        result = handler(db, orjson.loads(payload or "{}"), Attempt(attempts, attempts >= max_attempts))
+    except Exception:
+        db.rollback()
+        error = traceback.format_exc()[-ERROR_LIMIT:]
+        if attempts >= max_attempts:
+            outcome = DEAD
+            _finish(db, job_id, status=DEAD, last_error=error, finished_at=datetime.utcnow())
+            logger.error("job %s (%s) failed for the last time:\n%s", job_id, kind, error)
+            _dead_lettered(db, job_id, kind, payload)
+        else:
+            outcome = "retried"
+            _finish(db, job_id, status=QUEUED, last_error=error,
+                    run_at=datetime.utcnow() + timedelta(seconds=retry_delay(attempts)))
+    else:
+        outcome = DONE
+        _finish(db, job_id, status=DONE, result=dumps(result).decode(), finished_at=datetime.utcnow())
+    observe_job(kind, outcome, wait, time.perf_counter() - started)
+    return True
+
+
+def requeue_expired(db: Session):
+    """Requeue running jobs whose lease ran out (dead-lettering those out of attempts)."""
+    now = datetime.utcnow()
+    expired = [Job.status == RUNNING, Job.lease_until < now]
+    dead = db.execute(
+        update(Job).where(*expired, Job.attempts >= Job.max_attempts)
+        .values(status=DEAD, lease_until=None, finished_at=now, last_error="Lease expired")
+        .returning(Job.id, Job.kind, Job.payload)
+        .execution_options(synchronize_session=False)
+    ).all()
+    requeued = db.execute(
+        update(Job).where(*expired).values(status=QUEUED, lease_until=None, run_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    for job_id, kind, payload in dead:
+        _dead_lettered(db, job_id, kind, payload)
+    return {"requeued": max(requeued, 0), "dead": len(dead)}
+
+
+def purge_finished(db: Session, older_than: timedelta = JOB_RETENTION):
+    """Delete done jobs finished more than `older_than` ago; dead ones are kept."""
+    removed = db.execute(
+        delete(Job).where(Job.status == DONE, Job.finished_at < datetime.utcnow() - older_than)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return max(removed, 0)
+
+
+def retry_job(db: Session, job_id):
+    """Queue a dead job again with a fresh set of attempts. Returns False if it is not dead."""
+    retried = db.execute(
+        update(Job).where(Job.id == job_id, Job.status == DEAD)
+        .values(status=QUEUED, attempts=0, run_at=datetime.utcnow(), finished_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if retried:
+        _notify_workers(db)
+    return retried > 0
+
+
+def queue_depth(db: Session):
+    """{(kind, status): count} of queued, running and dead jobs."""
+    rows = db.execute(
+        select(Job.kind, Job.status, func.count()).where(Job.status.in_((QUEUED, RUNNING, DEAD)))
+        .group_by(Job.kind, Job.status)
+    )
+    return {(kind, status): count for kind, status, count in rows}
+
+
+def job_status(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at,
+        "run_at": job.run_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": orjson.loads(job.result) if job.result else None,
+        "error": job.last_error.strip().splitlines()[-1] if job.last_error else None,
+    }
+
+
+class WorkerPool:
+    """Threads running jobs until stop(); each sleeps up to JOB_POLL_SECONDS when the queue is empty."""
+
+    def __init__(self, workers=JOB_WORKERS, poll_seconds=JOB_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._stopping = threading.Event()
+        self._threads = []
+        self._maintenance_lock = threading.Lock()
+        self._last_maintenance = 0.0
+
+    def start(self):
+        # importing the handlers registers them
+        import app.services.job_handlers  # noqa: F401
+
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        with _wakeup:
+            _wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _maintain(self, db):
+        if time.monotonic() - self._last_maintenance < MAINTENANCE_SECONDS:
+            return
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_maintenance = time.monotonic()
+            requeue_expired(db)
+            purge_finished(db)
+        finally:
+            self._maintenance_lock.release()
+
+    def _run(self):
+        db = SessionLocal()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self._maintain(db)
+                    if run_one(db):
+                        continue
+                except Exception:
+                    db.rollback()
+                    logger.exception("job worker error")
+                with _wakeup:
+                    _wakeup.wait(self.poll_seconds)
+        finally:
+            db.close()
+
+
+_pool = None
+
+
+def start_workers(workers=JOB_WORKERS):
+    global _pool
+    if workers > 0 and _pool is None:
+        _pool = WorkerPool(workers).start()
+    return _pool
+
+
+def stop_workers():
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
@@ -0,0 +1,153 @@
+"""Daily route manifests for delivery agents.
+
+A route is one (city, pincode); a stop is one delivery at a customer's address. A single
+ordered query joins deliveries to their subscription, customer, newspapers and milk package
+and is read through one server-side cursor (yield_per). Rows arrive grouped by route and
+stop, so records are emitted as soon as a stop's last row is seen: one "stop" record per
+delivery, then a "route" record with that route's totals. Memory stays at one route's item
+tallies however large the city is.
+"""
+import csv
+import io
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database.models import Delivery, Subscription, User, Newspaper, MilkPackage, subscription_newspapers
+from app.services.fast_json import dumps
+
+MANIFEST_FETCH_SIZE = 2000
+# Deliveries an agent still has to drop (or already dropped, when a sheet is reprinted)
+MANIFEST_STATUSES = ("pending", "delivered")
+
+CSV_COLUMNS = [
+    "record", "city", "pincode", "stop", "delivery_id", "subscription_id", "customer", "phone", "address",
+    "newspapers", "newspaper_count", "milk_package", "milk_count", "milk_ml", "status",
+]
+
+
+def _manifest_select(day, city=None, pincode=None):
+    day_start = datetime.combine(day, datetime.min.time())
+    query = select(
+        User.city, User.pincode, User.address, User.full_name, User.phone,
+        Delivery.id, Delivery.subscription_id, Delivery.status,
+        Newspaper.name, MilkPackage.name, MilkPackage.quantity_ml,
+    ).select_from(Delivery).join(
+        Subscription, Subscription.id == Delivery.subscription_id
+    ).join(
+        User, User.id == Delivery.user_id
+    ).outerjoin(
+        subscription_newspapers, subscription_newspapers.c.subscription_id == Subscription.id
+    ).outerjoin(
+        Newspaper, Newspaper.id == subscription_newspapers.c.newspaper_id
+    ).outerjoin(
+        MilkPackage, MilkPackage.id == Subscription.milk_package_id
+    ).where(
+        Delivery.scheduled_date >= day_start,
+        Delivery.scheduled_date < day_start + timedelta(days=1),
+        Delivery.status.in_(MANIFEST_STATUSES),
+    )
+    if city:
+        query = query.where(User.city == city)
+    if pincode:
+        query = query.where(User.pincode == pincode)
+    return query.order_by(User.city, User.pincode, User.address, Delivery.id, Newspaper.name)
+
+
+def _route_record(city, pincode, stops, newspapers, milk):
+    return {
+        "record": "route",
+        "city": city,
+        "pincode": pincode,
+        "stops": stops,
+        "newspaper_count": sum(newspapers.values()),
+        "newspapers": dict(sorted(newspapers.items())),
+        "milk_count": sum(count for count, _ in milk.values()),
+        "milk_ml": sum(ml for _, ml in milk.values()),
+        "milk_packages": {name: count for name, (count, _) in sorted(milk.items())},
+    }
+
+
+def iter_manifest(db: Session, day, city=None, pincode=None, fetch_size=MANIFEST_FETCH_SIZE):
+    """Yield stop records in route order, each route followed by its totals record."""
+    rows = db.execute(_manifest_select(day, city, pincode).execution_options(yield_per=fetch_size))
+    route = stop = None
+    stop_number = 0
+    route_newspapers, route_milk = Counter(), {}
+
+    def finish_stop():
+        route_newspapers.update(stop["newspapers"])
+        if stop["milk_package"]:
+            count, ml = route_milk.get(stop["milk_package"], (0, 0))
+            route_milk[stop["milk_package"]] = (count + 1, ml + stop["milk_ml"])
+        return stop
+
+    for city_, pincode_, address, name, phone, delivery_id, subscription_id, status, newspaper, milk, milk_ml in rows:
+        if stop is not None and delivery_id != stop["delivery_id"]:
+            yield finish_stop()
+            stop = None
+        if (city_, pincode_) != route:
+            if route is not None:
+                yield _route_record(*route, stop_number, route_newspapers, route_milk)
+            route, stop_number = (city_, pincode_), 0
+            route_newspapers, route_milk = Counter(), {}
+        if stop is None:
+            stop_number += 1
+            stop = {
+                "record": "stop",
+                "city": city_,
+                "pincode": pincode_,
+                "stop": stop_number,
+                "delivery_id": delivery_id,
+                "subscription_id": subscription_id,
+                "customer": name,
+                "phone": phone,
+                "address": address,
+                "newspapers": [],
+                "milk_package": milk,
+                "milk_ml": milk_ml or 0,
+                "status": status,
+            }
+        if newspaper:
+            stop["newspapers"].append(newspaper)
+    if stop is not None:
+        yield finish_stop()
+    if route is not None:
+        yield _route_record(*route, stop_number, route_newspapers, route_milk)
+
+
+def stream_ndjson(records):
+    for record in records:
+        yield dumps(record).decode() + "\n"
+
+
+def _csv_row(record):
+    if record["record"] == "stop":
+        return {
+            **{k: record[k] for k in CSV_COLUMNS if k in record and k != "newspapers"},
+            "newspapers": "; ".join(record["newspapers"]),
+            "newspaper_count": len(record["newspapers"]),
+            "milk_count": 1 if record["milk_package"] else 0,
+        }
+    # route totals: the item columns list per-item counts for loading the van
+    return {
+        "record": "route", "city": record["city"], "pincode": record["pincode"], "stop": record["stops"],
+        "newspapers": "; ".join(f"{name} x{count}" for name, count in record["newspapers"].items()),
+        "newspaper_count": record["newspaper_count"],
+        "milk_package": "; ".join(f"{name} x{count}" for name, count in record["milk_packages"].items()),
+        "milk_count": record["milk_count"], "milk_ml": record["milk_ml"],
+    }
+
+
+def stream_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow(_csv_row(record))
+        # flush in batches rather than per row to keep chunk overhead down
+        if i % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,237 @@
+"""Request, database and background job metrics, exported in the Prometheus text format.
+
+MetricsMiddleware times every request by route template (not raw path, so ids don't explode
+the label set) and tracks requests in flight. instrument_engine() hooks the engine's cursor
+events to count queries and DB time for the request that issued them; a request issuing
+more than QUERY_BUDGET statements is logged as a likely N+1. observe_job() records each
+background job run. render_metrics() produces the /metrics payload.
+
+Everything is kept in plain dicts behind one lock: the hot path is a few dict updates.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+JOB_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+_lock = threading.Lock()
+_in_progress = {}
+_requests = {}
+_latency = {}
+_queries = {}
+_db_seconds = {}
+_query_counts = {}
+_over_budget = {}
+_jobs = {}
+_job_wait = {}
+_job_run = {}
+
+
+class RequestStats:
+    """Queries and DB time of the request running in the current context."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Sync routes run in a threadpool that copies the context, so they update the same RequestStats
+_current = ContextVar("request_stats", default=None)
+
+
+def _observe(histograms, key, buckets, value):
+    entry = histograms.get(key)
+    if entry is None:
+        entry = histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+    entry[0][bisect_left(buckets, value)] += 1
+    entry[1] += value
+    entry[2] += 1
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: also covers streaming responses, which finish after the endpoint returns."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with _lock:
+            _in_progress[method] = _in_progress.get(method, 0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = _route_label(scope)
+            with _lock:
+                _in_progress[method] -= 1
+                key = (method, route, status["code"])
+                _requests[key] = _requests.get(key, 0) + 1
+                _observe(_latency, (method, route), LATENCY_BUCKETS, elapsed)
+                if stats.queries:
+                    _queries[route] = _queries.get(route, 0) + stats.queries
+                    _db_seconds[route] = _db_seconds.get(route, 0.0) + stats.db_seconds
+                    _observe(_query_counts, route, QUERY_COUNT_BUCKETS, stats.queries)
+                    if stats.queries > QUERY_BUDGET:
+                        _over_budget[route] = _over_budget.get(route, 0) + 1
+            if stats.queries > QUERY_BUDGET:
+                logger.warning("%s %s issued %d queries (budget %d, %.1f ms in the database)",
+                               method, route, stats.queries, QUERY_BUDGET, stats.db_seconds * 1000)
+
+
+def instrument_engine(engine):
+    """Count statements and their execution time against the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info["metrics_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = conn.info.pop("metrics_started", None)
+        if stats is not None and started is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - started
+
+
+def observe_job(kind, outcome, wait_seconds, run_seconds):
+    """Record one job run: its outcome (done, retried, dead), time queued and time running."""
+    with _lock:
+        _jobs[(kind, outcome)] = _jobs.get((kind, outcome), 0) + 1
+        _observe(_job_wait, kind, JOB_LATENCY_BUCKETS, wait_seconds)
+        _observe(_job_run, kind, JOB_LATENCY_BUCKETS, run_seconds)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name, histograms, buckets, label_names):
+    lines = []
+    for key, (counts, total, count) in sorted(histograms.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + ("+Inf",), counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {total}")
+        lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+
+def render_metrics(pool=None, job_depth=None):
+    """The current metrics as Prometheus text exposition format (version 0.0.4).
+
+    `pool` is pool_status(); `job_depth` is {(kind, status): count} from jobs.queue_depth().
+    """
+    with _lock:
+        lines = [
+            "# HELP http_requests_in_progress Requests currently being handled.",
+            "# TYPE http_requests_in_progress gauge",
+        ]
+        lines += [f"http_requests_in_progress{_labels(method=m)} {n}" for m, n in sorted(_in_progress.items())]
+        lines += [
+            "# HELP http_requests_total Completed requests by route template and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        lines += [f"http_requests_total{_labels(method=m, route=r, status=s)} {n}"
+                  for (m, r, s), n in sorted(_requests.items())]
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        lines += _histogram_lines("http_request_duration_seconds", _latency, LATENCY_BUCKETS, ("method", "route"))
+        lines += [
+            "# HELP db_queries_total SQL statements executed while handling requests.",
+            "# TYPE db_queries_total counter",
+        ]
+        lines += [f"db_queries_total{_labels(route=r)} {n}" for r, n in sorted(_queries.items())]
+        lines += [
+            "# HELP db_query_seconds_total Time spent executing SQL while handling requests.",
+            "# TYPE db_query_seconds_total counter",
+        ]
+        lines += [f"db_query_seconds_total{_labels(route=r)} {n}" for r, n in sorted(_db_seconds.items())]
+        lines += [
+            "# HELP db_queries_per_request SQL statements per request.",
+            "# TYPE db_queries_per_request histogram",
+        ]
+        lines += _histogram_lines("db_queries_per_request", _query_counts, QUERY_COUNT_BUCKETS, ("route",))
+        lines += [
+            "# HELP db_query_budget_exceeded_total Requests that issued more than QUERY_BUDGET statements.",
+            "# TYPE db_query_budget_exceeded_total counter",
+        ]
+        lines += [f"db_query_budget_exceeded_total{_labels(route=r)} {n}" for r, n in sorted(_over_budget.items())]
+        lines += [
+            "# HELP jobs_total Background job runs by kind and outcome (done, retried, dead).",
+            "# TYPE jobs_total counter",
+        ]
+        lines += [f"jobs_total{_labels(kind=k, outcome=o)} {n}" for (k, o), n in sorted(_jobs.items())]
+        lines += [
+            "# HELP job_wait_seconds Time from a job being due to a worker starting it.",
+            "# TYPE job_wait_seconds histogram",
+        ]
+        lines += _histogram_lines("job_wait_seconds", _job_wait, JOB_LATENCY_BUCKETS, ("kind",))
+        lines += [
+            "# HELP job_run_seconds Time a job's handler ran.",
+            "# TYPE job_run_seconds histogram",
+        ]
+        lines += _histogram_lines("job_run_seconds", _job_run, JOB_LATENCY_BUCKETS, ("kind",))
+    if job_depth is not None:
+        lines += [
+            "# HELP job_queue_depth Jobs queued, running and dead-lettered, by kind.",
+            "# TYPE job_queue_depth gauge",
+        ]
+        lines += [f"job_queue_depth{_labels(kind=k, status=s)} {n}" for (k, s), n in sorted(job_depth.items())]
+    if pool:
+        lines += [
+            "# HELP db_pool_checked_out Connections currently checked out of the pool.",
+            "# TYPE db_pool_checked_out gauge",
+            f"db_pool_checked_out {pool.get('checked_out', 0)}",
+            "# HELP db_pool_checkouts_total Connection checkouts since start.",
+            "# TYPE db_pool_checkouts_total counter",
+            f"db_pool_checkouts_total {pool['checkouts']}",
+            "# HELP db_pool_connects_total New DBAPI connections opened since start.",
+            "# TYPE db_pool_connects_total counter",
+            f"db_pool_connects_total {pool['connects']}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+"""One user's month: the week grid with each day's deliveries, pauses and price.
+
+The grid (weeks, weekend flags) depends only on (year, month), so it is built once with
+calendar.monthcalendar and memoized as immutable tuples; the grid routes mark it cacheable
+for a year. Everything user-specific comes from one UNION ALL range query: the month's
+deliveries -- each carrying its subscription's newspaper count and daily milk price -- and
+the pause windows (own and blackout) of the user's subscriptions overlapping the month.
+Day prices are then computed for all deliveries at once with pricing.day_prices.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import select, union_all, literal, null, func, or_, cast, Integer, Float, DateTime, String
+from app.database.models import Subscription, Delivery, PauseWindow, MilkPackage, subscription_newspapers
+from app.services.pricing import day_prices
+
+CANCELLED = "cancelled"
+
+
+class MonthGrid(NamedTuple):
+    year: int
+    month: int
+    name: str
+    weeks: tuple  # Monday-first weeks of day numbers, 0 outside the month
+    weekend: tuple  # per day of the month, Saturday/Sunday as in pricing
+
+    @property
+    def first(self):
+        return date(self.year, self.month, 1)
+
+    @property
+    def days(self):
+        return len(self.weekend)
+
+
+@lru_cache(maxsize=600)
+def month_grid(year, month):
+    weeks = tuple(tuple(week) for week in calendar.monthcalendar(year, month))
+    days = calendar.monthrange(year, month)[1]
+    first = np.datetime64(date(year, month, 1))
+    weekend = tuple((~np.is_busday(first + np.arange(days))).tolist())
+    return MonthGrid(year, month, calendar.month_name[month], weeks, weekend)
+
+
+def month_view_select(user_id, grid: MonthGrid):
+    """The user's deliveries and pause windows in the month, as one statement.
+
+    Columns: kind ("delivery"/"pause"), subscription_id, starts_at, ends_at, status (the
+    window's reason for pauses), row_id, blackout_id, newspapers, milk_daily, has_milk.
+    """
+    month_start = datetime.combine(grid.first, datetime.min.time())
+    month_end = month_start + timedelta(days=grid.days)
+    newspapers = select(func.count()).where(
+        subscription_newspapers.c.subscription_id == Delivery.subscription_id
+    ).scalar_subquery()
+    deliveries = select(
+        literal("delivery", String).label("kind"), Delivery.subscription_id,
+        Delivery.scheduled_date.label("starts_at"), cast(null(), DateTime).label("ends_at"),
+        Delivery.status, Delivery.id.label("row_id"), cast(null(), Integer).label("blackout_id"),
+        newspapers.label("newspapers"), func.coalesce(MilkPackage.price_daily, 0).label("milk_daily"),
+        (Subscription.milk_package_id != None).label("has_milk"),
+    ).select_from(Delivery).join(
+        Subscription, Subscription.id == Delivery.subscription_id
+    ).outerjoin(
+        MilkPackage, MilkPackage.id == Subscription.milk_package_id
+    ).where(
+        Delivery.user_id == user_id,
+        Delivery.scheduled_date >= month_start,
+        Delivery.scheduled_date < month_end
+    )
+    pauses = select(
+        literal("pause", String), PauseWindow.subscription_id, PauseWindow.starts_at, PauseWindow.ends_at,
+        PauseWindow.reason, PauseWindow.id, PauseWindow.blackout_id,
+        cast(null(), Integer), cast(null(), Float), literal(False),
+    ).select_from(Subscription).join(
+        PauseWindow, PauseWindow.subscription_id == Subscription.id
+    ).where(
+        Subscription.user_id == user_id,
+        Subscription.is_active == True,
+        PauseWindow.starts_at < month_end,
+        or_(PauseWindow.ends_at == None, PauseWindow.ends_at > month_start)
+    )
+    return union_all(deliveries, pauses).order_by("starts_at", "row_id")
+
+
+def _window_days(grid, starts_at, ends_at):
+    """Days of the month (1-based) a [starts_at, ends_at) window touches."""
+    month_last = grid.first + timedelta(days=grid.days - 1)
+    first = max(starts_at.date(), grid.first)
+    last = month_last if ends_at is None else min((ends_at - timedelta(microseconds=1)).date(), month_last)
+    return range(first.day, last.day + 1) if first <= last else range(0)
+
+
+def build_month_view(user_id, grid: MonthGrid, rows):
+    """The month-view body from month_view_select() rows."""
+    days = [
+        {"date": date(grid.year, grid.month, day).isoformat(), "weekend": weekend, "deliveries": [], "paused": [], "price": 0.0}
+        for day, weekend in enumerate(grid.weekend, start=1)
+    ]
+    priced, counts, milk, has_milk, weekend = [], [], [], [], []
+    for kind, subscription_id, starts_at, ends_at, status, row_id, blackout_id, newspapers, milk_daily, with_milk in rows:
+        if kind == "pause":
+            for day in _window_days(grid, starts_at, ends_at):
+                days[day - 1]["paused"].append({"subscription_id": subscription_id, "reason": status, "blackout_id": blackout_id})
+            continue
+        day = days[starts_at.day - 1]
+        day["deliveries"].append({"id": row_id, "subscription_id": subscription_id, "status": status, "time": starts_at.time()})
+        if status != CANCELLED:
+            priced.append(day)
+            counts.append(newspapers)
+            milk.append(milk_daily)
+            has_milk.append(bool(with_milk))
+            weekend.append(day["weekend"])
+
+    for day, price in zip(priced, day_prices(counts, milk, has_milk, weekend).tolist()):
+        day["price"] += price
+    for day in days:
+        day["price"] = round(day["price"], 2)
+    return {
+        "user_id": user_id, "year": grid.year, "month": grid.month, "name": grid.name, "weeks": grid.weeks,
+        "days": days, "total": round(sum(day["price"] for day in days), 2),
+    }
@@ -0,0 +1,170 @@
+"""Pause windows and blackouts, applied as set-based statements.
+
+A pause window is a [starts_at, ends_at) span without deliveries for one subscription
+(ends_at NULL = until resumed). A subscription can have any number of them. A blackout
+(festival holiday, strike) pauses every active subscription in its scope -- city, pincode,
+newspaper and/or milk package, or all of them when unscoped -- with one INSERT ... SELECT of
+windows, and cancels the pending deliveries inside the span with one UPDATE, in the same
+transaction, marking them cancelled_by_pause. Lifting a blackout reverses both; like resuming,
+it only restores deliveries with that mark.
+
+"Is this subscription active on day D" is `active_on(day)`: an index probe on
+(subscription_id, starts_at, ends_at) per subscription, usable for one id or all of them.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, exists, and_, or_, literal, DateTime, String
+from sqlalchemy.orm import Session
+from app.database.models import Subscription, Delivery, User, PauseWindow, Blackout, subscription_newspapers
+
+CANCELLED = "cancelled"
+
+
+def day_bounds(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def overlapping_window(subscription_id, span_start, span_end):
+    """EXISTS a pause window of `subscription_id` overlapping [span_start, span_end)."""
+    return exists().where(
+        PauseWindow.subscription_id == subscription_id,
+        PauseWindow.starts_at < span_end,
+        or_(PauseWindow.ends_at == None, PauseWindow.ends_at > span_start)
+    )
+
+
+def active_on(day):
+    """WHERE clause for subscriptions that deliver on `day`: active, within start/end, not paused."""
+    day_start, day_end = day_bounds(day)
+    S = Subscription
+    return and_(
+        S.is_active == True,
+        or_(S.start_date == None, S.start_date < day_end),
+        or_(S.end_date == None, S.end_date >= day_start),
+        ~overlapping_window(S.id, day_start, day_end)
+    )
+
+
+def is_active_on(db: Session, subscription_id, day):
+    return db.execute(
+        select(Subscription.id).where(Subscription.id == subscription_id, active_on(day))
+    ).first() is not None
+
+
+def scope_select(city=None, pincode=None, newspaper_id=None, milk_package_id=None):
+    """SELECT of active subscription ids matching every given filter."""
+    query = select(Subscription.id).where(Subscription.is_active == True)
+    if city or pincode:
+        query = query.join(User, User.id == Subscription.user_id)
+        if city:
+            query = query.where(User.city == city)
+        if pincode:
+            query = query.where(User.pincode == pincode)
+    if newspaper_id:
+        query = query.where(exists().where(
+            subscription_newspapers.c.subscription_id == Subscription.id,
+            subscription_newspapers.c.newspaper_id == newspaper_id
+        ))
+    if milk_package_id:
+        query = query.where(Subscription.milk_package_id == milk_package_id)
+    return query
+
+
+def _cancel_pending(subscription_ids, starts_at, ends_at):
+    conditions = [
+        Delivery.status == "pending",
+        Delivery.subscription_id.in_(subscription_ids),
+        Delivery.scheduled_date >= starts_at,
+    ]
+    if ends_at is not None:
+        conditions.append(Delivery.scheduled_date < ends_at)
+    return update(Delivery).where(*conditions).values(
+        status=CANCELLED, cancelled_by_pause=True
+    ).execution_options(synchronize_session=False)
+
+
+def _restore_cancelled(subscription_ids, starts_at, ends_at, ignore_blackout_id=None):
+    """Put deliveries a pause cancelled in the span back to pending unless another window still covers them.
+
+    Deliveries cancelled any other way stay cancelled.
+    """
+    still_paused = exists().where(
+        PauseWindow.subscription_id == Delivery.subscription_id,
+        PauseWindow.starts_at <= Delivery.scheduled_date,
+        or_(PauseWindow.ends_at == None, PauseWindow.ends_at > Delivery.scheduled_date)
+    )
+    if ignore_blackout_id is not None:
+        still_paused = still_paused.where(or_(PauseWindow.blackout_id == None, PauseWindow.blackout_id != ignore_blackout_id))
+    conditions = [
+        Delivery.status == CANCELLED,
+        Delivery.cancelled_by_pause == True,
+        Delivery.subscription_id.in_(subscription_ids),
+        Delivery.scheduled_date >= starts_at,
+        ~still_paused,
+    ]
+    if ends_at is not None:
+        conditions.append(Delivery.scheduled_date < ends_at)
+    return update(Delivery).where(*conditions).values(
+        status="pending", cancelled_by_pause=False
+    ).execution_options(synchronize_session=False)
+
+
+def pause_subscriptions(db: Session, subscription_ids, starts_at, ends_at, reason, blackout_id=None):
+    """Add a window to every subscription in `subscription_ids` (a SELECT of ids) and cancel their
+    pending deliveries inside it: one INSERT ... SELECT and one UPDATE. The caller commits."""
+    ids = subscription_ids.subquery()
+    windows = db.execute(insert(PauseWindow).from_select(
+        ["subscription_id", "blackout_id", "starts_at", "ends_at", "reason", "created_at"],
+        select(
+            ids.c.id, literal(blackout_id), literal(starts_at, DateTime), literal(ends_at, DateTime),
+            literal(reason, String), literal(datetime.utcnow(), DateTime)
+        )
+    )).rowcount
+    cancelled = db.execute(_cancel_pending(select(ids.c.id), starts_at, ends_at)).rowcount
+    return {"windows_created": max(windows, 0), "deliveries_cancelled": max(cancelled, 0)}
+
+
+def create_blackout(db: Session, starts_on, ends_on, reason, city=None, pincode=None, newspaper_id=None, milk_package_id=None):
+    """Pause every matching subscription for the days starts_on..ends_on (inclusive)."""
+    starts_at, _ = day_bounds(starts_on)
+    _, ends_at = day_bounds(ends_on)
+    blackout = Blackout(
+        reason=reason, starts_at=starts_at, ends_at=ends_at, city=city, pincode=pincode,
+        newspaper_id=newspaper_id, milk_package_id=milk_package_id
+    )
+    db.add(blackout)
+    db.flush()
+    result = pause_subscriptions(
+        db, scope_select(city, pincode, newspaper_id, milk_package_id), starts_at, ends_at, reason, blackout_id=blackout.id
+    )
+    db.commit()
+    return {"blackout_id": blackout.id, **result}
+
+
+def lift_blackout(db: Session, blackout: Blackout):
+    """Remove a blackout's windows and restore the deliveries it cancelled that nothing else covers."""
+    affected = select(PauseWindow.subscription_id).where(PauseWindow.blackout_id == blackout.id)
+    restored = db.execute(
+        _restore_cancelled(affected, blackout.starts_at, blackout.ends_at, ignore_blackout_id=blackout.id)
+    ).rowcount
+    removed = db.execute(
+        delete(PauseWindow).where(PauseWindow.blackout_id == blackout.id).execution_options(synchronize_session=False)
+    ).rowcount
+    db.delete(blackout)
+    db.commit()
+    return {"blackout_id": blackout.id, "windows_removed": max(removed, 0), "deliveries_restored": max(restored, 0)}
+
+
+def end_pause_windows(db: Session, subscription_id, at=None):
+    """End the subscription's own pause windows at `at` (default now) and drop later ones.
+
+    Blackout windows stay: a customer resuming does not lift a city-wide holiday.
+    """
+    at = at or datetime.utcnow()
+    own = and_(PauseWindow.subscription_id == subscription_id, PauseWindow.blackout_id == None)
+    db.execute(delete(PauseWindow).where(own, PauseWindow.starts_at >= at).execution_options(synchronize_session=False))
+    db.execute(update(PauseWindow).where(
+        own, PauseWindow.starts_at < at, or_(PauseWindow.ends_at == None, PauseWindow.ends_at > at)
+    ).values(ends_at=at).execution_options(synchronize_session=False))
+    restored = db.execute(_restore_cancelled([subscription_id], at, None)).rowcount
+    return {"deliveries_restored": max(restored, 0)}
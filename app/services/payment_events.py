@@ -0,0 +1,292 @@
+"""Settling payments from provider webhooks and a periodic reconciliation sweep.
+
+Webhook bodies are verified against the provider's signature and stored as PaymentEvent rows;
+uq_payment_events_provider_event makes a redelivered event a no-op. Unprocessed events are
+then applied in batches: one UPDATE per resulting status for the whole batch, committed with
+the events marked processed. A completed payment stays completed, and only pending payments
+are failed, so events may arrive in any order.
+
+Payments the client never confirmed and no webhook settled are swept by
+reconcile_pending_payments(), which pages through each provider's list API (100 objects per
+call) instead of retrieving every payment.
+"""
+import calendar
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.database.models import Payment, PaymentEvent
+from app.services.gateways import razorpay_gateway, stripe_gateway, GatewayUnavailable, GATEWAY_LIST_PAGE_SIZE
+
+STRIPE_SIGNATURE_TOLERANCE = int(os.getenv("STRIPE_WEBHOOK_TOLERANCE", "300"))
+EVENT_BATCH_SIZE = 500
+RECONCILE_AFTER = timedelta(minutes=int(os.getenv("RECONCILE_AFTER_MINUTES", "30")))
+RECONCILE_MAX_AGE = timedelta(days=int(os.getenv("RECONCILE_MAX_AGE_DAYS", "7")))
+
+STRIPE_EVENT_STATUS = {
+    "payment_intent.succeeded": "completed",
+    "payment_intent.payment_failed": "failed",
+    "payment_intent.canceled": "failed",
+}
+RAZORPAY_EVENT_STATUS = {
+    "order.paid": "completed",
+    "payment.captured": "completed",
+    "payment.failed": "failed",
+}
+# what a listed object's own status settles its payment to; anything else is still in flight
+STRIPE_INTENT_STATUS = {"succeeded": "completed", "canceled": "failed"}
+RAZORPAY_ORDER_STATUS = {"paid": "completed"}
+
+
+class InvalidWebhook(Exception):
+    """The webhook is not configured, its signature does not verify, or its body is malformed."""
+
+
+def _secret(name):
+    secret = os.getenv(name, "")
+    if not secret:
+        raise InvalidWebhook(f"{name} is not set")
+    return secret.encode()
+
+
+def _matches(expected: str, signature: str):
+    """Constant-time comparison of a hex digest with a header value; False for non-ASCII values."""
+    try:
+        return hmac.compare_digest(expected.encode(), signature.encode("ascii"))
+    except UnicodeEncodeError:
+        return False
+
+
+def verify_stripe_signature(body: bytes, header: str, now=None):
+    """Check a Stripe-Signature header ("t=...,v1=...") against STRIPE_WEBHOOK_SECRET."""
+    secret = _secret("STRIPE_WEBHOOK_SECRET")
+    parts = [item.split("=", 1) for item in (header or "").split(",") if "=" in item]
+    timestamps = [value for key, value in parts if key == "t"]
+    signatures = [value for key, value in parts if key == "v1"]
+    if not timestamps or not signatures or not timestamps[0].isdecimal():
+        raise InvalidWebhook("Malformed Stripe-Signature header")
+    if abs((now or time.time()) - int(timestamps[0])) > STRIPE_SIGNATURE_TOLERANCE:
+        raise InvalidWebhook("Stripe-Signature timestamp outside the tolerance")
+    expected = hmac.new(secret, timestamps[0].encode() + b"." + body, hashlib.sha256).hexdigest()
+    if not any(_matches(expected, signature) for signature in signatures):
+        raise InvalidWebhook("Stripe signature does not match")
+
+
+def verify_razorpay_signature(body: bytes, signature: str):
+    """Check an X-Razorpay-Signature header against RAZORPAY_WEBHOOK_SECRET."""
+    expected = hmac.new(_secret("RAZORPAY_WEBHOOK_SECRET"), body, hashlib.sha256).hexdigest()
+    if not _matches(expected, signature or ""):
+        raise InvalidWebhook("Razorpay signature does not match")
+
+
+def _load(body):
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise InvalidWebhook("Body is not JSON")
+    if not isinstance(event, dict):
+        raise InvalidWebhook("Body is not a JSON object")
+    return event
+
+
+def parse_stripe_event(body: bytes):
+    """(event_id, event_type, intent id, payment status or None) of a Stripe event body."""
+    event = _load(body)
+    if not event.get("id"):
+        raise InvalidWebhook("Stripe event without an id")
+    obj = (event.get("data") or {}).get("object") or {}
+    return event["id"], event.get("type"), obj.get("id"), STRIPE_EVENT_STATUS.get(event.get("type"))
+
+
+def parse_razorpay_event(body: bytes, event_id=None):
+    """(event_id, event_type, order id, payment status or None) of a Razorpay event body.
+
+    Razorpay sends the event id in the X-Razorpay-Event-Id header; without one a hash of the
+    body stands in, so an identical redelivery is still recognised.
+    """
+    event = _load(body)
+    payload = event.get("payload") or {}
+    order = (payload.get("order") or {}).get("entity") or {}
+    payment = (payload.get("payment") or {}).get("entity") or {}
+    return (
+        event_id or hashlib.sha256(body).hexdigest(), event.get("event"),
+        order.get("id") or payment.get("order_id"), RAZORPAY_EVENT_STATUS.get(event.get("event"))
+    )
+
+
+def _insert_skipping_seen(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(PaymentEvent.__table__).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(PaymentEvent.__table__).on_conflict_do_nothing()
+    return insert(PaymentEvent.__table__)
+
+
+def record_event(db: Session, provider, event_id, event_type, object_id, payment_status, body: bytes):
+    """Store the event unless it was seen before; True when it is new."""
+    inserted = db.execute(_insert_skipping_seen(db).values(
+        provider=provider, event_id=event_id, event_type=event_type, object_id=object_id,
+        payment_status=payment_status, payload=body.decode("utf-8", "replace"), received_at=datetime.utcnow()
+    )).rowcount
+    db.commit()
+    return inserted > 0
+
+
+def apply_statuses(db: Session, provider, completed_ids, failed_ids, created_before=None):
+    """Settle the provider's payments with these ids; a completion wins over a failure.
+
+    Only pending payments are failed and completed ones are left alone. With `created_before`,
+    only payments created before it are touched. Returns (completed, failed) row counts; the
+    caller commits.
+    """
+    completed_ids = set(completed_ids)
+    failed_ids = set(failed_ids) - completed_ids
+    scope = [Payment.payment_method == provider]
+    if created_before is not None:
+        scope.append(Payment.created_at < created_before)
+    completed = failed = 0
+    if completed_ids:
+        completed = db.execute(
+            update(Payment).where(*scope, Payment.stripe_payment_id.in_(completed_ids), Payment.status != "completed")
+            .values(status="completed", completed_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        ).rowcount
+    if failed_ids:
+        failed = db.execute(
+            update(Payment).where(*scope, Payment.stripe_payment_id.in_(failed_ids), Payment.status == "pending")
+            .values(status="failed").execution_options(synchronize_session=False)
+        ).rowcount
+    return max(completed, 0), max(failed, 0)
+
+
+def apply_payment_events(db: Session, batch_size: int = EVENT_BATCH_SIZE):
+    """Apply every unprocessed event, `batch_size` at a time, each batch in one transaction."""
+    report = {"events": 0, "completed": 0, "failed": 0}
+    while True:
+        events = db.execute(
+            select(PaymentEvent.id, PaymentEvent.provider, PaymentEvent.object_id, PaymentEvent.payment_status)
+            .where(PaymentEvent.processed_at == None).order_by(PaymentEvent.id).limit(batch_size)
+        ).all()
+        if not events:
+            return report
+        by_provider = {}
+        for _, provider, object_id, status in events:
+            if object_id and status:
+                by_provider.setdefault(provider, {"completed": set(), "failed": set()})[status].add(object_id)
+        for provider, ids in by_provider.items():
+            completed, failed = apply_statuses(db, provider, ids["completed"], ids["failed"])
+            report["completed"] += completed
+            report["failed"] += failed
+        db.execute(
+            update(PaymentEvent).where(PaymentEvent.id.in_([event[0] for event in events]))
+            .values(processed_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        report["events"] += len(events)
+
+
+_drain_lock = threading.Lock()
+_drain_requested = threading.Event()
+# its own thread, so the drain's queries are not counted against the webhook request
+_drain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payment-events")
+
+
+def drain_payment_events():
+    """Apply the queued events on a fresh session.
+
+    Calls arriving while a drain runs return at once and that drain picks up their events, so
+    a burst of webhooks turns into a few large batches rather than one transaction each.
+    """
+    _drain_requested.set()
+    while _drain_requested.is_set():
+        if not _drain_lock.acquire(blocking=False):
+            return
+        try:
+            _drain_requested.clear()
+            db = SessionLocal()
+            try:
+                apply_payment_events(db)
+            finally:
+                db.close()
+        finally:
+            _drain_lock.release()
+
+
+def schedule_drain():
+    """Start draining the queued events in the background; used after each new webhook event."""
+    _drain_executor.submit(drain_payment_events)
+
+
+def _unix(moment):
+    return calendar.timegm(moment.utctimetuple())
+
+
+def _stripe_pages(since):
+    after = None
+    while True:
+        page = stripe_gateway.list_payment_intents(since, after)
+        yield [(intent.id, STRIPE_INTENT_STATUS.get(intent.status)) for intent in page.data]
+        if not page.has_more or not page.data:
+            return
+        after = page.data[-1].id
+
+
+def _razorpay_pages(since):
+    skip = 0
+    while True:
+        orders = razorpay_gateway.list_orders(since, skip).get("items") or []
+        yield [(order["id"], RAZORPAY_ORDER_STATUS.get(order.get("status"))) for order in orders]
+        if len(orders) < GATEWAY_LIST_PAGE_SIZE:
+            return
+        skip += len(orders)
+
+
+PROVIDER_PAGES = {"stripe": _stripe_pages, "razorpay": _razorpay_pages}
+
+
+def reconcile_pending_payments(db: Session, stale_after: timedelta = RECONCILE_AFTER, max_age: timedelta = RECONCILE_MAX_AGE):
+    """Settle gateway payments still pending `stale_after` after creation from the providers' lists.
+
+    For each provider with stale payments, the objects created since the oldest of them (at
+    most `max_age` back) are listed a page at a time and each page is applied with one
+    UPDATE per status. Returns per-provider counts of list calls and settled payments; a
+    provider that is unavailable is reported with its error and skipped.
+    """
+    now = datetime.utcnow()
+    cutoff = now - stale_after
+    report = {}
+    for provider, pages in PROVIDER_PAGES.items():
+        oldest = db.execute(select(func.min(Payment.created_at)).where(
+            Payment.status == "pending",
+            Payment.created_at >= now - max_age,
+            Payment.created_at < cutoff,
+            Payment.payment_method == provider,
+            Payment.stripe_payment_id != None
+        )).scalar()
+        entry = report[provider] = {"list_calls": 0, "completed": 0, "failed": 0}
+        if oldest is None:
+            continue
+        try:
+            for page in pages(_unix(oldest)):
+                entry["list_calls"] += 1
+                completed, failed = apply_statuses(
+                    db, provider,
+                    [object_id for object_id, status in page if status == "completed"],
+                    [object_id for object_id, status in page if status == "failed"],
+                    created_before=cutoff
+                )
+                db.commit()
+                entry["completed"] += completed
+                entry["failed"] += failed
+        except GatewayUnavailable as e:
+            db.rollback()
+            entry["error"] = str(e)
+    return report
@@ -0,0 +1,116 @@
+"""Subscription pricing shared by subscription creation, quotes and billing.
+
+Newspapers are charged a flat weekday/weekend rate per paper, milk at the package's stored
+price for the frequency, and bundles that include milk get MILK_BUNDLE_DISCOUNT off the total.
+Prices for many subscriptions are computed at once with NumPy; the weekday/weekend split of a
+billing window is computed once per start date and cached.
+"""
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+import numpy as np
+
+NEWSPAPER_WEEKDAY_RATE = float(os.getenv("NEWSPAPER_WEEKDAY_RATE", "4"))
+NEWSPAPER_WEEKEND_RATE = float(os.getenv("NEWSPAPER_WEEKEND_RATE", "7"))
+MILK_BUNDLE_DISCOUNT = float(os.getenv("MILK_BUNDLE_DISCOUNT", "0.20"))
+MONTHLY_WINDOW_DAYS = 30
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+_FREQUENCY_INDEX = {f: i for i, f in enumerate(FREQUENCIES)}
+
+
+def frequency_index(frequency):
+    # anything unrecognised is billed monthly, as it always has been
+    return _FREQUENCY_INDEX.get(frequency, 2)
+
+
+@lru_cache(maxsize=512)
+def window_day_counts(start: date, days: int = MONTHLY_WINDOW_DAYS):
+    """(weekdays, weekend days) in the `days` days starting at `start`."""
+    weekdays = int(np.busday_count(start, start + timedelta(days=days)))
+    return weekdays, days - weekdays
+
+
+@lru_cache(maxsize=512)
+def _newspaper_unit_prices(start: date):
+    weekdays, weekend_days = window_day_counts(start)
+    prices = np.array([
+        NEWSPAPER_WEEKDAY_RATE,
+        NEWSPAPER_WEEKDAY_RATE * 5 + NEWSPAPER_WEEKEND_RATE * 2,
+        NEWSPAPER_WEEKDAY_RATE * weekdays + NEWSPAPER_WEEKEND_RATE * weekend_days,
+    ])
+    prices.flags.writeable = False
+    return prices
+
+
+def newspaper_unit_prices(start: date = None):
+    """Price of one newspaper for each of FREQUENCIES, for a subscription starting on `start`."""
+    return _newspaper_unit_prices(start or date.today())
+
+
+def milk_price_table(packages):
+    """Build a (len(FREQUENCIES), len(packages) + 1) price table and a {package_id: column} map.
+
+    Column 0 is "no milk" and is all zeros.
+    """
+    table = np.zeros((len(FREQUENCIES), len(packages) + 1))
+    columns = {}
+    for col, package in enumerate(packages, start=1):
+        table[:, col] = [package.price_daily or 0, package.price_weekly or 0, package.price_monthly or 0]
+        columns[package.id] = col
+    return table, columns
+
+
+def price_subscriptions(newspaper_counts, frequency_indexes, milk_table, milk_columns, start: date = None):
+    """Vectorized prices for many subscriptions.
+
+    All arguments are equal-length arrays except `milk_table` (from milk_price_table). Returns
+    (newspapers_total, milk_total, total) arrays, the total with the milk bundle discount applied.
+    """
+    newspaper_counts = np.asarray(newspaper_counts)
+    frequency_indexes = np.asarray(frequency_indexes)
+    milk_columns = np.asarray(milk_columns)
+    newspapers_total = newspaper_counts * newspaper_unit_prices(start)[frequency_indexes]
+    milk_total = milk_table[frequency_indexes, milk_columns]
+    subtotal = newspapers_total + milk_total
+    total = np.where(milk_columns > 0, subtotal * (1 - MILK_BUNDLE_DISCOUNT), subtotal)
+    return newspapers_total, milk_total, total
+
+
+def day_prices(newspaper_counts, milk_daily, has_milk, weekend):
+    """Vectorized price of one day's delivery for many subscriptions.
+
+    Newspapers at the weekday or weekend rate of that day, milk at the package's daily price,
+    with the milk bundle discount. All arguments are equal-length arrays.
+    """
+    rates = np.where(np.asarray(weekend), NEWSPAPER_WEEKEND_RATE, NEWSPAPER_WEEKDAY_RATE)
+    subtotal = np.asarray(newspaper_counts) * rates + np.asarray(milk_daily, dtype=float)
+    return np.where(np.asarray(has_milk), subtotal * (1 - MILK_BUNDLE_DISCOUNT), subtotal)
+
+
+def period_prices(newspaper_counts, weekdays, weekend_days, milk_daily, has_milk):
+    """Vectorized bill for many subscriptions from the delivery days they had in a period.
+
+    The sum of day_prices over those days: newspapers at the weekday/weekend rate per paper,
+    milk at the package's daily price, with the milk bundle discount. All arguments are
+    equal-length arrays; returns (newspapers_total, milk_total, total) arrays.
+    """
+    weekdays = np.asarray(weekdays)
+    weekend_days = np.asarray(weekend_days)
+    newspapers_total = np.asarray(newspaper_counts) * (
+        weekdays * NEWSPAPER_WEEKDAY_RATE + weekend_days * NEWSPAPER_WEEKEND_RATE
+    )
+    milk_total = (weekdays + weekend_days) * np.asarray(milk_daily, dtype=float)
+    subtotal = newspapers_total + milk_total
+    total = np.where(np.asarray(has_milk), subtotal * (1 - MILK_BUNDLE_DISCOUNT), subtotal)
+    return newspapers_total, milk_total, total
+
+
+def price_subscription(newspaper_count, milk_package, frequency, start: date = None):
+    """Total price of a single subscription; `milk_package` may be None."""
+    table, columns = milk_price_table([milk_package] if milk_package else [])
+    _, _, total = price_subscriptions(
+        [newspaper_count], [frequency_index(frequency)], table,
+        [columns[milk_package.id] if milk_package else 0], start
+    )
+    return float(total[0])
@@ -0,0 +1,158 @@
+"""Password hashing off the request path, and signed session tokens.
+
+bcrypt runs in a bounded process pool so a burst of logins cannot starve other endpoints of
+CPU. At most PASSWORD_HASH_MAX_PENDING hash/verify calls are admitted at once; callers wait up
+to PASSWORD_HASH_QUEUE_TIMEOUT seconds for a slot and then get PasswordHasherBusy. Waiting
+happens on the event loop, so queued logins hold no threadpool threads.
+After login, requests carry a signed JWT that is verified without touching bcrypt or the DB;
+user_access() and authorize_user() keep each user to their own data.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import bcrypt
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 hashes inline on the calling thread (the old behaviour)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4 or 8)))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+# No default: with a known key anyone could sign their own (admin) tokens
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("SECRET_KEY is not set; it signs the session tokens and must be kept secret")
+TOKEN_ALGORITHM = "HS256"
+TOKEN_TTL_MINUTES = int(os.getenv("TOKEN_TTL_MINUTES", "720"))
+
+_pool = None
+_pool_lock = threading.Lock()
+# (event loop, semaphore): an asyncio.Semaphore belongs to the loop it is used on
+_slots = (None, None)
+
+
+class PasswordHasherBusy(Exception):
+    """No hashing slot became free within PASSWORD_HASH_QUEUE_TIMEOUT."""
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def hash_password(password: str) -> str:
+    # Hash password using bcrypt, limiting to 72 bytes
+    password_bytes = password[:72].encode('utf-8')
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    # Verify password using bcrypt
+    plain_password_bytes = plain_password[:72].encode('utf-8')
+    hashed_password_bytes = hashed_password.encode('utf-8')
+    try:
+        return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
+    except ValueError:
+        # not a bcrypt hash, e.g. a bad password_hash from an import
+        return False
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _pool
+
+
+def _get_slots():
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING))
+    return _slots[1]
+
+
+async def _run_bounded(fn, *args):
+    slots = _get_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordHasherBusy("Too many concurrent password checks")
+    try:
+        if PASSWORD_HASH_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(_get_pool().submit(fn, *args))
+    finally:
+        slots.release()
+
+
+async def hash_password_pooled(password: str) -> str:
+    """hash_password on the worker pool, awaited without holding a thread."""
+    return await _run_bounded(hash_password, password)
+
+
+async def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the worker pool, awaited without holding a thread."""
+    return await _run_bounded(verify_password, plain_password, hashed_password)
+
+
+def create_access_token(user_id: int, is_admin: bool = False) -> str:
+    expires = datetime.utcnow() + timedelta(minutes=TOKEN_TTL_MINUTES)
+    return jwt.encode({"sub": str(user_id), "admin": bool(is_admin), "exp": expires}, SECRET_KEY, algorithm=TOKEN_ALGORITHM)
+
+
+def decode_access_token(token: str) -> dict:
+    """Return {"user_id", "is_admin"} for a valid, unexpired token; raise InvalidToken otherwise."""
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[TOKEN_ALGORITHM])
+        return {"user_id": int(claims["sub"]), "is_admin": bool(claims.get("admin"))}
+    except (JWTError, KeyError, ValueError) as e:
+        raise InvalidToken(str(e))
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(_bearer)) -> dict:
+    """Dependency resolving the `Authorization: Bearer <token>` header to the token's claims."""
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return decode_access_token(credentials.credentials)
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def authorize_user(current_user: dict, user_id) -> None:
+    """403 unless the token belongs to `user_id` or to an admin."""
+    if current_user["is_admin"]:
+        return
+    try:
+        allowed = int(user_id) == current_user["user_id"]
+    except (TypeError, ValueError):
+        allowed = False
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Not allowed to access this user's data")
+
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency for the admin API: 403 unless the token carries the admin claim."""
+    if not current_user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+def user_access(user_id: int, current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency for routes with a `user_id` path or query parameter: only that user or an admin."""
+    authorize_user(current_user, user_id)
+    return current_user
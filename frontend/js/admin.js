@@ -3,6 +3,12 @@
 document.addEventListener('DOMContentLoaded', () => {
     loadAdminNewspapers();
     loadAdminMilk();
+    loadAnalytics();
+
+    document.getElementById('analyticsForm').addEventListener('submit', (e) => {
+        e.preventDefault();
+        loadAnalytics();
+    });
 
     document.getElementById('addNewspaperForm').addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -12,7 +18,7 @@ document.addEventListener('DOMContentLoaded', () => {
         payload.price_daily = parseFloat(payload.price_daily);
         payload.price_weekly = parseFloat(payload.price_weekly);
         payload.price_monthly = parseFloat(payload.price_monthly);
-        const res = await fetch(`${API_BASE}/admin/newspapers`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+        const res = await authFetch(`${API_BASE}/admin/newspapers`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
         if (res.ok) { alert('Added'); form.reset(); loadAdminNewspapers(); }
     });
 
@@ -24,7 +30,7 @@ document.addEventListener('DOMContentLoaded', () => {
         payload.price_daily = parseFloat(payload.price_daily);
         payload.price_weekly = parseFloat(payload.price_weekly);
         payload.price_monthly = parseFloat(payload.price_monthly);
-        const res = await fetch(`${API_BASE}/admin/milk`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+        const res = await authFetch(`${API_BASE}/admin/milk`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
         if (res.ok) { alert('Added'); form.reset(); loadAdminMilk(); }
     });
 });
@@ -43,7 +49,7 @@ async function loadAdminNewspapers() {
 
 async function deleteNewspaper(id) {
     if (!confirm('Deactivate this newspaper?')) return;
-    const r = await fetch(`${API_BASE}/admin/newspapers/${id}`, { method: 'DELETE' });
+    const r = await authFetch(`${API_BASE}/admin/newspapers/${id}`, { method: 'DELETE' });
     if (r.ok) loadAdminNewspapers();
 }
 
@@ -61,6 +67,71 @@ async function loadAdminMilk() {
 
 async function deleteMilk(id) {
     if (!confirm('Deactivate this milk package?')) return;
-    const r = await fetch(`${API_BASE}/admin/milk/${id}`, { method: 'DELETE' });
+    const r = await authFetch(`${API_BASE}/admin/milk/${id}`, { method: 'DELETE' });
     if (r.ok) loadAdminMilk();
 }
+
+// Analytics: every report is read from the summary tables, so these stay fast on a large database
+function analyticsQuery(withCity) {
+    const form = new FormData(document.getElementById('analyticsForm'));
+    const params = new URLSearchParams();
+    for (const key of withCity ? ['from', 'to', 'city'] : ['from', 'to']) {
+        if (form.get(key)) params.set(key, form.get(key));
+    }
+    return params.toString();
+}
+
+function percent(rate) {
+    return rate === null ? '—' : `${(rate * 100).toFixed(1)}%`;
+}
+
+function analyticsTable(rows, columns) {
+    const head = columns.map(([label]) => `<th>${label}</th>`).join('');
+    const body = rows.map(row => `<tr>${columns.map(([, value]) => `<td>${value(row)}</td>`).join('')}</tr>`).join('');
+    return `<table class="admin-card"><thead><tr>${head}</tr></thead><tbody>${body}</tbody></table>`;
+}
+
+async function loadAnalytics() {
+    const [daily, cities, newspapers, milk] = await Promise.all([
+        authFetch(`${API_BASE}/admin/analytics/daily?${analyticsQuery(true)}`).then(r => r.json()),
+        authFetch(`${API_BASE}/admin/analytics/cities?${analyticsQuery(false)}`).then(r => r.json()),
+        authFetch(`${API_BASE}/admin/analytics/newspapers?${analyticsQuery(true)}`).then(r => r.json()),
+        authFetch(`${API_BASE}/admin/analytics/milk?${analyticsQuery(true)}`).then(r => r.json()),
+    ]);
+    if (!daily.totals) {
+        document.getElementById('analyticsTotals').textContent = daily.detail || 'Could not load analytics';
+        return;
+    }
+    const t = daily.totals;
+    document.getElementById('analyticsTotals').innerHTML = `
+        <div class="admin-card">
+            <strong>${daily.from} to ${daily.to}</strong> —
+            ${daily.active_subscriptions} active subscriptions, ${t.new_subscriptions} new —
+            ${t.deliveries_delivered} delivered, ${t.deliveries_pending} pending, ${t.deliveries_cancelled} cancelled (${percent(t.completion_rate)} completed) —
+            Rs.${t.amount_billed.toFixed(2)} billed, Rs.${t.amount_completed.toFixed(2)} collected
+        </div>
+    `;
+    document.getElementById('analyticsCities').innerHTML = analyticsTable(cities.cities, [
+        ['City', c => c.city || '—'],
+        ['Active', c => c.active_subscriptions],
+        ['New', c => c.new_subscriptions],
+        ['Delivered', c => c.deliveries_delivered],
+        ['Completion', c => percent(c.completion_rate)],
+        ['Collected', c => `Rs.${c.amount_completed.toFixed(2)}`],
+    ]);
+    document.getElementById('analyticsNewspapers').innerHTML = analyticsTable(newspapers.items, [
+        ['Newspaper', n => n.name],
+        ['Active', n => n.active_subscriptions],
+        ['New', n => n.new_subscriptions],
+        ['Delivered', n => n.deliveries_delivered],
+        ['Pending', n => n.deliveries_pending],
+        ['Cancelled', n => n.deliveries_cancelled],
+    ]);
+    document.getElementById('analyticsMilk').innerHTML = analyticsTable(milk.items, [
+        ['Package', m => m.name],
+        ['Active', m => m.active_subscriptions],
+        ['Delivered (L)', m => (m.volume_ml_delivered / 1000).toFixed(1)],
+        ['Scheduled (L)', m => (m.volume_ml_scheduled / 1000).toFixed(1)],
+        ['Completion', m => percent(m.completion_rate)],
+    ]);
+}
@@ -31,6 +31,7 @@ async function handleLogin(e) {
             localStorage.setItem("user_email", data.email);
             localStorage.setItem("user_name", data.full_name);
             localStorage.setItem("is_admin", data.is_admin);
+            localStorage.setItem("access_token", data.access_token);
 
             alert(data.message);
             window.location.href = "dashboard.html";
@@ -1,3 +1,16 @@
 const API_BASE = (window.location.hostname === "localhost" || window.location.hostname === "127.0.0.1")
     ? "http://localhost:8000/api"
     : "https://dailyeaze-backend.onrender.com/api"; // Production URL
+
+// fetch() with the session token from login; an expired or missing token sends the user back to log in
+async function authFetch(url, options = {}) {
+    const token = localStorage.getItem("access_token");
+    const headers = { ...(options.headers || {}) };
+    if (token) headers["Authorization"] = `Bearer ${token}`;
+    const response = await fetch(url, { ...options, headers });
+    if (response.status === 401) {
+        localStorage.clear();
+        window.location.href = "login.html";
+    }
+    return response;
+}
@@ -76,9 +76,17 @@ function switchTab(tabName) {
 // ========== Subscriptions Functions ==========
 async function loadSubscriptions(userId) {
     try {
-        const response = await fetch(`${API_BASE}/subscriptions/${userId}`);
+        // the listing is paginated; follow X-Next-Cursor until every page is loaded
+        let subscriptions = [];
+        let cursor = null;
+        let response;
+        do {
+            response = await authFetch(`${API_BASE}/subscriptions/${userId}?limit=500${cursor ? `&cursor=${cursor}` : ''}`);
+            if (!response.ok) break;
+            subscriptions = subscriptions.concat(await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
         if (response.ok) {
-            const subscriptions = await response.json();
             displaySubscriptions(subscriptions);
             populateSubscriptionSelector(subscriptions);
             // after loading subscriptions, also load payments
@@ -100,7 +108,9 @@ function displaySubscriptions(subscriptions) {
 
     container.innerHTML = subscriptions.map(sub => `
         <div class="subscription-card">
-            <h3>${sub.newspaper_id ? "📰 Newspaper" : "🥛 Milk"} Subscription</h3>
+            <h3>${sub.newspapers.length ? "📰 Newspaper" : "🥛 Milk"} Subscription</h3>
+            ${sub.newspapers.length ? `<p><strong>Newspapers:</strong> <span>${sub.newspapers.map(n => n.name).join(', ')}</span></p>` : ''}
+            ${sub.milk_package ? `<p><strong>Milk:</strong> <span>${sub.milk_package.name}</span></p>` : ''}
             <p><strong>Frequency:</strong> <span>${sub.frequency.toUpperCase()}</span></p>
             <p><strong>Cost:</strong> <span>₹${sub.total_cost.toFixed(2)}</span></p>
             <p>
@@ -121,20 +131,29 @@ function displaySubscriptions(subscriptions) {
 }
 
 // ========== Payments / Invoices ==========
-async function loadPayments(userId) {
+async function loadPayments(userId, cursor = null) {
     try {
-        const r = await fetch(`${API_BASE}/payments/history/${userId}`);
+        const r = await authFetch(`${API_BASE}/payments/history/${userId}${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`);
         if (!r.ok) { document.getElementById('paymentsList').innerText = 'Failed to load payments'; return; }
         const payments = await r.json();
-        displayPayments(payments);
+        // newest first, one page at a time; older pages are appended on demand
+        displayPayments(payments, cursor !== null);
+        const next = r.headers.get('X-Next-Cursor');
+        const container = document.getElementById('paymentsList');
+        if (next && container) {
+            const more = document.createElement('button');
+            more.className = 'btn btn-secondary btn-small';
+            more.textContent = 'Show older payments';
+            more.onclick = () => { more.remove(); loadPayments(userId, next); };
+            container.appendChild(more);
+        }
     } catch (e) { console.error(e); document.getElementById('paymentsList').innerText = 'Error loading payments'; }
 }
-
-function displayPayments(payments) {
+function displayPayments(payments, append = false) {
     const container = document.getElementById('paymentsList');
     if (!container) return;
-    if (!payments || payments.length === 0) { container.innerHTML = '<p>No payments yet.</p>'; return; }
-    container.innerHTML = payments.map(p => {
+    if (!append && (!payments || payments.length === 0)) { container.innerHTML = '<p>No payments yet.</p>'; return; }
+    const html = payments.map(p => {
         const status = p.status || 'pending';
         return `
             <div class="payment-card">
@@ -145,13 +164,14 @@ function displayPayments(payments) {
             </div>
         `;
     }).join('');
+    if (append) container.insertAdjacentHTML('beforeend', html); else container.innerHTML = html;
 }
 
 async function retryPayment(paymentId, subscriptionId, amount) {
     const userId = localStorage.getItem('user_id');
     if (!confirm('Retry payment of Rs.' + amount + '?')) return;
     try {
-        const r = await fetch(`${API_BASE}/payments/create-payment-intent`, {
+        const r = await authFetch(`${API_BASE}/payments/create-payment-intent`, {
             method: 'POST', headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ amount: amount, user_id: parseInt(userId), subscription_id: subscriptionId })
         });
@@ -170,7 +190,7 @@ async function retryPayment(paymentId, subscriptionId, amount) {
         if (res.error) { alert('Payment failed: ' + res.error.message); return; }
         if (res.paymentIntent && res.paymentIntent.status === 'succeeded') {
             // call confirm on server for the paymentId returned (data.payment_id)
-            const confirmResp = await fetch(`${API_BASE}/payments/confirm-payment/${data.payment_id}`, { method: 'POST' });
+            const confirmResp = await authFetch(`${API_BASE}/payments/confirm-payment/${data.payment_id}`, { method: 'POST' });
             if (!confirmResp.ok) { alert('Server confirm failed'); return; }
             alert('Payment succeeded');
             loadPayments(userId);
@@ -184,7 +204,7 @@ async function pauseSubscription(subscriptionId) {
     if (!days) return;
 
     try {
-        const response = await fetch(
+        const response = await authFetch(
             `${API_BASE}/subscriptions/${subscriptionId}/pause?pause_days=${days}`,
             { method: "POST" }
         );
@@ -201,7 +221,7 @@ async function pauseSubscription(subscriptionId) {
 
 async function resumeSubscription(subscriptionId) {
     try {
-        const response = await fetch(
+        const response = await authFetch(
             `${API_BASE}/subscriptions/${subscriptionId}/resume`,
             { method: "POST" }
         );
@@ -219,7 +239,7 @@ async function resumeSubscription(subscriptionId) {
 // ========== Newspapers Functions ==========
 async function loadNewspapers() {
     try {
-        const response = await fetch(`${API_BASE}/newspapers/`);
+        const response = await authFetch(`${API_BASE}/newspapers/`);
         if (response.ok) {
             currentNewspapers = await response.json();
             displayNewspapersList(currentNewspapers);
@@ -263,7 +283,7 @@ function filterNewspapers() {
 // ========== Milk Functions ==========
 async function loadMilkPackages() {
     try {
-        const response = await fetch(`${API_BASE}/milk/`);
+        const response = await authFetch(`${API_BASE}/milk/`);
         if (response.ok) {
             // keep package fetch for compatibility (not required for brand-based selection)
             await response.json();
@@ -341,7 +361,7 @@ function updateMilkTotals() {
 // ========== Magazines Functions ==========
 async function loadMagazines() {
     try {
-        const response = await fetch(`${API_BASE}/magazines/`);
+        const response = await authFetch(`${API_BASE}/magazines/`);
         if (response.ok) {
             const magazines = await response.json();
             displayMagazinesList(magazines);
@@ -366,9 +386,11 @@ function displayMagazinesList(magazines) {
 }
 
 // ========== Calendar Functions ==========
+const CALENDAR_YEAR = 2025;
+
 async function loadDeliveryCalendar(userId) {
     try {
-        const response = await fetch(`${API_BASE}/subscriptions/calendar/${userId}`);
+        const response = await authFetch(`${API_BASE}/subscriptions/calendar/${userId}?from=${CALENDAR_YEAR}-01-01&to=${CALENDAR_YEAR}-12-31`);
         if (response.ok) {
             const calendar = await response.json();
             displayCalendar(calendar);
@@ -382,8 +404,8 @@ function displayCalendar(calendar) {
     const container = document.getElementById("deliveryCalendar");
     if (!container) return;
 
-    // Render 2025 calendar as monthly tables (4 months per row)
-    const year = 2025;
+    // Render the calendar year as monthly tables (4 months per row)
+    const year = CALENDAR_YEAR;
     const monthNames = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"];
     const dayNames = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"];
 
@@ -458,13 +480,41 @@ function handleCalendarDateClick(e) {
         alert('Select a subscription from the dropdown above to mark/unmark deliveries for that subscription.');
         return;
     }
+    // Shift+click two days to add (or, if the first was marked, remove) the whole range
+    if (e.shiftKey && !rangeAnchor) {
+        rangeAnchor = { date, marked: el.classList.contains('marked') };
+        el.classList.add('range-anchor');
+        return;
+    }
+    if (e.shiftKey) {
+        const [from, to] = [rangeAnchor.date, date].sort();
+        const action = rangeAnchor.marked ? 'remove' : 'add';
+        rangeAnchor = null;
+        updateDeliveryRange(selectedSubscription, action, from, to);
+        return;
+    }
+    rangeAnchor = null;
     toggleDelivery(selectedSubscription, date);
 }
 
+let rangeAnchor = null;
+
+async function updateDeliveryRange(subscriptionId, action, from, to) {
+    const userId = localStorage.getItem('user_id');
+    try {
+        const r = await authFetch(`${API_BASE}/subscriptions/${subscriptionId}/deliveries/batch`, {
+            method: 'POST', headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ [action]: [{ from, to }] })
+        });
+        if (!r.ok) { const j = await r.json(); alert('Failed: ' + (j.detail || r.statusText)); return; }
+        await loadDeliveryCalendar(userId);
+    } catch (err) { console.error(err); alert('Failed to update deliveries'); }
+}
+
 async function toggleDelivery(subscriptionId, dateStr) {
     const userId = localStorage.getItem('user_id');
     try {
-        const r = await fetch(`${API_BASE}/subscriptions/${subscriptionId}/toggle-delivery`, {
+        const r = await authFetch(`${API_BASE}/subscriptions/${subscriptionId}/toggle-delivery`, {
             method: 'POST', headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ date: dateStr })
         });
@@ -537,7 +587,7 @@ async function createSubscription() {
 
     try {
         // create subscription and payment intent/order
-        const response = await fetch(`${API_BASE}/subscriptions/`, {
+        const response = await authFetch(`${API_BASE}/subscriptions/`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
@@ -555,7 +605,11 @@ async function createSubscription() {
             return;
         }
 
-        const data = await response.json();
+        let data = await response.json();
+        if (data.job_id) {
+            // the gateway order is opened by a background job; its result has the checkout details
+            data = await waitForCheckout(data);
+        }
         lastSubscriptionResponse = data;  // Store for Razorpay payment
 
         // Route based on payment method returned
@@ -584,7 +638,7 @@ async function createSubscription() {
             }
 
             if (result.paymentIntent && result.paymentIntent.status === 'succeeded') {
-                const confirmResp = await fetch(`${API_BASE}/payments/confirm-payment/${data.payment_id}`, { method: 'POST' });
+                const confirmResp = await authFetch(`${API_BASE}/payments/confirm-payment/${data.payment_id}`, { method: 'POST' });
                 if (!confirmResp.ok) {
                     const err = await confirmResp.json();
                     alert('Payment confirmation failed: ' + (err.detail || confirmResp.statusText));
@@ -609,6 +663,23 @@ async function createSubscription() {
     }
 }
 
+// Poll the payment order job until it finishes; falls back to "pending" if it takes too long
+async function waitForCheckout(created, timeoutMs = 30000) {
+    const deadline = Date.now() + timeoutMs;
+    let delay = 250;
+    while (Date.now() < deadline) {
+        const r = await authFetch(`${API_BASE}/jobs/${created.job_id}`);
+        if (r.ok) {
+            const job = await r.json();
+            if (job.status === 'done' && job.result) return job.result;
+            if (job.status === 'dead') break;
+        }
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 2, 2000);
+    }
+    return { ...created, payment_method: 'pending', error: 'Payment processor unavailable' };
+}
+
 async function initiateRazorpayPayment() {
     if (!lastSubscriptionResponse) {
         alert('No pending payment. Create a subscription first.');
@@ -627,7 +698,7 @@ async function initiateRazorpayPayment() {
         handler: async function (response) {
             // Payment successful; verify on server
             try {
-                const verifyResp = await fetch(`${API_BASE}/payments/verify-razorpay`, {
+                const verifyResp = await authFetch(`${API_BASE}/payments/verify-razorpay`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify({
@@ -663,7 +734,7 @@ async function initiateRazorpayPayment() {
 
 async function initStripe() {
     try {
-        const r = await fetch(`${API_BASE}/config`);
+        const r = await authFetch(`${API_BASE}/config`);
         if (!r.ok) return;
         const cfg = await r.json();
         const key = cfg.stripe_public_key;
@@ -676,7 +747,7 @@ async function initStripe() {
 
 async function initRazorpay() {
     try {
-        const r = await fetch(`${API_BASE}/config`);
+        const r = await authFetch(`${API_BASE}/config`);
         if (!r.ok) return;
         const cfg = await r.json();
         // Razorpay script is already loaded; we just ensure config is fetched
@@ -0,0 +1,128 @@
+"""Baseline schema, as created by Base.metadata.create_all before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String()),
+        sa.Column('password_hash', sa.String()),
+        sa.Column('full_name', sa.String()),
+        sa.Column('phone', sa.String()),
+        sa.Column('address', sa.Text()),
+        sa.Column('city', sa.String()),
+        sa.Column('pincode', sa.String()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('is_admin', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'newspapers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String()),
+        sa.Column('language', sa.String()),
+        sa.Column('genre', sa.String()),
+        sa.Column('price_daily', sa.Float()),
+        sa.Column('price_weekly', sa.Float()),
+        sa.Column('price_monthly', sa.Float()),
+        sa.Column('description', sa.Text()),
+        sa.Column('is_active', sa.Boolean()),
+    )
+    op.create_index('ix_newspapers_id', 'newspapers', ['id'])
+    op.create_index('ix_newspapers_name', 'newspapers', ['name'], unique=True)
+
+    op.create_table(
+        'magazines',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String()),
+        sa.Column('language', sa.String()),
+        sa.Column('genre', sa.String()),
+        sa.Column('newspaper_id', sa.Integer(), sa.ForeignKey('newspapers.id'), nullable=True),
+        sa.Column('is_complementary', sa.Boolean()),
+        sa.Column('price', sa.Float()),
+        sa.Column('is_active', sa.Boolean()),
+    )
+    op.create_index('ix_magazines_id', 'magazines', ['id'])
+
+    op.create_table(
+        'milk_packages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String()),
+        sa.Column('quantity_ml', sa.Integer()),
+        sa.Column('price_daily', sa.Float()),
+        sa.Column('price_weekly', sa.Float()),
+        sa.Column('price_monthly', sa.Float()),
+        sa.Column('description', sa.Text()),
+        sa.Column('is_active', sa.Boolean()),
+    )
+    op.create_index('ix_milk_packages_id', 'milk_packages', ['id'])
+
+    op.create_table(
+        'subscriptions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('milk_package_id', sa.Integer(), sa.ForeignKey('milk_packages.id'), nullable=True),
+        sa.Column('start_date', sa.DateTime()),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        sa.Column('frequency', sa.String()),
+        sa.Column('is_paused', sa.Boolean()),
+        sa.Column('paused_from', sa.DateTime(), nullable=True),
+        sa.Column('paused_until', sa.DateTime(), nullable=True),
+        sa.Column('total_cost', sa.Float()),
+        sa.Column('is_active', sa.Boolean()),
+    )
+    op.create_index('ix_subscriptions_id', 'subscriptions', ['id'])
+
+    op.create_table(
+        'subscription_newspapers',
+        sa.Column('subscription_id', sa.Integer(), sa.ForeignKey('subscriptions.id'), primary_key=True),
+        sa.Column('newspaper_id', sa.Integer(), sa.ForeignKey('newspapers.id'), primary_key=True),
+    )
+
+    op.create_table(
+        'deliveries',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('subscription_id', sa.Integer(), sa.ForeignKey('subscriptions.id')),
+        sa.Column('scheduled_date', sa.DateTime()),
+        sa.Column('status', sa.String()),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('notes', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_deliveries_id', 'deliveries', ['id'])
+
+    op.create_table(
+        'payments',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('subscription_id', sa.Integer(), sa.ForeignKey('subscriptions.id'), nullable=True),
+        sa.Column('amount', sa.Float()),
+        sa.Column('status', sa.String()),
+        sa.Column('stripe_payment_id', sa.String(), unique=True, nullable=True),
+        sa.Column('payment_method', sa.String()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_payments_id', 'payments', ['id'])
+
+
+def downgrade():
+    for table in ['payments', 'deliveries', 'subscription_newspapers', 'subscriptions',
+                  'milk_packages', 'magazines', 'newspapers', 'users']:
+        op.drop_table(table)
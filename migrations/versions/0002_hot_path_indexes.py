@@ -0,0 +1,44 @@
+"""Composite and partial indexes for the hot query paths
+
+- subscriptions (user_id, is_active): a user's active subscriptions
+- subscriptions (id) WHERE is_active: scans over all active subscriptions (scheduling, billing)
+- deliveries (subscription_id, scheduled_date) and (user_id, scheduled_date): day lookups and calendars
+- payments (user_id, created_at): payment history
+- subscription_newspapers (newspaper_id, subscription_id): subscribers of a newspaper
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # some of these already exist on databases created by create_all after they were added to the models
+    op.create_index('ix_subscriptions_user_active', 'subscriptions', ['user_id', 'is_active'], if_not_exists=True)
+    op.create_index(
+        'ix_subscriptions_active', 'subscriptions', ['id'], if_not_exists=True,
+        sqlite_where=sa.text('is_active = 1'), postgresql_where=sa.text('is_active')
+    )
+    op.create_index('ix_deliveries_subscription_date', 'deliveries', ['subscription_id', 'scheduled_date'], if_not_exists=True)
+    op.create_index('ix_deliveries_user_date', 'deliveries', ['user_id', 'scheduled_date'], if_not_exists=True)
+    op.create_index('ix_payments_user_created', 'payments', ['user_id', 'created_at'], if_not_exists=True)
+    op.create_index(
+        'ix_subscription_newspapers_newspaper', 'subscription_newspapers', ['newspaper_id', 'subscription_id'],
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_subscription_newspapers_newspaper', table_name='subscription_newspapers')
+    op.drop_index('ix_payments_user_created', table_name='payments')
+    op.drop_index('ix_deliveries_user_date', table_name='deliveries')
+    op.drop_index('ix_deliveries_subscription_date', table_name='deliveries')
+    op.drop_index('ix_subscriptions_active', table_name='subscriptions')
+    op.drop_index('ix_subscriptions_user_active', table_name='subscriptions')
@@ -0,0 +1,20 @@
+"""Index deliveries by day for the per-day route manifests
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_deliveries_scheduled_date', 'deliveries', ['scheduled_date'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_deliveries_scheduled_date', table_name='deliveries')
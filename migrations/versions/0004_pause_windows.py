@@ -0,0 +1,70 @@
+"""Pause windows and blackouts
+
+Subscriptions can have several pause windows; a blackout pauses every subscription in its
+scope (city, pincode, newspaper or milk package) through one window each. Subscriptions that
+are currently paused get a window copied from paused_from/paused_until. Users are indexed by
+(city, pincode) for scoping blackouts and manifests.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'blackouts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('reason', sa.String()),
+        sa.Column('starts_at', sa.DateTime()),
+        sa.Column('ends_at', sa.DateTime()),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('pincode', sa.String(), nullable=True),
+        sa.Column('newspaper_id', sa.Integer(), sa.ForeignKey('newspapers.id'), nullable=True),
+        sa.Column('milk_package_id', sa.Integer(), sa.ForeignKey('milk_packages.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_blackouts_id', 'blackouts', ['id'])
+
+    pause_windows = op.create_table(
+        'pause_windows',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('subscription_id', sa.Integer(), sa.ForeignKey('subscriptions.id')),
+        sa.Column('blackout_id', sa.Integer(), sa.ForeignKey('blackouts.id'), nullable=True),
+        sa.Column('starts_at', sa.DateTime()),
+        sa.Column('ends_at', sa.DateTime(), nullable=True),
+        sa.Column('reason', sa.String()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_pause_windows_id', 'pause_windows', ['id'])
+    op.create_index('ix_pause_windows_subscription_span', 'pause_windows', ['subscription_id', 'starts_at', 'ends_at'])
+    op.create_index('ix_pause_windows_blackout', 'pause_windows', ['blackout_id'])
+    op.create_index('ix_users_city_pincode', 'users', ['city', 'pincode'], if_not_exists=True)
+
+    subscriptions = sa.table(
+        'subscriptions',
+        sa.column('id', sa.Integer()), sa.column('is_paused', sa.Boolean()),
+        sa.column('paused_from', sa.DateTime()), sa.column('paused_until', sa.DateTime()),
+    )
+    now = sa.literal(datetime.utcnow(), sa.DateTime())
+    op.execute(pause_windows.insert().from_select(
+        ['subscription_id', 'starts_at', 'ends_at', 'reason', 'created_at'],
+        sa.select(
+            subscriptions.c.id, sa.func.coalesce(subscriptions.c.paused_from, now),
+            subscriptions.c.paused_until, sa.literal('pause'), now,
+        ).where(subscriptions.c.is_paused == sa.true())
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_users_city_pincode', table_name='users')
+    op.drop_table('pause_windows')
+    op.drop_table('blackouts')
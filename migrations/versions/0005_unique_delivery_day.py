@@ -0,0 +1,40 @@
+"""One delivery per subscription per day
+
+Toggles that raced each other (or a materializer run) could leave two deliveries for the same
+subscription on the same day. Duplicates are removed first -- a delivered row wins, otherwise
+the oldest -- then a unique index on (subscription_id, date(scheduled_date)) makes them
+impossible.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text("""
+        DELETE FROM deliveries WHERE id IN (
+            SELECT d.id FROM deliveries d
+            JOIN deliveries keep
+              ON keep.subscription_id = d.subscription_id
+             AND date(keep.scheduled_date) = date(d.scheduled_date)
+             AND keep.id <> d.id
+            WHERE (keep.status = 'delivered' AND d.status <> 'delivered')
+               OR ((keep.status = 'delivered') = (d.status = 'delivered') AND keep.id < d.id)
+        )
+    """))
+    op.create_index(
+        'uq_deliveries_subscription_day', 'deliveries',
+        ['subscription_id', sa.text('date(scheduled_date)')], unique=True, if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_deliveries_subscription_day', table_name='deliveries')
@@ -0,0 +1,30 @@
+"""Billing periods on payments
+
+Bills created by the billing run record the [period_start, period_end) their deliveries were
+in. A unique index on (subscription_id, period_start) allows one bill per subscription per
+period, so re-running a period inserts nothing; signup payments leave both columns NULL.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('payments', sa.Column('period_start', sa.DateTime(), nullable=True))
+    op.add_column('payments', sa.Column('period_end', sa.DateTime(), nullable=True))
+    op.create_index('uq_payments_subscription_period', 'payments', ['subscription_id', 'period_start'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_payments_subscription_period', table_name='payments')
+    with op.batch_alter_table('payments') as batch:
+        batch.drop_column('period_end')
+        batch.drop_column('period_start')
@@ -0,0 +1,47 @@
+"""Payment webhook events
+
+Webhook events from Stripe and Razorpay are stored once per (provider, event_id) -- a
+redelivered event is a no-op -- and applied to payments in batches. A partial index finds the
+unprocessed ones; another on pending payments by created_at serves the reconciliation sweep.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'payment_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('provider', sa.String()),
+        sa.Column('event_id', sa.String()),
+        sa.Column('event_type', sa.String()),
+        sa.Column('object_id', sa.String(), nullable=True),
+        sa.Column('payment_status', sa.String(), nullable=True),
+        sa.Column('payload', sa.Text()),
+        sa.Column('received_at', sa.DateTime()),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_payment_events_id', 'payment_events', ['id'])
+    op.create_index('uq_payment_events_provider_event', 'payment_events', ['provider', 'event_id'], unique=True)
+    op.create_index(
+        'ix_payment_events_unprocessed', 'payment_events', ['id'],
+        sqlite_where=sa.text('processed_at IS NULL'), postgresql_where=sa.text('processed_at IS NULL')
+    )
+    op.create_index(
+        'ix_payments_pending', 'payments', ['created_at'],
+        sqlite_where=sa.text("status = 'pending'"), postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade():
+    op.drop_index('ix_payments_pending', table_name='payments')
+    op.drop_table('payment_events')
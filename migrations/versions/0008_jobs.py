@@ -0,0 +1,45 @@
+"""Background job queue
+
+Jobs run on the in-process worker pool (app/services/jobs.py). Workers claim the queued job
+with the highest priority and earliest run_at from a (status, priority, run_at) index; the
+(status, finished_at) index serves queue depth, dead-letter listing, lease recovery and purging
+finished jobs.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String()),
+        sa.Column('payload', sa.Text()),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Integer()),
+        sa.Column('status', sa.String()),
+        sa.Column('attempts', sa.Integer()),
+        sa.Column('max_attempts', sa.Integer()),
+        sa.Column('run_at', sa.DateTime()),
+        sa.Column('lease_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_jobs_id', 'jobs', ['id'])
+    op.create_index('ix_jobs_ready', 'jobs', ['status', sa.text('priority DESC'), 'run_at'])
+    op.create_index('ix_jobs_status_finished', 'jobs', ['status', 'finished_at'])
+
+
+def downgrade():
+    op.drop_table('jobs')
@@ -0,0 +1,191 @@
+"""Analytics summary tables
+
+analytics_daily holds per (item_type, day, item_id, city) counts of new subscriptions,
+deliveries by status and payments billed, failed and completed; analytics_subscribers holds
+the active subscriptions per (item_type, item_id, city). item_type is 'all' (item_id 0),
+'newspaper' or 'milk'. Row-level triggers on deliveries, subscriptions,
+subscription_newspapers and payments keep both current: a change subtracts the old row's
+contribution and adds the new one's with an upsert, so bulk statements are covered as well as
+ORM writes. Existing rows are summarised here with the same statements run over whole tables;
+app/services/analytics.py can rebuild the tables from scratch.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+DAILY_KEY = ['item_type', 'day', 'item_id', 'city']
+SUBSCRIBERS_KEY = ['item_type', 'item_id', 'city']
+DELIVERY_STATUSES = ['pending', 'delivered', 'cancelled']
+# a FROM for the statements that only read the trigger's row
+ROW = '(SELECT 1 AS one) AS row_'
+
+
+def upsert(table, key, columns, select):
+    """INSERT ... SELECT adding the selected counts to the existing rows for their keys."""
+    updates = ', '.join(f'{c} = {table}.{c} + excluded.{c}' for c in columns)
+    # every select has a WHERE, which SQLite needs to parse ON CONFLICT after INSERT ... SELECT
+    return f'INSERT INTO {table} ({", ".join(key + columns)}) {select} ON CONFLICT ({", ".join(key)}) DO UPDATE SET {updates}'
+
+
+def by_city(columns, source, r, where, group):
+    return (
+        f"SELECT {', '.join(columns)} FROM {source} LEFT JOIN users u ON u.id = {r}.user_id "
+        f"WHERE {where} GROUP BY {', '.join(str(n + 1) for n in range(group))}"
+    )
+
+
+def delivery_counts(source, item_type, item_id, r, sign, where='1 = 1'):
+    counts = [f"SUM({sign} * CASE WHEN {r}.status = '{s}' THEN 1 ELSE 0 END)" for s in DELIVERY_STATUSES]
+    return upsert('analytics_daily', DAILY_KEY, [f'deliveries_{s}' for s in DELIVERY_STATUSES], by_city(
+        [item_type, f'date({r}.scheduled_date)', item_id, "COALESCE(u.city, '')"] + counts,
+        source, r, f'{where} AND {item_id} IS NOT NULL AND {r}.scheduled_date IS NOT NULL', 4
+    ))
+
+
+def subscription_counts(source, item_type, item_id, r, sign, where='1 = 1'):
+    return [
+        upsert('analytics_daily', DAILY_KEY, ['new_subscriptions'], by_city(
+            [item_type, f'date({r}.start_date)', item_id, "COALESCE(u.city, '')", f'SUM({sign})'],
+            source, r, f'{where} AND {item_id} IS NOT NULL AND {r}.start_date IS NOT NULL', 4
+        )),
+        upsert('analytics_subscribers', SUBSCRIBERS_KEY, ['active'], by_city(
+            [item_type, item_id, "COALESCE(u.city, '')", f'SUM({sign} * CASE WHEN {r}.is_active THEN 1 ELSE 0 END)'],
+            source, r, f'{where} AND {item_id} IS NOT NULL', 3
+        )),
+    ]
+
+
+def payment_counts(source, r, sign, where='1 = 1'):
+    amount = f'COALESCE({r}.amount, 0)'
+    return [
+        upsert('analytics_daily', DAILY_KEY, ['payments_billed', 'amount_billed', 'payments_failed'], by_city(
+            ["'all'", f'date({r}.created_at)', '0', "COALESCE(u.city, '')", f'SUM({sign})', f'SUM({sign} * {amount})',
+             f"SUM({sign} * CASE WHEN {r}.status = 'failed' THEN 1 ELSE 0 END)"],
+            source, r, f'{where} AND {r}.created_at IS NOT NULL', 4
+        )),
+        upsert('analytics_daily', DAILY_KEY, ['payments_completed', 'amount_completed'], by_city(
+            ["'all'", f'date({r}.completed_at)', '0', "COALESCE(u.city, '')", f'SUM({sign})', f'SUM({sign} * {amount})'],
+            source, r, f"{where} AND {r}.status = 'completed' AND {r}.completed_at IS NOT NULL", 4
+        )),
+    ]
+
+
+# What one row of each table adds to the summaries, for its triggers (r is NEW or OLD)
+
+def delivery(r, sign):
+    items = (
+        f"(SELECT 'all' AS item_type, 0 AS item_id "
+        f"UNION ALL SELECT 'milk', milk_package_id FROM subscriptions WHERE id = {r}.subscription_id "
+        f"UNION ALL SELECT 'newspaper', newspaper_id FROM subscription_newspapers WHERE subscription_id = {r}.subscription_id) AS items"
+    )
+    return [delivery_counts(items, 'items.item_type', 'items.item_id', r, sign)]
+
+
+def subscription(r, sign):
+    items = (
+        f"(SELECT 'all' AS item_type, 0 AS item_id UNION ALL SELECT 'milk', {r}.milk_package_id "
+        f"UNION ALL SELECT 'newspaper', newspaper_id FROM subscription_newspapers WHERE subscription_id = {r}.id) AS items"
+    )
+    return subscription_counts(items, 'items.item_type', 'items.item_id', r, sign) + [
+        # the newspapers' share of the deliveries follows subscription_newspapers instead
+        delivery_counts('deliveries d', "'milk'", f'{r}.milk_package_id', 'd', sign, f'd.subscription_id = {r}.id'),
+    ]
+
+
+def subscription_newspaper(r, sign):
+    return subscription_counts('subscriptions s', "'newspaper'", f'{r}.newspaper_id', 's', sign, f's.id = {r}.subscription_id') + [
+        delivery_counts('deliveries d', "'newspaper'", f'{r}.newspaper_id', 'd', sign, f'd.subscription_id = {r}.subscription_id'),
+    ]
+
+
+def payment(r, sign):
+    return payment_counts(ROW, r, sign)
+
+
+# table -> (what a row adds, the columns whose update changes that)
+TRIGGERS = {
+    'deliveries': (delivery, ['user_id', 'subscription_id', 'scheduled_date', 'status']),
+    'subscriptions': (subscription, ['user_id', 'milk_package_id', 'start_date', 'is_active']),
+    'subscription_newspapers': (subscription_newspaper, ['subscription_id', 'newspaper_id']),
+    'payments': (payment, ['user_id', 'amount', 'status', 'created_at', 'completed_at']),
+}
+
+# The same counts over the existing rows
+BACKFILL = [
+    delivery_counts('deliveries d', "'all'", '0', 'd', 1),
+    delivery_counts('deliveries d JOIN subscriptions s ON s.id = d.subscription_id', "'milk'", 's.milk_package_id', 'd', 1),
+    delivery_counts('deliveries d JOIN subscription_newspapers sn ON sn.subscription_id = d.subscription_id', "'newspaper'", 'sn.newspaper_id', 'd', 1),
+    *subscription_counts('subscriptions s', "'all'", '0', 's', 1),
+    *subscription_counts('subscriptions s', "'milk'", 's.milk_package_id', 's', 1),
+    *subscription_counts('subscriptions s JOIN subscription_newspapers sn ON sn.subscription_id = s.id', "'newspaper'", 'sn.newspaper_id', 's', 1),
+    *payment_counts('payments p', 'p', 1),
+]
+
+
+def triggers():
+    """(name, table, event, statements) of every trigger."""
+    for table, (contribution, columns) in TRIGGERS.items():
+        yield f'analytics_{table}_insert', table, 'INSERT', contribution('NEW', 1)
+        yield f'analytics_{table}_update', table, f'UPDATE OF {", ".join(columns)}', contribution('OLD', -1) + contribution('NEW', 1)
+        yield f'analytics_{table}_delete', table, 'DELETE', contribution('OLD', -1)
+
+
+def counter(name, type_=sa.Integer):
+    return sa.Column(name, type_(), server_default='0')
+
+
+def upgrade():
+    op.create_table(
+        'analytics_daily',
+        sa.Column('item_type', sa.String(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('item_id', sa.Integer(), primary_key=True),
+        sa.Column('city', sa.String(), primary_key=True),
+        counter('new_subscriptions'),
+        counter('deliveries_pending'),
+        counter('deliveries_delivered'),
+        counter('deliveries_cancelled'),
+        counter('payments_billed'),
+        counter('amount_billed', sa.Float),
+        counter('payments_failed'),
+        counter('payments_completed'),
+        counter('amount_completed', sa.Float),
+    )
+    op.create_table(
+        'analytics_subscribers',
+        sa.Column('item_type', sa.String(), primary_key=True),
+        sa.Column('item_id', sa.Integer(), primary_key=True),
+        sa.Column('city', sa.String(), primary_key=True),
+        counter('active'),
+    )
+    for statement in BACKFILL:
+        op.execute(statement)
+
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for name, table, event, statements in triggers():
+        body = ''.join(f'{statement};\n' for statement in statements)
+        if postgresql:
+            op.execute(f'CREATE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$\nBEGIN\n{body}RETURN NULL;\nEND\n$$')
+            op.execute(f'CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW EXECUTE FUNCTION {name}()')
+        else:
+            op.execute(f'CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW BEGIN\n{body}END')
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for name, table, _, _ in triggers():
+        if postgresql:
+            op.execute(f'DROP TRIGGER IF EXISTS {name} ON {table}')
+            op.execute(f'DROP FUNCTION IF EXISTS {name}()')
+        else:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('analytics_subscribers')
+    op.drop_table('analytics_daily')
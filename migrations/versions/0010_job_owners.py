@@ -0,0 +1,26 @@
+"""Job owners
+
+Jobs queued on a user's behalf (opening the gateway order of their new subscription) record
+the user, so GET /api/jobs/{id} can show a job and its checkout result to that user only.
+Jobs queued from the admin API leave it NULL.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('jobs', sa.Column('user_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs') as batch:
+        batch.drop_column('user_id')
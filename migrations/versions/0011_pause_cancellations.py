@@ -0,0 +1,45 @@
+"""Pause cancellations
+
+Deliveries cancelled by a pause window or blackout are marked, so resuming or lifting the
+blackout puts back only those and not days cancelled any other way. Cancelled deliveries
+currently inside a window are marked as cancelled by it, which is how they were treated so far.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('deliveries', sa.Column('cancelled_by_pause', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    deliveries = sa.table(
+        'deliveries',
+        sa.column('subscription_id', sa.Integer()), sa.column('scheduled_date', sa.DateTime()),
+        sa.column('status', sa.String()), sa.column('cancelled_by_pause', sa.Boolean()),
+    )
+    windows = sa.table(
+        'pause_windows',
+        sa.column('subscription_id', sa.Integer()), sa.column('starts_at', sa.DateTime()),
+        sa.column('ends_at', sa.DateTime()),
+    )
+    op.execute(deliveries.update().where(
+        deliveries.c.status == 'cancelled',
+        sa.exists().where(
+            windows.c.subscription_id == deliveries.c.subscription_id,
+            windows.c.starts_at <= deliveries.c.scheduled_date,
+            sa.or_(windows.c.ends_at == None, windows.c.ends_at > deliveries.c.scheduled_date),
+        )
+    ).values(cancelled_by_pause=True))
+
+
+def downgrade():
+    with op.batch_alter_table('deliveries') as batch:
+        batch.drop_column('cancelled_by_pause')
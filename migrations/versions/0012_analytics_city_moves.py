@@ -0,0 +1,94 @@
+"""Analytics follow a user's change of city
+
+The analytics triggers of 0009 key a row's counts by its user's city at the time of the
+change. A trigger on users.city now moves everything the user's deliveries, subscriptions and
+payments contribute from the old city to the new one, so the later updates of those rows
+subtract from the city their counts are in.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+NAME = 'analytics_users_city'
+DAILY_KEY = ['item_type', 'day', 'item_id', 'city']
+SUBSCRIBERS_KEY = ['item_type', 'item_id', 'city']
+DELIVERY_STATUSES = ['pending', 'delivered', 'cancelled']
+DELIVERY_ITEMS = [
+    ('deliveries d', "'all'", '0'),
+    ('deliveries d JOIN subscriptions s ON s.id = d.subscription_id', "'milk'", 's.milk_package_id'),
+    ('deliveries d JOIN subscription_newspapers sn ON sn.subscription_id = d.subscription_id', "'newspaper'", 'sn.newspaper_id'),
+]
+SUBSCRIPTION_ITEMS = [
+    ('subscriptions s', "'all'", '0'),
+    ('subscriptions s', "'milk'", 's.milk_package_id'),
+    ('subscriptions s JOIN subscription_newspapers sn ON sn.subscription_id = s.id', "'newspaper'", 'sn.newspaper_id'),
+]
+
+
+def upsert(table, key, columns, select):
+    """INSERT ... SELECT adding the selected counts to the existing rows for their keys (as in 0009)."""
+    updates = ', '.join(f'{c} = {table}.{c} + excluded.{c}' for c in columns)
+    return f'INSERT INTO {table} ({", ".join(key + columns)}) {select} ON CONFLICT ({", ".join(key)}) DO UPDATE SET {updates}'
+
+
+def counts(columns, source, where, group):
+    return f"SELECT {', '.join(columns)} FROM {source} WHERE {where} GROUP BY {', '.join(str(n + 1) for n in range(group))}"
+
+
+def user_counts(u, sign):
+    """What the rows of user `u` (NEW or OLD) add to the summaries, all under `u`.city."""
+    city = f"COALESCE({u}.city, '')"
+    statements = []
+    for source, item_type, item_id in DELIVERY_ITEMS:
+        statuses = [f"SUM({sign} * CASE WHEN d.status = '{s}' THEN 1 ELSE 0 END)" for s in DELIVERY_STATUSES]
+        statements.append(upsert('analytics_daily', DAILY_KEY, [f'deliveries_{s}' for s in DELIVERY_STATUSES], counts(
+            [item_type, 'date(d.scheduled_date)', item_id, city] + statuses, source,
+            f'd.user_id = {u}.id AND {item_id} IS NOT NULL AND d.scheduled_date IS NOT NULL', 4
+        )))
+    for source, item_type, item_id in SUBSCRIPTION_ITEMS:
+        statements.append(upsert('analytics_daily', DAILY_KEY, ['new_subscriptions'], counts(
+            [item_type, 'date(s.start_date)', item_id, city, f'SUM({sign})'], source,
+            f's.user_id = {u}.id AND {item_id} IS NOT NULL AND s.start_date IS NOT NULL', 4
+        )))
+        statements.append(upsert('analytics_subscribers', SUBSCRIBERS_KEY, ['active'], counts(
+            [item_type, item_id, city, f'SUM({sign} * CASE WHEN s.is_active THEN 1 ELSE 0 END)'], source,
+            f's.user_id = {u}.id AND {item_id} IS NOT NULL', 3
+        )))
+    amount = 'COALESCE(p.amount, 0)'
+    statements.append(upsert('analytics_daily', DAILY_KEY, ['payments_billed', 'amount_billed', 'payments_failed'], counts(
+        ["'all'", 'date(p.created_at)', '0', city, f'SUM({sign})', f'SUM({sign} * {amount})',
+         f"SUM({sign} * CASE WHEN p.status = 'failed' THEN 1 ELSE 0 END)"], 'payments p',
+        f'p.user_id = {u}.id AND p.created_at IS NOT NULL', 4
+    )))
+    statements.append(upsert('analytics_daily', DAILY_KEY, ['payments_completed', 'amount_completed'], counts(
+        ["'all'", 'date(p.completed_at)', '0', city, f'SUM({sign})', f'SUM({sign} * {amount})'], 'payments p',
+        f"p.user_id = {u}.id AND p.status = 'completed' AND p.completed_at IS NOT NULL", 4
+    )))
+    return statements
+
+
+def upgrade():
+    body = ''.join(f'{statement};\n' for statement in user_counts('OLD', -1) + user_counts('NEW', 1))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'CREATE FUNCTION {NAME}() RETURNS trigger LANGUAGE plpgsql AS $$\nBEGIN\n{body}RETURN NULL;\nEND\n$$')
+        op.execute(
+            f'CREATE TRIGGER {NAME} AFTER UPDATE OF city ON users FOR EACH ROW '
+            f'WHEN (OLD.city IS DISTINCT FROM NEW.city) EXECUTE FUNCTION {NAME}()'
+        )
+    else:
+        op.execute(f'CREATE TRIGGER {NAME} AFTER UPDATE OF city ON users FOR EACH ROW WHEN OLD.city IS NOT NEW.city BEGIN\n{body}END')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'DROP TRIGGER IF EXISTS {NAME} ON users')
+        op.execute(f'DROP FUNCTION IF EXISTS {NAME}()')
+    else:
+        op.execute(f'DROP TRIGGER IF EXISTS {NAME}')
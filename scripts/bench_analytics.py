@@ -0,0 +1,125 @@
+"""Time the admin analytics reports over a large throwaway database, against the same report from the base tables.
+
+Creates --subscriptions subscriptions spread over --cities cities (two newspapers each, milk
+on every other one), materializes --days of deliveries, cancels every seventh, bills the
+month and completes half the bills -- all kept in the summary tables by the triggers. Prints
+the time of each write step, the p50/p95 of each report, a per-city delivery report computed
+from the base tables for comparison, the rebuild time and whether the summaries match a fresh
+computation.
+"""
+import os, sys
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+os.environ['JOB_WORKERS'] = '0'
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import select, func, update, case
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, Delivery, Payment, subscription_newspapers
+from app.database.schema import init_database
+from app.services.analytics import report_range, daily_report, item_report, city_report, rebuild_analytics, summary_drift
+from app.services.billing import run_billing
+from app.services.deliveries import materialize_deliveries
+
+
+def populate(count, cities, start):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.com', 'city': f'City {i % cities}'} for i in range(1, count + 1)
+        ])
+        conn.execute(Subscription.__table__.insert(), [
+            {'id': i, 'user_id': i, 'frequency': 'monthly', 'total_cost': 0, 'milk_package_id': 1 + i % 4 if i % 2 else None,
+             'start_date': datetime.combine(start, datetime.min.time()) - timedelta(days=i % 60), 'is_active': True}
+            for i in range(1, count + 1)
+        ])
+        conn.execute(subscription_newspapers.insert(), [
+            {'subscription_id': i, 'newspaper_id': n} for i in range(1, count + 1) for n in (1 + i % 3, 4 + i % 3)
+        ])
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f'{label}: {(time.perf_counter() - started) * 1000:.0f} ms')
+    return result
+
+
+def latency(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def base_table_city_report(db, start, end):
+    """Deliveries by status per city, straight from deliveries and users."""
+    return db.execute(
+        select(User.city, *[func.sum(case((Delivery.status == s, 1), else_=0)) for s in ('pending', 'delivered', 'cancelled')])
+        .join(User, User.id == Delivery.user_id)
+        .where(Delivery.scheduled_date >= start, Delivery.scheduled_date < end + timedelta(days=1))
+        .group_by(User.city)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=50000)
+    parser.add_argument('--cities', type=int, default=20)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    init_database()
+    start = datetime(2030, 1, 1).date()
+    end = start + timedelta(days=args.days)
+    timed(f'populate {args.subscriptions} subscriptions', lambda: populate(args.subscriptions, args.cities, start))
+    db = SessionLocal()
+    try:
+        stats = timed('materialize deliveries', lambda: materialize_deliveries(db, days=args.days, start=start))
+
+        def cancel_and_complete():
+            db.execute(update(Delivery).where(Delivery.id % 7 == 0).values(status='cancelled'))
+            db.execute(update(Delivery).where(Delivery.id % 7 == 1).values(status='delivered', delivered_at=datetime(2030, 1, 2)))
+            db.commit()
+        timed('cancel and deliver 2/7 of them', cancel_and_complete)
+        timed('bill the period', lambda: run_billing(db, start, end))
+
+        def settle():
+            db.execute(update(Payment).where(Payment.id % 2 == 0).values(status='completed', completed_at=datetime(2030, 2, 3)))
+            db.commit()
+        timed('complete half the bills', settle)
+        print(f"{args.subscriptions} subscriptions, {stats['deliveries_created']} deliveries")
+
+        report_start, report_end = report_range(start, end - timedelta(days=1))
+        reports = {
+            'daily': lambda: daily_report(db, report_start, report_end),
+            'daily, one city': lambda: daily_report(db, report_start, report_end, city='City 1'),
+            'newspapers': lambda: item_report(db, 'newspaper', report_start, report_end),
+            'milk': lambda: item_report(db, 'milk', report_start, report_end),
+            'cities': lambda: city_report(db, report_start, report_end),
+            'cities from base tables': lambda: base_table_city_report(db, report_start, report_end),
+        }
+        for label, fn in reports.items():
+            p50, p95 = latency(fn, args.repeat if 'base' not in label else max(args.repeat // 10, 3))
+            print(f'{label:<24} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms')
+
+        drift = summary_drift(db)
+        print(f"incrementally maintained summaries: {drift['mismatched']} rows differ from a fresh computation")
+        report = rebuild_analytics(db)
+        print(f"rebuild: {report['daily_rows']} daily rows, {report['subscriber_rows']} subscriber rows "
+              f"in {report['elapsed_seconds'] * 1000:.0f} ms")
+    finally:
+        db.close()
+    sys.exit(1 if drift['mismatched'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Compare the threadpool (sync) and DB_ASYNC request paths under many concurrent clients.
+
+Fills a throwaway SQLite database, then for each mode starts `uvicorn app.main:app` in a
+subprocess (DB_ASYNC=0, then DB_ASYNC=1) and drives the async-capable read routes --
+catalog, subscriptions, payment history, calendar -- from --clients concurrent
+connections. Reports throughput, p50/p95/p99/max latency and errors per mode.
+
+    python scripts/bench_async.py --clients 500 --requests 20000
+"""
+import os, sys
+import argparse
+import asyncio
+import random
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import httpx
+from sqlalchemy.engine import make_url
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, Payment, subscription_newspapers
+from app.database.schema import init_database
+from app.services.deliveries import materialize_deliveries
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def populate(users, year):
+    init_database()
+    rng = random.Random(11)
+    window_start = datetime(year, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.com', 'city': 'Pune', 'pincode': '411001'} for i in range(1, users + 1)
+        ])
+        conn.execute(Subscription.__table__.insert(), [
+            {'id': i, 'user_id': i, 'milk_package_id': rng.choice((1, 2, None)), 'frequency': 'daily',
+             'total_cost': 300, 'start_date': window_start} for i in range(1, users + 1)
+        ])
+        conn.execute(subscription_newspapers.insert(), [
+            {'subscription_id': i, 'newspaper_id': rng.randint(1, 3)} for i in range(1, users + 1)
+        ])
+        conn.execute(Payment.__table__.insert(), [
+            {'user_id': i, 'subscription_id': i, 'amount': 300, 'status': 'completed', 'payment_method': 'razorpay',
+             'created_at': window_start + timedelta(days=30 * p)} for i in range(1, users + 1) for p in range(12)
+        ])
+    db = SessionLocal()
+    try:
+        materialize_deliveries(db, days=60, start=window_start.date())
+    finally:
+        db.close()
+
+
+def request_paths(users, year):
+    """Path factories for the routes that have an async variant, weighted like a dashboard session."""
+    return [
+        (2, lambda rng: '/api/newspapers/'),
+        (2, lambda rng: '/api/milk/'),
+        (4, lambda rng: f'/api/subscriptions/{rng.randint(1, users)}'),
+        (2, lambda rng: f'/api/payments/history/{rng.randint(1, users)}'),
+        (4, lambda rng: f'/api/subscriptions/calendar/{rng.randint(1, users)}?from={year}-01-01&to={year}-02-28'),
+    ]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(async_mode, log):
+    port = free_port()
+    env = dict(os.environ, DB_ASYNC='1' if async_mode else '0', SKIP_DB_INIT='1')
+    server = subprocess.Popen(
+        # a long keep-alive so connections idling behind 500 busy clients are not closed under them
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning',
+         '--backlog', '4096', '--timeout-keep-alive', '300'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/config', timeout=1)
+            return server, port
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('uvicorn did not start')
+
+
+def percentile(sorted_ms, q):
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q / 100 * (len(sorted_ms) - 1))))]
+
+
+async def drive(port, paths, clients, requests, seed, deadline):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in paths]
+    factories = [factory for _, factory in paths]
+    remaining = iter(range(requests))
+    timings, errors = [], [0]
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=None) as client:
+        async def worker():
+            for _ in remaining:
+                path = rng.choices(factories, weights)[0](rng)
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(client.get(path), deadline)
+                    if response.status_code >= 400:
+                        errors[0] += 1
+                except (httpx.HTTPError, asyncio.TimeoutError):
+                    # failed or stuck requests (e.g. pool checkout timeouts) count as errors at their elapsed time
+                    errors[0] += 1
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'rps': requests / elapsed,
+        'p50': percentile(timings, 50), 'p95': percentile(timings, 95), 'p99': percentile(timings, 99),
+        'max': timings[-1], 'errors': errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=500, help='concurrent client connections')
+    parser.add_argument('--requests', type=int, default=20000, help='requests per mode')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--deadline', type=float, default=60, help='seconds before a request is counted as failed')
+    args = parser.parse_args()
+
+    year = datetime.utcnow().year
+    started = time.perf_counter()
+    populate(args.users, year)
+    print(f'populated {args.users} users in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    paths = request_paths(args.users, year)
+
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    log_dir = os.path.dirname(make_url(os.environ['DATABASE_URL']).database)
+    for mode in args.modes.split(','):
+        # server errors (e.g. connection pool timeouts) go to a log instead of the report
+        log_path = os.path.join(log_dir, f'{mode}-server.log')
+        with open(log_path, 'w') as log:
+            server, port = start_server(mode == 'async', log)
+        try:
+            # warm the catalog cache and the connection pool before timing
+            asyncio.run(drive(port, paths, min(args.clients, 50), 500, 0, args.deadline))
+            r = asyncio.run(drive(port, paths, args.clients, args.requests, 1, args.deadline))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:<6} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['max']:>8.1f} {r['errors']:>7}")
+        print(f'{mode} server log: {log_path}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
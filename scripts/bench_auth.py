@@ -0,0 +1,74 @@
+"""Benchmark mixed login and catalog traffic with bcrypt inline vs on the process pool.
+
+Login threads hammer /api/auth/login while catalog threads read /api/newspapers/; the
+catalog latency shows how much the password hashing starves the rest of the app.
+"""
+import os, sys
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import security
+
+
+def drive(client, seconds, login_threads, catalog_threads):
+    stop = time.perf_counter() + seconds
+    logins, catalog = [], []
+
+    def login_loop():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            r = client.post('/api/auth/login', params={'email': 'bench@example.com', 'password': 'bench-password'})
+            if r.status_code == 200:
+                logins.append(time.perf_counter() - started)
+
+    def catalog_loop():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            client.get('/api/newspapers/')
+            catalog.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(login_threads)]
+    threads += [threading.Thread(target=catalog_loop) for _ in range(catalog_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    catalog.sort()
+    return {
+        'logins/s': len(logins) / seconds,
+        'catalog req/s': len(catalog) / seconds,
+        'catalog p50 ms': statistics.median(catalog) * 1000,
+        'catalog p95 ms': catalog[int(len(catalog) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--catalog-threads', type=int, default=4)
+    args = parser.parse_args()
+
+    pool_workers = security.PASSWORD_HASH_WORKERS or 1
+    with TestClient(app) as client:
+        client.post('/api/auth/register', json={
+            'email': 'bench@example.com', 'password': 'bench-password', 'full_name': 'Bench', 'phone': '0',
+            'address': '-', 'city': 'Pune', 'pincode': '411001'
+        })
+        for label, workers in [('inline (before)', 0), (f'pool x{pool_workers} (after)', pool_workers)]:
+            security.PASSWORD_HASH_WORKERS = workers
+            result = drive(client, args.seconds, args.login_threads, args.catalog_threads)
+            print(f'{label:<22} ' + '  '.join(f'{k} {v:7.1f}' for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
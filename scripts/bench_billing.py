@@ -0,0 +1,79 @@
+"""Time a billing run over a large throwaway database, then re-run it to check it is idempotent.
+
+Creates --subscriptions subscriptions (two newspapers each, milk on every other one) with a
+month of pending deliveries, cancels every --skip-every'th one as a skipped day, and bills the month
+twice. Prints throughput and the peak Python memory of each run, which should depend on
+--chunk-size, not on --subscriptions.
+"""
+import os, sys
+import argparse
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import select, func, update
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, Delivery, Payment, subscription_newspapers
+from app.database.schema import init_database
+from app.services.billing import run_billing, month_period
+from app.services.deliveries import materialize_deliveries
+
+
+def populate(count, start):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{'id': i, 'email': f'user{i}@example.com'} for i in range(1, count + 1)])
+        conn.execute(Subscription.__table__.insert(), [
+            {'id': i, 'user_id': i, 'frequency': 'monthly', 'total_cost': 0, 'milk_package_id': 1 if i % 2 else None,
+             'start_date': datetime.combine(start, datetime.min.time())}
+            for i in range(1, count + 1)
+        ])
+        conn.execute(subscription_newspapers.insert(), [
+            {'subscription_id': i, 'newspaper_id': n} for i in range(1, count + 1) for n in (1, 2)
+        ])
+
+
+def timed_run(db, start, end, chunk_size):
+    tracemalloc.start()
+    started = time.perf_counter()
+    report = run_billing(db, start, end, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return report, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--skip-every', type=int, default=7, help='cancel every Nth delivery')
+    parser.add_argument('--month', default='2030-01')
+    args = parser.parse_args()
+
+    init_database()
+    start, end = month_period(args.month)
+    populate(args.subscriptions, start)
+    db = SessionLocal()
+    try:
+        stats = materialize_deliveries(db, days=(end - start).days, start=start)
+        db.execute(update(Delivery).where(Delivery.id % args.skip_every == 0).values(status='cancelled'))
+        db.commit()
+        print(f"setup: {args.subscriptions} subscriptions, {stats['deliveries_created']} deliveries")
+
+        for label in ('billing run', 're-run'):
+            report, elapsed, peak = timed_run(db, start, end, args.chunk_size)
+            print(f"{label}: {report['payments_created']} bills ({report['already_billed']} already billed), "
+                  f"{report['amount_billed']} billed in {elapsed * 1000:.0f} ms "
+                  f"({report['subscriptions_per_second']} subscriptions/sec), peak memory {peak / 2 ** 20:.1f} MiB")
+        bills = db.execute(select(func.count()).select_from(Payment).where(Payment.period_start != None)).scalar()
+        print(f"bills for the period: {bills}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the delivery calendar as one user's delivery history grows.
+
+Uses a throwaway SQLite database. Each step adds older deliveries to the same user and
+times a one-month calendar request, which should stay flat regardless of history size.
+"""
+import os, sys
+import argparse
+import calendar
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TMP_DIR = tempfile.mkdtemp(prefix='dailyeaze-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database.database import engine
+from app.database.schema import init_database
+from app.database.models import User, Subscription, Delivery
+from app.services.security import create_access_token
+
+
+def add_history(conn, user_id, subscription_id, first_day, count):
+    """Insert `count` daily deliveries going back in time from `first_day`."""
+    rows = [{
+        'user_id': user_id,
+        'subscription_id': subscription_id,
+        'scheduled_date': first_day - timedelta(days=i),
+        'status': 'delivered',
+    } for i in range(count)]
+    conn.execute(Delivery.__table__.insert(), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help='history sizes to test')
+    parser.add_argument('--repeat', type=int, default=50, help='requests per size')
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    month = now.strftime('%Y-%m')
+    month_days = calendar.monthrange(now.year, now.month)[1]
+    init_database(seed=False)
+    with engine.begin() as conn:
+        user_id = conn.execute(User.__table__.insert().values(email='bench@example.com', full_name='Bench')).inserted_primary_key[0]
+        sub_id = conn.execute(Subscription.__table__.insert().values(user_id=user_id, frequency='monthly', total_cost=0)).inserted_primary_key[0]
+        # the month being viewed always holds one delivery per day
+        add_history(conn, user_id, sub_id, now.replace(day=month_days, hour=8), month_days)
+
+    client = TestClient(app, headers={'Authorization': f'Bearer {create_access_token(user_id)}'})
+    oldest = now.replace(day=1, hour=8) - timedelta(days=1)
+    total = 0
+    print(f"{'history':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with engine.begin() as conn:
+            add_history(conn, user_id, sub_id, oldest - timedelta(days=total), size - total)
+        total = size
+
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            r = client.get(f'/api/subscriptions/calendar/{user_id}', params={'month': month})
+            timings.append((time.perf_counter() - started) * 1000)
+            assert r.status_code == 200 and len(r.json()) == month_days
+        timings.sort()
+        print(f"{size:>10} {statistics.median(timings):>9.2f} {timings[int(len(timings) * 0.95) - 1]:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
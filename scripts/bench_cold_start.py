@@ -0,0 +1,69 @@
+"""Measure worker cold start: `import app.main` time and time to the first served request.
+
+Each run is a fresh interpreter against a throwaway SQLite database that was initialised
+once up front, the way a deploy runs scripts/init_db.py. Runs are repeated with database
+init on startup (the local default) and with SKIP_DB_INIT=1 (how production workers start),
+and the heavy modules a worker loaded before its first request are listed so new eager
+imports show up here.
+"""
+import os, sys
+import argparse
+import json
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+# modules that should only load on first use, never while a worker starts
+WATCHED_MODULES = ('stripe', 'razorpay', 'requests', 'alembic')
+
+CHILD = '''
+import sys, time, json
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+with TestClient(app) as client:
+    status = client.get('/api/newspapers/').status_code
+first_request = time.perf_counter() - (client_ready - imported)
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (first_request - started) * 1000,
+    'status': status,
+    'loaded': [m for m in %r if m in sys.modules],
+}))
+''' % (WATCHED_MODULES,)
+
+
+def run_child(env):
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per mode')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+    env.pop('SKIP_DB_INIT', None)
+    subprocess.run([sys.executable, os.path.join(ROOT, 'scripts', 'init_db.py')], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    print(f"{'mode':<16} {'import p50':>11} {'first req p50':>14} {'first req max':>14}  loaded on start")
+    for mode, skip in (('init on start', ''), ('SKIP_DB_INIT=1', '1')):
+        env['SKIP_DB_INIT'] = skip
+        results = [run_child(env) for _ in range(args.runs)]
+        bad = [r['status'] for r in results if r['status'] != 200]
+        if bad:
+            raise SystemExit(f'{mode}: first request failed with {bad[0]}')
+        imports = [r['import_ms'] for r in results]
+        firsts = [r['first_request_ms'] for r in results]
+        loaded = ', '.join(results[-1]['loaded']) or '-'
+        print(f"{mode:<16} {statistics.median(imports):>9.0f}ms {statistics.median(firsts):>12.0f}ms {max(firsts):>12.0f}ms  {loaded}")
+
+
+if __name__ == '__main__':
+    main()
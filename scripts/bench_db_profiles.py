@@ -0,0 +1,100 @@
+"""Concurrent writer/reader benchmark comparing database engine profiles.
+
+Each profile gets a fresh SQLite file. Writer threads insert deliveries one transaction at a
+time while reader threads run calendar-style range queries; the report shows write and read
+throughput, p95 write latency, lock errors and pool wait statistics.
+
+    python scripts/bench_db_profiles.py --profiles default,sqlite --writers 8 --readers 8
+"""
+import os, sys
+import argparse
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from sqlalchemy import select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.database.database import Base, build_engine
+from app.database.models import Delivery
+
+
+def run_profile(profile, url, writers, readers, seconds):
+    engine = build_engine(url, profile)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    stop = time.perf_counter() + seconds
+    write_latencies, reads, errors = [], [0], [0]
+    lock = threading.Lock()
+
+    def writer(n):
+        day = datetime(2026, 1, 1)
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            db = Session()
+            try:
+                db.add(Delivery(user_id=n, subscription_id=n, scheduled_date=day, status='pending'))
+                db.commit()
+                with lock:
+                    write_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors[0] += 1
+            finally:
+                db.close()
+            day += timedelta(days=1)
+
+    def reader(n):
+        while time.perf_counter() < stop:
+            db = Session()
+            try:
+                db.execute(select(func.count()).select_from(Delivery).where(
+                    Delivery.user_id == n, Delivery.scheduled_date >= datetime(2026, 1, 1)
+                )).scalar()
+                with lock:
+                    reads[0] += 1
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = engine.pool_stats.snapshot()
+    engine.dispose()
+    write_latencies.sort()
+    p95 = write_latencies[int(len(write_latencies) * 0.95) - 1] * 1000 if write_latencies else 0
+    return {
+        'writes/s': len(write_latencies) / seconds,
+        'reads/s': reads[0] / seconds,
+        'write p95 ms': p95,
+        'lock errors': errors[0],
+        'pool wait max ms': stats['wait_max_ms'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default='default,sqlite')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='dailyeaze-bench-')
+    for profile in args.profiles.split(','):
+        url = 'sqlite:///' + os.path.join(tmp, f'{profile}.db')
+        result = run_profile(profile, url, args.writers, args.readers, args.seconds)
+        print(f'{profile:<8} ' + '  '.join(f'{k} {v:8.1f}' for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
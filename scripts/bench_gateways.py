@@ -0,0 +1,67 @@
+"""Load test subscription creation against the fake gateway, healthy and with Razorpay hanging.
+
+With the circuit breaker, throughput while Razorpay hangs should stay close to the healthy
+run: after a few timeouts the breaker opens and orders go straight to Stripe. Orders are
+opened by payment_order jobs, so each request waits for its job to finish.
+"""
+import os, sys
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from scripts.fake_gateway import start_fake_gateway, wait_for_checkout
+
+gateway = start_fake_gateway()
+base = f'http://127.0.0.1:{gateway.server_address[1]}'
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db'),
+    'RAZORPAY_PUBLIC_KEY': 'rzp_test_fake', 'RAZORPAY_SECRET_KEY': 'fake',
+    'STRIPE_SECRET_KEY': 'sk_test_fake',
+    'RAZORPAY_BASE_URL': base + '/razorpay', 'STRIPE_API_BASE': base + '/stripe',
+    'SECRET_KEY': 'bench-secret',
+})
+os.environ.setdefault('GATEWAY_TIMEOUT', '1')
+# one job worker per concurrent client, so the workers are not the bottleneck
+os.environ.setdefault('JOB_WORKERS', '20')
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.security import create_access_token
+
+
+def run(client, user_id, requests, concurrency):
+    def create(_):
+        r = client.post('/api/subscriptions/', json={'user_id': user_id, 'newspaper_ids': [1], 'milk_package_id': 1})
+        return wait_for_checkout(client, r.json()).get('payment_method')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        methods = list(pool.map(create, range(requests)))
+    elapsed = time.perf_counter() - started
+    counts = {m: methods.count(m) for m in sorted(set(methods), key=str)}
+    return requests / elapsed, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        user = client.post('/api/auth/register', json={
+            'email': 'bench@example.com', 'password': 'bench', 'full_name': 'Bench', 'phone': '0',
+            'address': '-', 'city': 'Pune', 'pincode': '411001'
+        }).json()
+        client.headers['Authorization'] = f"Bearer {create_access_token(user['id'])}"
+
+        for label, hang in [('healthy', set()), ('razorpay hanging', {'razorpay'})]:
+            gateway.hang = hang
+            rps, counts = run(client, user['id'], args.requests, args.concurrency)
+            print(f'{label:<18} {rps:8.1f} req/s  {counts}')
+
+
+if __name__ == '__main__':
+    main()
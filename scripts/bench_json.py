@@ -0,0 +1,118 @@
+"""Micro-benchmark the JSON paths for 10k-row list responses.
+
+Loads --rows payments and --rows subscriptions (with newspapers and milk packages) from a
+throwaway SQLite database and times, per path, the query plus serialization to bytes:
+
+  orm + response_model   ORM objects validated against the response schema and dumped by
+                         pydantic (what FastAPI does for a response_model route)
+  orm + jsonable_encoder ORM objects validated, then jsonable_encoder + json.dumps (what a
+                         route without a response model, or the old catalog cache, did)
+  row tuples + orjson    the response columns selected as tuples, zipped into dicts and
+                         dumped by orjson (app/services/fast_json.py, used by the list routes)
+
+    python scripts/bench_json.py --rows 10000 --repeat 20
+"""
+import os, sys
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, Payment, subscription_newspapers
+from app.database.schema import init_database
+from app.models.schemas import PaymentResponse, SubscriptionResponse
+from app.routes.payments import HISTORY_COLUMNS, HISTORY_KEYS
+from app.routes.subscriptions import _subscriptions_select, _page_newspapers_select, _subscriptions_body
+from app.services.fast_json import dumps, as_dicts
+
+
+def populate(rows):
+    init_database()
+    start = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{'id': 1, 'email': 'bench@example.com'}])
+        conn.execute(Subscription.__table__.insert(), [
+            {'id': i, 'user_id': 1, 'milk_package_id': (None, 1, 2)[i % 3], 'frequency': 'monthly',
+             'total_cost': 300, 'start_date': start} for i in range(1, rows + 1)
+        ])
+        conn.execute(subscription_newspapers.insert(), [
+            {'subscription_id': i, 'newspaper_id': n} for i in range(1, rows + 1) for n in (1, 2)
+        ])
+        conn.execute(Payment.__table__.insert(), [
+            {'user_id': 1, 'subscription_id': i, 'amount': 300.0, 'status': 'completed', 'payment_method': 'razorpay',
+             'created_at': start + timedelta(minutes=i)} for i in range(1, rows + 1)
+        ])
+
+
+def payment_paths(db, rows):
+    adapter = TypeAdapter(list[PaymentResponse])
+    orm = lambda: db.scalars(select(Payment).where(Payment.user_id == 1).order_by(Payment.id).limit(rows)).all()
+    return {
+        'orm + response_model': lambda: adapter.dump_json(adapter.validate_python(orm(), from_attributes=True)),
+        'orm + jsonable_encoder': lambda: json.dumps(jsonable_encoder(adapter.validate_python(orm(), from_attributes=True))).encode(),
+        'row tuples + orjson': lambda: dumps(as_dicts(db.execute(
+            select(*HISTORY_COLUMNS).where(Payment.user_id == 1).order_by(Payment.id).limit(rows)).all(), HISTORY_KEYS)),
+    }
+
+
+def subscription_paths(db, rows):
+    adapter = TypeAdapter(list[SubscriptionResponse])
+    orm = lambda: db.scalars(select(Subscription).options(
+        joinedload(Subscription.milk_package), selectinload(Subscription.newspapers)
+    ).where(Subscription.user_id == 1).order_by(Subscription.id).limit(rows)).all()
+
+    def tuples():
+        page = db.execute(_subscriptions_select(1, None, rows - 1)).all()
+        return dumps(_subscriptions_body(page, db.execute(_page_newspapers_select(page)).all()))
+
+    return {
+        'orm + response_model': lambda: adapter.dump_json(adapter.validate_python(orm(), from_attributes=True)),
+        'orm + jsonable_encoder': lambda: json.dumps(jsonable_encoder(adapter.validate_python(orm(), from_attributes=True))).encode(),
+        'row tuples + orjson': tuples,
+    }
+
+
+def run(db, name, paths, repeat):
+    print(f"{name}")
+    print(f"  {'path':<24} {'median ms':>10} {'min ms':>8} {'MB':>6} {'vs response_model':>18}")
+    baseline = None
+    for path, fn in paths.items():
+        timings = []
+        for _ in range(repeat):
+            db.expunge_all()  # every run loads fresh objects, as a request would
+            started = time.perf_counter()
+            body = fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        print(f"  {path:<24} {median:>10.1f} {min(timings):>8.1f} {len(body) / 1e6:>6.2f} {baseline / median:>17.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    populate(args.rows)
+    db = SessionLocal()
+    try:
+        run(db, f'payments ({args.rows} rows)', payment_paths(db, args.rows), args.repeat)
+        run(db, f'subscriptions with newspapers and milk ({args.rows} rows)', subscription_paths(db, args.rows), args.repeat)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
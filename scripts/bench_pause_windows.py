@@ -0,0 +1,94 @@
+"""Time blackouts and the "active on day D" lookup against a large throwaway database.
+
+Creates --subscriptions subscriptions with a month of pending deliveries and a few personal
+pause windows each, then times a city-wide blackout (pausing about half of them and
+cancelling their deliveries), single-subscription lookups, a count of every subscription
+active on a day, and lifting the blackout again.
+"""
+import os, sys
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import select, func
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, PauseWindow, Blackout
+from app.database.schema import init_database
+from app.services.deliveries import materialize_deliveries
+from app.services.pauses import create_blackout, lift_blackout, is_active_on, active_on
+
+
+def populate(count, windows_per_subscription, start):
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.com', 'city': rng.choice(('Pune', 'Mumbai')), 'pincode': '411001'}
+            for i in range(1, count + 1)
+        ])
+        conn.execute(Subscription.__table__.insert(), [
+            {'id': i, 'user_id': i, 'frequency': 'daily', 'total_cost': 0, 'start_date': datetime.combine(start, datetime.min.time())}
+            for i in range(1, count + 1)
+        ])
+        windows = []
+        for i in range(1, count + 1):
+            for _ in range(windows_per_subscription):
+                first = datetime.combine(start, datetime.min.time()) + timedelta(days=rng.randrange(-120, 60))
+                windows.append({'subscription_id': i, 'starts_at': first, 'ends_at': first + timedelta(days=rng.randint(1, 5)), 'reason': 'pause'})
+        if windows:
+            conn.execute(PauseWindow.__table__.insert(), windows)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=100000)
+    parser.add_argument('--windows', type=int, default=3, help='personal pause windows per subscription')
+    parser.add_argument('--days', type=int, default=30, help='days of pending deliveries to materialize')
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    init_database(seed=False)
+    start = date.today()
+    populate(args.subscriptions, args.windows, start)
+    db = SessionLocal()
+    try:
+        stats = materialize_deliveries(db, days=args.days, start=start)
+        print(f"setup: {args.subscriptions} subscriptions, {stats['deliveries_created']} deliveries")
+
+        holiday = start + timedelta(days=10)
+        result, elapsed = timed(lambda: create_blackout(db, holiday, holiday + timedelta(days=1), 'strike', city='Pune'))
+        print(f"blackout (city=Pune, 2 days): {result['windows_created']} windows, "
+              f"{result['deliveries_cancelled']} deliveries cancelled in {elapsed * 1000:.0f} ms")
+
+        rng = random.Random(5)
+        lookups = []
+        for _ in range(args.lookups):
+            _, elapsed = timed(lambda: is_active_on(db, rng.randint(1, args.subscriptions), holiday))
+            lookups.append(elapsed * 1000)
+        lookups.sort()
+        print(f"is_active_on: p50 {statistics.median(lookups):.3f} ms, p95 {lookups[int(len(lookups) * 0.95)]:.3f} ms")
+
+        active, elapsed = timed(lambda: db.execute(select(func.count()).select_from(Subscription).where(active_on(holiday))).scalar())
+        print(f"active on {holiday}: {active} of {args.subscriptions} counted in {elapsed * 1000:.0f} ms")
+
+        blackout = db.query(Blackout).first()
+        result, elapsed = timed(lambda: lift_blackout(db, blackout))
+        print(f"lift blackout: {result['windows_removed']} windows removed, "
+              f"{result['deliveries_restored']} deliveries restored in {elapsed * 1000:.0f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Time catalog searches over a generated in-memory catalog of --titles titles.
+
+Builds a CatalogIndex from made-up newspaper, magazine and milk names (no database), prints
+how long the build took, then the p50/p99 of a set of queries: no text, prefixes, typos,
+several words, and filters with and without text. Exits non-zero if any p99 is over --budget
+milliseconds.
+"""
+import os, sys
+import argparse
+import random
+import statistics
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.catalog_search import CatalogIndex
+
+WORDS = [
+    'times', 'express', 'herald', 'chronicle', 'tribune', 'gazette', 'observer', 'standard', 'mirror', 'post',
+    'sakal', 'lokmat', 'pudhari', 'samachar', 'bhaskar', 'jagran', 'dinamalar', 'mathrubhumi', 'vijay', 'prabhat',
+    'business', 'economic', 'financial', 'sports', 'science', 'digest', 'weekly', 'today', 'world', 'india',
+    'pune', 'mumbai', 'delhi', 'chennai', 'kolkata', 'nagpur', 'nashik', 'morning', 'evening', 'daily',
+]
+LANGUAGES = ['English', 'Hindi', 'Marathi', 'Tamil', 'Bengali', 'Malayalam', 'Gujarati', 'Kannada']
+GENRES = ['General', 'Business', 'Sports', 'Science', 'Entertainment', 'Lifestyle', 'Kids']
+
+
+def titles(count, seed=1):
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        kind = 'milk' if i % 20 == 0 else 'magazine' if i % 3 == 0 else 'newspaper'
+        name = ' '.join(rng.sample(WORDS, rng.randint(1, 3))).title() + f' {i}'
+        title = {'kind': kind, 'id': i, 'name': name, 'price': round(rng.uniform(2, 80), 2)}
+        if kind == 'milk':
+            title.update(language=None, genre=None, quantity_ml=rng.choice([250, 500, 1000]))
+        else:
+            title.update(language=rng.choice(LANGUAGES), genre=rng.choice(GENRES))
+        if kind == 'magazine':
+            title.update(is_complementary=i % 2 == 0, newspaper_id=None)
+        result.append(title)
+    return result
+
+
+QUERIES = {
+    'everything': {},
+    'one-letter prefix': {'query': 't'},
+    'prefix': {'query': 'chro'},
+    'exact word': {'query': 'tribune'},
+    'typo': {'query': 'tribnue'},
+    'two typos, long word': {'query': 'mathrubumhi'},
+    'two words': {'query': 'pune tim'},
+    'filters only': {'filters': {'language': ['Hindi', 'Marathi'], 'genre': ['Business']}, 'max_price': 30},
+    'text and filters': {'query': 'daily', 'filters': {'kind': ['newspaper'], 'language': ['English']}, 'min_price': 5, 'max_price': 20},
+    'complementary': {'complementary': True, 'filters': {'language': ['Tamil']}},
+    'deep page': {'query': 'd', 'offset': 2000},
+}
+
+
+def latency(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(int(len(samples) * 0.99) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--budget', type=float, default=1.0, help='p99 limit in milliseconds')
+    args = parser.parse_args()
+
+    catalog = titles(args.titles)
+    started = time.perf_counter()
+    index = CatalogIndex(catalog)
+    print(f'index of {args.titles} titles, {len(index.vocabulary)} words: built in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+    slow = 0
+    for label, params in QUERIES.items():
+        total = index.search(**params)['total']
+        p50, p99 = latency(lambda: index.search(**params), args.repeat)
+        slow += p99 > args.budget
+        print(f'{label:<22} {total:6} hits  p50 {p50:6.3f} ms  p99 {p99:6.3f} ms')
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark the routes the dashboard calls, in-process, against a populated database.
+
+Drives the real app from app/main.py through httpx's ASGI transport (no server, no sockets)
+against a throwaway SQLite database filled at the requested scale. Subscription creation
+talks to the local fake gateway from scripts/fake_gateway.py. Every scenario reports
+p50/p95/p99 latency and requests per second; results are written as JSON, and --compare
+prints the change against an earlier results file.
+"""
+import os, sys
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from scripts.fake_gateway import start_fake_gateway
+
+gateway = start_fake_gateway()
+base = f'http://127.0.0.1:{gateway.server_address[1]}'
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-bench-'), 'bench.db'),
+    'RAZORPAY_PUBLIC_KEY': 'rzp_test_fake', 'RAZORPAY_SECRET_KEY': 'fake',
+    'STRIPE_SECRET_KEY': 'sk_test_fake',
+    'RAZORPAY_BASE_URL': base + '/razorpay', 'STRIPE_API_BASE': base + '/stripe',
+    'SKIP_DB_INIT': '1',
+})
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+import httpx
+from app.main import app
+from app.services.security import create_access_token
+from app.database.database import engine, SessionLocal
+from app.database.models import User, Subscription, Payment, Newspaper, MilkPackage, subscription_newspapers
+from app.database.schema import init_database
+from app.services.deliveries import materialize_deliveries
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+
+def populate(users, payments_per_user, delivery_days, year):
+    """Fill the database: one subscription per user, its deliveries from Jan 1 and a payment history."""
+    init_database()
+    rng = random.Random(7)
+    window_start = datetime(year, 1, 1)
+    with engine.begin() as conn:
+        newspaper_ids = [row[0] for row in conn.execute(Newspaper.__table__.select().with_only_columns(Newspaper.id))]
+        milk_ids = [row[0] for row in conn.execute(MilkPackage.__table__.select().with_only_columns(MilkPackage.id))]
+        conn.execute(User.__table__.insert(), [{
+            'id': i, 'email': f'user{i}@example.com', 'full_name': f'User {i}', 'phone': '0',
+            'address': '-', 'city': 'Pune', 'pincode': str(411001 + i % 50),
+        } for i in range(1, users + 1)])
+        conn.execute(Subscription.__table__.insert(), [{
+            'id': i, 'user_id': i, 'milk_package_id': rng.choice(milk_ids + [None]),
+            'frequency': rng.choice(FREQUENCIES), 'total_cost': 300, 'start_date': window_start,
+        } for i in range(1, users + 1)])
+        conn.execute(subscription_newspapers.insert(), [
+            {'subscription_id': i, 'newspaper_id': n}
+            for i in range(1, users + 1) for n in rng.sample(newspaper_ids, rng.randint(1, 2))
+        ])
+        conn.execute(Payment.__table__.insert(), [{
+            'user_id': i, 'subscription_id': i, 'amount': 300, 'status': rng.choice(('completed', 'pending')),
+            'payment_method': 'razorpay', 'created_at': window_start + timedelta(days=30 * p),
+        } for i in range(1, users + 1) for p in range(payments_per_user)])
+    db = SessionLocal()
+    try:
+        materialize_deliveries(db, days=delivery_days, start=window_start.date())
+    finally:
+        db.close()
+    return newspaper_ids, milk_ids
+
+
+def build_scenarios(users, newspaper_ids, milk_ids, delivery_days, year):
+    """Scenario name -> (mix weight, request factory). Weights approximate a dashboard session."""
+    def user(rng):
+        return rng.randint(1, users)
+
+    def toggle(client, rng):
+        day = datetime(year, 1, 1) + timedelta(days=rng.randrange(delivery_days))
+        return client.post(f'/api/subscriptions/{user(rng)}/toggle-delivery', json={'date': day.date().isoformat()})
+
+    def create(client, rng):
+        return client.post('/api/subscriptions/', json={
+            'user_id': user(rng), 'newspaper_ids': rng.sample(newspaper_ids, 1),
+            'milk_package_id': rng.choice(milk_ids + [None]), 'frequency': rng.choice(FREQUENCIES),
+        })
+
+    return {
+        'config': (2, lambda client, rng: client.get('/api/config')),
+        'newspapers': (4, lambda client, rng: client.get('/api/newspapers/')),
+        'milk': (4, lambda client, rng: client.get('/api/milk/')),
+        'magazines': (4, lambda client, rng: client.get('/api/magazines/')),
+        'subscriptions': (4, lambda client, rng: client.get(f'/api/subscriptions/{user(rng)}')),
+        'payment_history': (2, lambda client, rng: client.get(f'/api/payments/history/{user(rng)}')),
+        'calendar': (4, lambda client, rng: client.get(
+            f'/api/subscriptions/calendar/{user(rng)}?from={year}-01-01&to={year}-12-31')),
+        'toggle_delivery': (1, toggle),
+        'create_subscription': (1, create),
+    }
+
+
+def percentile(sorted_ms, q):
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q / 100 * (len(sorted_ms) - 1))))]
+
+
+async def run_scenario(client, pick, requests, concurrency, seed):
+    """Issue `requests` calls from `concurrency` concurrent workers; pick(rng) chooses the request."""
+    rng = random.Random(seed)
+    remaining = iter(range(requests))
+    timings, statuses = [], {}
+
+    async def worker():
+        for _ in remaining:
+            factory = pick(rng)
+            started = time.perf_counter()
+            response = await factory(client, rng)
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'rps': round(requests / elapsed, 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, previous=None):
+    header = f"{'scenario':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    if previous:
+        header += f" {'req/s vs prev':>14} {'p95 vs prev':>12}"
+    print(header)
+    for name, r in results['scenarios'].items():
+        line = f"{name:<20} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}"
+        before = (previous or {}).get('scenarios', {}).get(name)
+        if before:
+            line += f" {(r['rps'] / before['rps'] - 1) * 100:>+13.1f}% {(r['p95_ms'] / before['p95_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+
+async def run_suite(args):
+    year = datetime.utcnow().year
+    started = time.perf_counter()
+    newspaper_ids, milk_ids = populate(args.users, args.payments_per_user, args.delivery_days, year)
+    print(f'populated {args.users} users in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    scenarios = build_scenarios(args.users, newspaper_ids, milk_ids, args.delivery_days, year)
+    selected = args.scenarios.split(',') if args.scenarios else list(scenarios) + ['mix']
+    names = [name for name in scenarios if name in selected]
+    weights = [scenarios[name][0] for name in names]
+    factories = [scenarios[name][1] for name in names]
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'settings': {
+            'users': args.users, 'payments_per_user': args.payments_per_user, 'delivery_days': args.delivery_days,
+            'requests': args.requests, 'concurrency': args.concurrency,
+        },
+        'scenarios': {},
+    }
+    # a failing route is counted as a 5xx for its scenario instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # an admin token, so one client can act for every generated user
+    headers = {'Authorization': f'Bearer {create_access_token(0, is_admin=True)}'}
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', headers=headers) as client:
+        for i, name in enumerate(names):
+            factory = scenarios[name][1]
+            # warm caches and lazily created clients so the first timed request is not an outlier
+            await factory(client, random.Random(0))
+            results['scenarios'][name] = await run_scenario(client, lambda rng, f=factory: f, args.requests, args.concurrency, i)
+        if 'mix' in selected and names:
+            results['scenarios']['mix'] = await run_scenario(
+                client, lambda rng: rng.choices(factories, weights)[0], args.requests * 2, args.concurrency, len(names))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000, help='customers, one subscription each')
+    parser.add_argument('--payments-per-user', type=int, default=12)
+    parser.add_argument('--delivery-days', type=int, default=90, help='days of deliveries per subscription from Jan 1')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario (the mix runs twice as many)')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--scenarios', help='comma-separated subset, e.g. newspapers,calendar,mix')
+    parser.add_argument('--output', default='bench-results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args))
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Fail if any query issued by the API routes falls back to a full table scan.
+
+Builds a throwaway SQLite database through the migrations, drives every route with the test
+client while recording the SQL it runs, then runs EXPLAIN QUERY PLAN on each distinct
+statement. Exits non-zero if a plan contains a full SCAN of a table not in SCAN_ALLOWED, or if
+a route in ADMIN_ONLY answers a caller without an admin token.
+
+    python scripts/check_query_plans.py [-v]
+"""
+import os, sys
+import argparse
+import re
+import tempfile
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-plans-'), 'plans.db')
+os.environ.update(STRIPE_WEBHOOK_SECRET='whsec_plans', RAZORPAY_WEBHOOK_SECRET='rzp_whsec_plans', SECRET_KEY='plans-secret')
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database.database import engine
+from app.services.security import create_access_token
+from scripts.fake_gateway import signed_webhook
+
+# Small lookup tables that are read whole on purpose, plus inline subqueries
+SCAN_ALLOWED = {'newspapers', 'milk_packages', 'magazines', 'blackouts', 'days', 'CONSTANT', 'alembic_version', 'sqlite_master'}
+# sent on the admin routes, which turn away user tokens
+ADMIN_HEADERS = {'Authorization': f"Bearer {create_access_token(0, is_admin=True)}"}
+# admin routes that must answer 401 without a token and 403 with a user's
+ADMIN_ONLY = [
+    ('post', '/api/admin/newspapers'),
+    ('put', '/api/admin/newspapers/1'),
+    ('delete', '/api/admin/newspapers/1'),
+    ('post', '/api/admin/milk'),
+    ('put', '/api/admin/milk/1'),
+    ('delete', '/api/admin/milk/1'),
+    ('get', '/api/admin/manifests/2030-01-01'),
+    ('post', '/api/admin/billing/run'),
+    ('post', '/api/admin/blackouts'),
+    ('get', '/api/admin/blackouts'),
+    ('delete', '/api/admin/blackouts/1'),
+    ('post', '/api/admin/import/subscriptions'),
+    ('post', '/api/admin/import/payment-orders'),
+    ('post', '/api/admin/deliveries/materialize'),
+    ('get', '/api/admin/analytics/daily'),
+    ('get', '/api/admin/analytics/newspapers'),
+    ('get', '/api/admin/analytics/milk'),
+    ('get', '/api/admin/analytics/cities'),
+    ('post', '/api/admin/analytics/rebuild'),
+    ('get', '/api/admin/jobs'),
+    ('post', '/api/admin/jobs/1/retry'),
+    ('post', '/api/admin/payments/reconcile'),
+    ('get', '/api/admin/db/pool'),
+]
+SCAN_RE = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?!.*\bUSING (?:COVERING )?INDEX)')
+
+
+def drive_routes(client):
+    """Call every route the way the dashboard and admin pages do."""
+    user = client.post('/api/auth/register', json={
+        'email': 'plans@example.com', 'password': 'plans', 'full_name': 'Plans', 'phone': '0',
+        'address': '-', 'city': 'Pune', 'pincode': '411001'
+    }).json()
+    user_id = user.get('id', 1)
+    login = client.post('/api/auth/login', params={'email': 'plans@example.com', 'password': 'plans'}).json()
+    client.headers['Authorization'] = f"Bearer {login.get('access_token')}"
+    user_headers = dict(client.headers)
+    client.get(f'/api/auth/user/{user_id}')
+
+    client.get('/api/newspapers/')
+    client.get('/api/newspapers/1')
+    client.get('/api/newspapers/language/English')
+    client.get('/api/newspapers/genre/General')
+    client.get('/api/milk/')
+    client.get('/api/milk/1')
+    client.get('/api/magazines/')
+    client.get('/api/magazines/complementary/English')
+    client.get('/api/catalog/search', params={'q': 'times', 'kind': ['newspaper', 'magazine'], 'language': 'English', 'max_price': 20})
+
+    sub = client.post('/api/subscriptions/', json={'user_id': user_id, 'newspaper_ids': [1, 2], 'milk_package_id': 1}).json()
+    sub_id = sub.get('subscription_id', 1)
+    client.post('/api/subscriptions/quote', json={'items': [{'newspaper_ids': [1], 'milk_package_id': 2}]})
+    client.get(f'/api/subscriptions/{user_id}')
+    client.get(f'/api/subscriptions/{user_id}', params={'cursor': 0, 'limit': 1})
+    client.post(f'/api/subscriptions/{sub_id}/pause', params={'pause_days': 3})
+    client.post(f'/api/subscriptions/{sub_id}/resume')
+    client.post(f'/api/subscriptions/{sub_id}/pause', params={'from': '2030-01-01', 'to': '2030-01-03'})
+    client.get(f'/api/subscriptions/{sub_id}/pause-windows')
+    client.get(f'/api/subscriptions/{sub_id}/active-on/2030-01-02')
+    client.post(f'/api/subscriptions/{sub_id}/resume')
+    client.post('/api/admin/deliveries/materialize', params={'days': 7}, headers=ADMIN_HEADERS)
+    client.get(f'/api/subscriptions/calendar/{user_id}')
+    client.get(f'/api/calendar/month/{user_id}', params={'month': '2030-01'})
+    client.get('/api/calendar/grid/2030/1')
+    client.post(f'/api/subscriptions/{sub_id}/toggle-delivery', json={'date': '2030-01-01'})
+    client.post(f'/api/subscriptions/{sub_id}/toggle-delivery', json={'date': '2030-01-01'})
+    client.post(f'/api/subscriptions/{sub_id}/deliveries/batch', json={
+        'add': ['2030-01-01', {'from': '2030-01-03', 'to': '2030-01-05'}], 'remove': ['2030-01-02']
+    })
+    client.post(f'/api/subscriptions/{sub_id}/deliveries/batch', json={'add': ['2030-01-02'], 'remove': ['2030-01-04']})
+
+    client.get(f'/api/payments/history/{user_id}')
+    history = client.get(f'/api/payments/history/{user_id}', params={'limit': 1, 'status': 'pending', 'from': '2020-01-01', 'to': '2099-12-31'})
+    client.get(f'/api/payments/history/{user_id}', params={'cursor': history.headers.get('X-Next-Cursor', 'MjAyMC0wMS0wMVQwMDowMDowMHwx'), 'method': 'razorpay'})
+    client.get(f'/api/payments/history/{user_id}/summary', params={'from': '2020-01-01'})
+    client.post(f"/api/payments/confirm-payment/{sub.get('payment_id', 1)}")
+    client.post('/api/payments/verify-razorpay', json={
+        'payment_id': 1, 'razorpay_payment_id': 'x', 'razorpay_order_id': 'y', 'razorpay_signature': 'z'
+    })
+
+    for provider, fixture, secret in (('stripe', 'payment_intent_succeeded', 'whsec_plans'), ('razorpay', 'payment_failed', 'rzp_whsec_plans')):
+        path, body, headers = signed_webhook(provider, fixture, 'order_plans', f'evt_plans_{provider}', secret)
+        client.post(path, content=body, headers=headers)
+    client.post('/api/admin/payments/reconcile', headers=ADMIN_HEADERS)
+
+    client.put('/api/admin/newspapers/1', json={'description': 'Updated'}, headers=ADMIN_HEADERS)
+    client.put('/api/admin/milk/1', json={'description': 'Updated'}, headers=ADMIN_HEADERS)
+    client.post('/api/admin/import/subscriptions', files={'file': (
+        'rows.csv', b'email,full_name,newspaper_ids,milk_package_id\nimport@example.com,Import,1;2,1\n'
+    )}, headers=ADMIN_HEADERS)
+    client.post('/api/admin/import/payment-orders', headers=ADMIN_HEADERS)
+    for scope in ({'city': 'Pune', 'pincode': '411001'}, {'newspaper_id': 1, 'milk_package_id': 1}):
+        blackout = client.post('/api/admin/blackouts', json={'from': '2030-01-01', 'to': '2030-01-02', **scope}, headers=ADMIN_HEADERS).json()
+        client.get('/api/admin/blackouts', headers=ADMIN_HEADERS)
+        client.delete(f"/api/admin/blackouts/{blackout.get('blackout_id')}", headers=ADMIN_HEADERS)
+    client.post('/api/admin/billing/run', params={'month': '2030-01'}, headers=ADMIN_HEADERS)
+    client.post('/api/admin/billing/run', params={'month': '2030-01'}, headers=ADMIN_HEADERS)
+    client.get('/api/admin/manifests/2030-01-01', headers=ADMIN_HEADERS)
+    client.get('/api/admin/manifests/2030-01-01', params={'format': 'ndjson', 'city': 'Pune', 'pincode': '411001'}, headers=ADMIN_HEADERS)
+    queued = client.post('/api/admin/billing/run', params={'month': '2030-02', 'background': True}, headers=ADMIN_HEADERS).json()
+    for _ in range(100):
+        if client.get(f"/api/jobs/{queued.get('job_id', 1)}").json().get('status') in ('done', 'dead'):
+            break
+        time.sleep(0.05)
+    client.get(f"/api/jobs/{sub.get('job_id', 1)}")
+    client.get('/api/admin/jobs', headers=ADMIN_HEADERS)
+    client.get('/api/admin/jobs', params={'status': 'queued'}, headers=ADMIN_HEADERS)
+    client.post(f"/api/admin/jobs/{sub.get('job_id', 1)}/retry", headers=ADMIN_HEADERS)
+    client.get('/metrics')
+    client.get('/api/admin/analytics/daily', params={'from': '2030-01-01', 'to': '2030-01-31'}, headers=ADMIN_HEADERS)
+    client.get('/api/admin/analytics/daily', params={'city': 'Pune'}, headers=ADMIN_HEADERS)
+    client.get('/api/admin/analytics/newspapers', params={'from': '2030-01-01', 'to': '2030-01-31', 'city': 'Pune'}, headers=ADMIN_HEADERS)
+    client.get('/api/admin/analytics/milk', headers=ADMIN_HEADERS)
+    client.get('/api/admin/analytics/cities', params={'from': '2030-01-01', 'to': '2030-01-31'}, headers=ADMIN_HEADERS)
+    return user_headers
+
+
+def open_admin_routes(client, user_headers):
+    """The ADMIN_ONLY routes that let in a caller without a token or with a user's token."""
+    opened = []
+    for method, path in ADMIN_ONLY:
+        anonymous = client.request(method.upper(), path, headers={'Authorization': ''}).status_code
+        user = client.request(method.upper(), path, headers=user_headers).status_code
+        if (anonymous, user) != (401, 403):
+            opened.append(f'{method.upper()} {path}: {anonymous} without a token, {user} with a user token')
+    return opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT INTO DELIVERIES', 'WITH')):
+            statements.setdefault(statement, parameters[0] if executemany and parameters else parameters)
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        event.listen(engine, 'before_cursor_execute', record)
+        user_headers = drive_routes(client)
+        event.remove(engine, 'before_cursor_execute', record)
+        opened = open_admin_routes(client, user_headers)
+
+    failures = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements.items():
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters or ())]
+            scans = [t for line in plan for t in SCAN_RE.findall(line) if t not in SCAN_ALLOWED]
+            if scans or args.verbose:
+                print(('FULL SCAN of ' + ', '.join(scans) if scans else 'ok') + ':\n  ' + ' '.join(statement.split()))
+                for line in plan:
+                    print('    ' + line)
+            failures += bool(scans)
+    print(f'{len(statements)} statements checked, {failures} with full table scans')
+    for route in opened:
+        print('ADMIN ROUTE OPEN: ' + route)
+    print(f'{len(ADMIN_ONLY)} admin routes checked, {len(opened)} open to other callers')
+    sys.exit(1 if failures or opened else 0)
+
+
+if __name__ == '__main__':
+    main()
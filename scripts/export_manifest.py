@@ -0,0 +1,30 @@
+import os, sys
+import argparse
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.manifests import iter_manifest, stream_csv, stream_ndjson
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a day's delivery route manifest, grouped by city/pincode")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(), help='delivery day, YYYY-MM-DD (default today)')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), default='csv')
+    parser.add_argument('--city', help='only this city')
+    parser.add_argument('--pincode', help='only this pincode')
+    parser.add_argument('-o', '--output', help='file to write (default stdout)')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        records = iter_manifest(db, args.date, city=args.city, pincode=args.pincode)
+        for chunk in (stream_csv if args.format == 'csv' else stream_ndjson)(records):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Local stand-in for the Razorpay and Stripe HTTP APIs, for tests and load runs.
+
+    python scripts/fake_gateway.py --port 8900 [--hang razorpay] [--hang-seconds 60]
+
+Point the app at it with:
+
+    RAZORPAY_BASE_URL=http://127.0.0.1:8900/razorpay
+    STRIPE_API_BASE=http://127.0.0.1:8900/stripe
+
+Created orders and intents are kept so the list endpoints can return them; settle() moves one
+to a final status as if the customer had paid. signed_webhook() renders a recorded event from
+scripts/fixtures/webhooks and signs it the way the provider would, for replaying to the app.
+wait_for_checkout() waits out the background job that opens a new subscription's order.
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_ids = itertools.count(1)
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'webhooks')
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _provider(self):
+        return self.path.strip('/').split('/', 1)[0]
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_hang(self):
+        if self._provider() in self.server.hang:
+            time.sleep(self.server.hang_seconds)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode() if length else ''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or '{}')
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    def _store(self, provider, record):
+        with self.server.lock:
+            self.server.objects[provider][record['id']] = record
+        return record
+
+    def _listed(self, provider, since):
+        """The provider's objects created at or after `since`, newest first."""
+        with self.server.lock:
+            objects = [o for o in self.server.objects[provider].values() if o['created_at' if provider == 'razorpay' else 'created'] >= since]
+        return objects[::-1]
+
+    def do_POST(self):
+        self._maybe_hang()
+        data = self._read_body()
+        if self.path == '/razorpay/v1/orders':
+            n = next(_ids)
+            return self._reply(200, self._store('razorpay', {
+                'id': f'order_fake{n}', 'entity': 'order', 'amount': int(data.get('amount', 0)),
+                'currency': data.get('currency', 'INR'), 'status': 'created', 'notes': data.get('notes', {}),
+                'created_at': int(time.time())
+            }))
+        if self.path == '/stripe/v1/payment_intents':
+            n = next(_ids)
+            return self._reply(200, self._store('stripe', {
+                'id': f'pi_fake{n}', 'object': 'payment_intent', 'amount': int(data.get('amount', 0)),
+                'currency': data.get('currency', 'inr'), 'status': 'requires_payment_method',
+                'client_secret': f'pi_fake{n}_secret_fake', 'created': int(time.time())
+            }))
+        self._reply(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Unknown path'}})
+
+    def do_GET(self):
+        self._maybe_hang()
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.calls[url.path] = self.server.calls.get(url.path, 0) + 1
+        if url.path == '/razorpay/v1/orders':
+            skip, count = int(query.get('skip', 0)), int(query.get('count', 10))
+            items = self._listed('razorpay', int(query.get('from', 0)))[skip:skip + count]
+            return self._reply(200, {'entity': 'collection', 'count': len(items), 'items': items})
+        if url.path == '/stripe/v1/payment_intents':
+            intents = self._listed('stripe', int(query.get('created[gte]', 0)))
+            if query.get('starting_after'):
+                ids = [intent['id'] for intent in intents]
+                intents = intents[ids.index(query['starting_after']) + 1:] if query['starting_after'] in ids else []
+            limit = int(query.get('limit', 10))
+            return self._reply(200, {
+                'object': 'list', 'url': '/v1/payment_intents', 'data': intents[:limit], 'has_more': len(intents) > limit
+            })
+        if url.path.startswith('/stripe/v1/payment_intents/'):
+            intent_id = url.path.rsplit('/', 1)[-1]
+            with self.server.lock:
+                # intents this server did not create are treated as paid
+                intent = dict(self.server.objects['stripe'].get(intent_id) or {'status': 'succeeded'})
+            return self._reply(200, {
+                **intent, 'id': intent_id, 'object': 'payment_intent', 'client_secret': f'{intent_id}_secret_fake'
+            })
+        self._reply(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Unknown path'}})
+
+
+def settle(server, object_id, status):
+    """Move a created order (to 'paid') or intent (to 'succeeded'/'canceled') to `status`."""
+    with server.lock:
+        for objects in server.objects.values():
+            if object_id in objects:
+                objects[object_id]['status'] = status
+
+
+def signed_webhook(provider, fixture, object_id, event_id, secret, timestamp=None):
+    """(path, body, headers) replaying a recorded webhook fixture for `object_id`, signed with `secret`.
+
+    Fixtures are provider event bodies with __EVENT_ID__, __OBJECT_ID__ and __CREATED__ in place
+    of the recorded ids and time.
+    """
+    timestamp = int(timestamp or time.time())
+    with open(os.path.join(FIXTURES, f'{provider}_{fixture}.json')) as f:
+        body = f.read()
+    body = body.replace('__EVENT_ID__', event_id).replace('__OBJECT_ID__', object_id).replace('__CREATED__', str(timestamp))
+    body = body.encode()
+    if provider == 'stripe':
+        signature = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+        headers = {'Stripe-Signature': f't={timestamp},v1={signature}'}
+    else:
+        headers = {
+            'X-Razorpay-Signature': hmac.new(secret.encode(), body, hashlib.sha256).hexdigest(),
+            'X-Razorpay-Event-Id': event_id,
+        }
+    return f'/api/payments/webhooks/{provider}', body, {'Content-Type': 'application/json', **headers}
+
+
+def wait_for_checkout(client, created, timeout=30):
+    """The checkout details of a subscription just created through `client`, once its payment_order job ran."""
+    if not created.get('job_id'):
+        return created
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{created['job_id']}").json()
+        if job['status'] in ('done', 'dead') or time.monotonic() > deadline:
+            return job['result'] or {**created, 'payment_method': 'pending'}
+        time.sleep(0.1)
+
+
+def start_fake_gateway(port=0, hang=(), hang_seconds=60):
+    """Start the fake gateway on a daemon thread. `server.hang` can be changed while it runs."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGatewayHandler)
+    server.daemon_threads = True
+    server.hang = set(hang)
+    server.hang_seconds = hang_seconds
+    server.lock = threading.Lock()
+    server.objects = {'razorpay': {}, 'stripe': {}}
+    server.calls = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Razorpay/Stripe API server')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--hang', action='append', default=[], choices=['razorpay', 'stripe'],
+                        help='make this provider hang before answering (repeatable)')
+    parser.add_argument('--hang-seconds', type=float, default=60)
+    args = parser.parse_args()
+    server = start_fake_gateway(args.port, args.hang, args.hang_seconds)
+    print(f'Fake gateway listening on http://127.0.0.1:{server.server_address[1]}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
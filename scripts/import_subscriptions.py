@@ -0,0 +1,45 @@
+import os, sys
+import argparse
+import csv
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.bulk_import import import_subscriptions, iter_csv_rows, iter_ndjson_rows, attach_payment_orders, IMPORT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import customers and subscriptions from CSV or NDJSON')
+    parser.add_argument('path', nargs='?', help='file to import (see app/services/bulk_import.py for the columns)')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='default: from the file extension')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument('--errors', help='write rejected rows to this CSV file')
+    parser.add_argument('--create-orders', action='store_true', help='afterwards, create gateway orders for pending payments')
+    args = parser.parse_args()
+    if not args.path and not args.create_orders:
+        parser.error('give a file to import and/or --create-orders')
+
+    db = SessionLocal()
+    try:
+        if args.path:
+            fmt = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv')
+            with open(args.path, encoding='utf-8-sig', newline='') as f:
+                rows = iter_csv_rows(f) if fmt == 'csv' else iter_ndjson_rows(f)
+                summary = import_subscriptions(db, rows, chunk_size=args.chunk_size)
+            print(f"Imported {summary['imported']} of {summary['rows']} rows ({summary['users_created']} new users, "
+                  f"{summary['rejected']} rejected) in {summary['elapsed_seconds']}s ({summary['rows_per_second']} rows/sec)")
+            if args.errors and summary['errors']:
+                with open(args.errors, 'w', newline='') as out:
+                    writer = csv.DictWriter(out, fieldnames=['line', 'error'])
+                    writer.writeheader()
+                    writer.writerows(summary['errors'])
+                print(f"Rejected rows written to {args.errors}")
+        if args.create_orders:
+            while True:
+                result = attach_payment_orders(db)
+                print(f"Created {result['created']} payment orders, {result['remaining']} remaining")
+                if not result['created'] or not result['remaining']:
+                    break
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""Migrate the database to the latest schema and seed the starter catalog.
+
+Run once per deploy (before starting the web workers with SKIP_DB_INIT=1) instead of on
+every worker start. Safe to re-run: applied migrations and non-empty catalog tables are skipped.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import argparse
+import time
+from app.database.schema import init_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--no-seed', action='store_true', help='only run migrations')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    added = init_database(seed=not args.no_seed)
+    print(f"Database ready in {time.perf_counter() - started:.2f}s", end='')
+    if added:
+        print(f" ({added['newspapers']} newspapers, {added['milk_packages']} milk packages seeded)")
+    else:
+        print()
+
+
+if __name__ == '__main__':
+    main()
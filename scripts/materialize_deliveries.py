@@ -0,0 +1,27 @@
+import os, sys
+import argparse
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.deliveries import materialize_deliveries, MAX_MATERIALIZE_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create pending deliveries for all active subscriptions')
+    parser.add_argument('--days', type=int, default=30, help='number of days to schedule (default 30)')
+    parser.add_argument('--start', type=date.fromisoformat, default=None, help='first day, YYYY-MM-DD (default today)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='subscriptions per transaction')
+    args = parser.parse_args()
+    if not 1 <= args.days <= MAX_MATERIALIZE_DAYS:
+        parser.error(f'--days must be between 1 and {MAX_MATERIALIZE_DAYS}')
+
+    db = SessionLocal()
+    try:
+        stats = materialize_deliveries(db, days=args.days, start=args.start, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(f"Scanned {stats['subscriptions_scanned']} subscriptions, created {stats['deliveries_created']} deliveries "
+          f"in {stats['elapsed_seconds']}s ({stats['rows_per_second']} rows/sec)")
+
+if __name__ == '__main__':
+    main()
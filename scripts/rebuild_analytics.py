@@ -0,0 +1,29 @@
+import os, sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.analytics import rebuild_analytics, summary_drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute the admin analytics summary tables from the base tables')
+    parser.add_argument('--check', action='store_true', help='only compare the summaries with a fresh computation')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.check:
+            drift = summary_drift(db)
+            print(f"{drift['mismatched']} summary rows differ from the base tables")
+            for example in drift['examples']:
+                print(f"  {example['key']}: stored {example['stored']}, expected {example['expected']}")
+            sys.exit(1 if drift['mismatched'] else 0)
+        report = rebuild_analytics(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {report['daily_rows']} daily rows and {report['subscriber_rows']} subscriber rows "
+          f"in {report['elapsed_seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os, sys
+import argparse
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.payment_events import apply_payment_events, reconcile_pending_payments, RECONCILE_AFTER, RECONCILE_MAX_AGE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Settle stale pending payments from the Stripe and Razorpay lists')
+    parser.add_argument('--stale-minutes', type=int, default=int(RECONCILE_AFTER.total_seconds() // 60),
+                        help='only payments pending for longer than this')
+    parser.add_argument('--max-age-days', type=int, default=RECONCILE_MAX_AGE.days, help='ignore payments older than this')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        events = apply_payment_events(db)
+        report = reconcile_pending_payments(db, timedelta(minutes=args.stale_minutes), timedelta(days=args.max_age_days))
+    finally:
+        db.close()
+    print(f"Applied {events['events']} queued webhook events ({events['completed']} completed, {events['failed']} failed)")
+    for provider, entry in report.items():
+        print(f"{provider}: {entry['list_calls']} list calls, {entry['completed']} completed, {entry['failed']} failed"
+              + (f" -- {entry['error']}" if 'error' in entry else ''))
+
+if __name__ == '__main__':
+    main()
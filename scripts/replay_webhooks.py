@@ -0,0 +1,141 @@
+"""Replay recorded Stripe/Razorpay webhooks against the app, then reconcile the rest via the fake gateway.
+
+Creates --payments payments per provider through the API (orders and intents live in the fake
+gateway). The first half are settled by replaying the recorded webhook fixtures -- each event
+delivered twice, concurrently, plus some failures later followed by a success -- and the
+second half are paid or cancelled in the fake gateway only, backdated, and left to the
+reconciliation sweep. Prints throughput and gateway list calls, and exits non-zero if any
+payment ends in the wrong status.
+"""
+import os, sys
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from scripts.fake_gateway import start_fake_gateway, settle, signed_webhook, wait_for_checkout
+
+gateway = start_fake_gateway()
+base = f'http://127.0.0.1:{gateway.server_address[1]}'
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='dailyeaze-webhooks-'), 'webhooks.db'),
+    'RAZORPAY_PUBLIC_KEY': 'rzp_test_fake', 'RAZORPAY_SECRET_KEY': 'fake',
+    'STRIPE_SECRET_KEY': 'sk_test_fake',
+    'RAZORPAY_BASE_URL': base + '/razorpay', 'STRIPE_API_BASE': base + '/stripe',
+    'SECRET_KEY': 'bench-secret',
+    'STRIPE_WEBHOOK_SECRET': 'whsec_fake', 'RAZORPAY_WEBHOOK_SECRET': 'rzp_whsec_fake',
+})
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from app.main import app
+from app.services.security import create_access_token
+from app.database.database import SessionLocal
+from app.database.models import Payment
+
+SECRETS = {'stripe': 'whsec_fake', 'razorpay': 'rzp_whsec_fake'}
+SUCCESS = {'stripe': ('payment_intent_succeeded',), 'razorpay': ('order_paid', 'payment_captured')}
+FAILURE = {'stripe': 'payment_intent_payment_failed', 'razorpay': 'payment_failed'}
+LISTED_STATUS = {'stripe': {'completed': 'succeeded', 'failed': 'canceled'}, 'razorpay': {'completed': 'paid'}}
+
+
+def create_payments(client, user_id, count):
+    """{provider: [(payment_id, gateway id), ...]}"""
+    created = {'razorpay': [], 'stripe': []}
+    for _ in range(count):
+        sub = client.post('/api/subscriptions/', json={'user_id': user_id, 'newspaper_ids': [1], 'milk_package_id': 1}).json()
+        sub = wait_for_checkout(client, sub)
+        created['razorpay'].append((sub['payment_id'], sub['razorpay_order_id']))
+        intent = client.post('/api/payments/create-payment-intent', params={'amount': 480, 'user_id': user_id}).json()
+        created['stripe'].append((intent['payment_id'], intent['client_secret'].split('_secret')[0]))
+    return created
+
+
+def webhook_plan(created):
+    """Events to deliver (each twice) and the status each webhook-settled payment should end in."""
+    events, expected = [], {}
+    for provider, payments in created.items():
+        for i, (payment_id, object_id) in enumerate(payments[:len(payments) // 2]):
+            success = SUCCESS[provider][i % len(SUCCESS[provider])]
+            if i % 5 == 0:
+                events.append((provider, FAILURE[provider], object_id, f'evt_{provider}_{i}_failed'))
+                expected[payment_id] = 'failed'
+            if i % 5 != 0 or i % 10 == 0:
+                # every tenth payment fails first and is paid on a retry
+                events.append((provider, success, object_id, f'evt_{provider}_{i}_paid'))
+                expected[payment_id] = 'completed'
+    return events, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--payments', type=int, default=200, help='payments per provider')
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        user = client.post('/api/auth/register', json={
+            'email': 'webhooks@example.com', 'password': 'webhooks', 'full_name': 'Webhooks', 'phone': '0',
+            'address': '-', 'city': 'Pune', 'pincode': '411001'
+        }).json()
+        client.headers['Authorization'] = f"Bearer {create_access_token(user['id'])}"
+        created = create_payments(client, user['id'], args.payments)
+
+        events, expected = webhook_plan(created)
+        deliveries = [e for e in events for _ in range(2)]
+
+        def deliver(event):
+            provider, fixture, object_id, event_id = event
+            path, body, headers = signed_webhook(provider, fixture, object_id, event_id, SECRETS[provider])
+            return client.post(path, content=body, headers=headers).json().get('duplicate')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            duplicates = sum(bool(d) for d in pool.map(deliver, deliveries))
+        elapsed = time.perf_counter() - started
+        path, body, headers = signed_webhook('stripe', 'payment_intent_succeeded', 'pi_forged', 'evt_forged', 'wrong')
+        forged = client.post(path, content=body, headers=headers).status_code
+        print(f'webhooks: {len(deliveries)} deliveries of {len(events)} events in {elapsed * 1000:.0f} ms '
+              f'({len(deliveries) / elapsed:.0f}/s), {duplicates} recognised as duplicates, forged signature -> {forged}')
+
+        # the rest settle at the provider only and are swept once stale
+        stale = datetime.utcnow() - timedelta(hours=1)
+        db = SessionLocal()
+        try:
+            for provider, payments in created.items():
+                rest = payments[len(payments) // 2:]
+                for i, (payment_id, object_id) in enumerate(rest):
+                    outcome = 'failed' if i % 4 == 0 and 'failed' in LISTED_STATUS[provider] else 'completed' if i % 4 != 3 else 'pending'
+                    if outcome != 'pending':
+                        settle(gateway, object_id, LISTED_STATUS[provider][outcome])
+                    expected[payment_id] = outcome
+                db.execute(update(Payment).where(Payment.id.in_([p for p, _ in rest])).values(created_at=stale))
+            db.commit()
+        finally:
+            db.close()
+
+        gateway.calls.clear()
+        started = time.perf_counter()
+        report = client.post('/api/admin/payments/reconcile', headers={'Authorization': f'Bearer {create_access_token(0, is_admin=True)}'}).json()
+        elapsed = time.perf_counter() - started
+        print(f"reconcile: {report['reconciled']} in {elapsed * 1000:.0f} ms, gateway calls {gateway.calls}")
+
+    db = SessionLocal()
+    try:
+        actual = dict(db.query(Payment.id, Payment.status).filter(Payment.id.in_(list(expected))).all())
+    finally:
+        db.close()
+    wrong = {pid: (status, actual.get(pid)) for pid, status in expected.items() if actual.get(pid) != status}
+    counts = {}
+    for status in actual.values():
+        counts[status] = counts.get(status, 0) + 1
+    print(f'{len(expected)} payments checked: {counts}; {len(wrong)} in the wrong status')
+    for pid, (want, got) in list(wrong.items())[:10]:
+        print(f'  payment {pid}: expected {want}, got {got}')
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
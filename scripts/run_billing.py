@@ -0,0 +1,32 @@
+import os, sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database.database import SessionLocal
+from app.services.billing import run_billing, month_period, previous_month
+
+
+def print_progress(report):
+    print(f"  {report['subscriptions_scanned']} subscriptions scanned, {report['payments_created']} bills created, "
+          f"{report['subscriptions_per_second']} subscriptions/sec", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bill every subscription for its deliveries in a month')
+    parser.add_argument('--month', default=None, help='YYYY-MM (default last month)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='subscriptions per transaction')
+    parser.add_argument('--quiet', action='store_true', help='only print the final report')
+    args = parser.parse_args()
+    start, end = month_period(args.month) if args.month else previous_month()
+
+    db = SessionLocal()
+    try:
+        report = run_billing(db, start, end, chunk_size=args.chunk_size, progress=None if args.quiet else print_progress)
+    finally:
+        db.close()
+    print(f"Billed {report['period_start']}..{report['period_end']}: {report['payments_created']} bills for "
+          f"{report['amount_billed']}, {report['already_billed']} already billed, "
+          f"{report['subscriptions_scanned']} subscriptions in {report['elapsed_seconds']}s "
+          f"({report['subscriptions_per_second']} subscriptions/sec)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os, sys
+import argparse
+import signal
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.services.jobs import WorkerPool, JOB_WORKERS, JOB_POLL_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs from the database queue until interrupted')
+    parser.add_argument('--workers', type=int, default=max(JOB_WORKERS, 1), help='worker threads')
+    parser.add_argument('--poll', type=float, default=JOB_POLL_SECONDS, help='seconds between polls of an empty queue')
+    args = parser.parse_args()
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    pool = WorkerPool(args.workers, args.poll).start()
+    print(f"Running jobs with {args.workers} workers; Ctrl+C to stop")
+    try:
+        while not stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()